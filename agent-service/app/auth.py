@@ -1,11 +1,10 @@
 """PASETO token verification for internal gateway auth."""
 
-import datetime
-import json
 import os
 
-from pyseto import Key, decode
-from pyseto.exceptions import DecryptError, VerifyError
+from pyseto import Key
+
+from app.verified_tokens import TokenVerifier
 
 def _load_paseto_key() -> Key:
     key_hex = os.getenv("PASETO_SYMMETRIC_KEY")
@@ -21,40 +20,12 @@ PASETO_KEY = _load_paseto_key()
 EXPECTED_ISSUER = os.getenv("PASETO_ISSUER", "dear-ai-gateway")
 EXPECTED_AUDIENCE = os.getenv("PASETO_AUDIENCE", "dear-ai-python-backend")
 
-def _coerce_subject(subject: str | bytes) -> str:
-    if isinstance(subject, bytes):
-        return subject.decode("utf-8")
-    return str(subject)
+_verifier = TokenVerifier(PASETO_KEY, EXPECTED_ISSUER, EXPECTED_AUDIENCE)
 
 def verify_internal_token(token_string: str) -> str | None:
-    """Verify PASETO token and return the user id if valid."""
-    try:
-        decoded = decode(PASETO_KEY, token_string)
-
-        if isinstance(decoded.payload, dict):
-            payload = decoded.payload
-        else:
-            payload = json.loads(decoded.payload)
-
-        if payload.get("iss") != EXPECTED_ISSUER:
-            raise ValueError("Invalid issuer")
-
-        if payload.get("aud") != EXPECTED_AUDIENCE:
-            raise ValueError("Invalid audience")
-
-        exp_raw = payload.get("exp")
-        if not exp_raw:
-            raise ValueError("Missing exp claim")
-        exp = datetime.datetime.fromisoformat(exp_raw.replace("Z", "+00:00"))
-        if datetime.datetime.now(datetime.UTC) > exp:
-            raise ValueError("Token expired")
-
-        user_id = payload.get("sub")
-        if not user_id:
-            raise ValueError("Missing subject (user_id)")
-
-        return _coerce_subject(user_id)
+    """Verify PASETO token and return the user id if valid (cached until ``exp``)."""
+    return _verifier.verify(token_string)
 
-    except (VerifyError, DecryptError, ValueError) as exc:
-        print(f"Token verification failed: {exc}")
-        return None
+def verifier_stats() -> dict:
+    """Cache hits, failures by reason and decrypt timings (served on GET /metrics)."""
+    return _verifier.stats()
@@ -13,7 +13,7 @@ DIARY_SERVICE_URL = os.getenv("DIARY_SERVICE_URL", "http://diary_service:8000")
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
-from app.auth import verify_internal_token
+from app.auth import verifier_stats, verify_internal_token
 from app.engine.graph import build_graph
 
 logger = logging.getLogger(__name__)
@@ -25,6 +25,11 @@ async def health() -> dict:
     """Simple liveness check."""
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def metrics() -> dict:
+    """PASETO verification stats (cache hits, failures by reason)."""
+    return {"paseto_verify": verifier_stats()}
+
 @app.post("/summarize-to-diary")
 async def summarize_to_diary(request: Request) -> dict:
     """Takes the user's conversation, generates an emotional summary, and adds it to the diary."""
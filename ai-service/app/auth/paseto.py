@@ -1,11 +1,14 @@
-"""PASETO token verification for internal gateway auth."""
+"""PASETO token verification and minting for internal gateway auth."""
 
 import datetime
-import json
 import os
+import time
+from collections import OrderedDict
 
-from pyseto import Key, decode
-from pyseto.exceptions import DecryptError, VerifyError
+from pyseto import Key, encode
+
+from app.auth.verified_tokens import TokenVerifier
+from app.utils import metrics
 
 
 def _load_paseto_key() -> Key:
@@ -23,43 +26,53 @@ PASETO_KEY = _load_paseto_key()
 EXPECTED_ISSUER = os.getenv("PASETO_ISSUER", "dear-ai-gateway")
 EXPECTED_AUDIENCE = os.getenv("PASETO_AUDIENCE", "dear-ai-python-backend")
 
+# Tokens ai-service mints for its own calls to chat-service.
+INTERNAL_TOKEN_TTL = int(os.getenv("INTERNAL_TOKEN_TTL", "300"))
+INTERNAL_TOKEN_REFRESH_MARGIN = float(os.getenv("INTERNAL_TOKEN_REFRESH_MARGIN", "60"))
+INTERNAL_TOKEN_CACHE_SIZE = int(os.getenv("INTERNAL_TOKEN_CACHE_SIZE", "1024"))
 
-def _coerce_subject(subject: str | bytes) -> str:
-    if isinstance(subject, bytes):
-        return subject.decode("utf-8")
-    return str(subject)
-
-
-def verify_internal_token(token_string: str) -> str | None:
-    """Verify PASETO token and return the user id if valid."""
-    try:
-        decoded = decode(PASETO_KEY, token_string)
-
-        if isinstance(decoded.payload, dict):
-            payload = decoded.payload
-        else:
-            payload = json.loads(decoded.payload)
-
-        if payload.get("iss") != EXPECTED_ISSUER:
-            raise ValueError("Invalid issuer")
-
-        if payload.get("aud") != EXPECTED_AUDIENCE:
-            raise ValueError("Invalid audience")
+# user_id -> (token, expiry as a unix timestamp); most recently used last.
+_minted: OrderedDict[str, tuple[str, float]] = OrderedDict()
 
-        # Enforce expiry — pyseto does NOT validate exp automatically.
-        exp_raw = payload.get("exp")
-        if not exp_raw:
-            raise ValueError("Missing exp claim")
-        exp = datetime.datetime.fromisoformat(exp_raw.replace("Z", "+00:00"))
-        if datetime.datetime.now(datetime.UTC) > exp:
-            raise ValueError("Token expired")
+_verifier = TokenVerifier(PASETO_KEY, EXPECTED_ISSUER, EXPECTED_AUDIENCE)
 
-        user_id = payload.get("sub")
-        if not user_id:
-            raise ValueError("Missing subject (user_id)")
 
-        return _coerce_subject(user_id)
-
-    except (VerifyError, DecryptError, ValueError) as exc:
-        print(f"Token verification failed: {exc}")
-        return None
+def verify_internal_token(token_string: str) -> str | None:
+    """Verify PASETO token and return the user id if valid (cached until ``exp``)."""
+    return _verifier.verify(token_string)
+
+
+metrics.register_provider("paseto_verify", _verifier.stats)
+
+
+def mint_internal_token(user_id: str, *, fresh: bool = False) -> str:
+    """Return an internal PASETO for *user_id*, reusing a cached one until near expiry.
+
+    A token is re-minted once fewer than ``INTERNAL_TOKEN_REFRESH_MARGIN``
+    seconds of its ``INTERNAL_TOKEN_TTL`` lifetime remain, so callers
+    always get at least that much validity.  ``fresh=True`` skips the
+    cache, e.g. after chat-service rejected the cached token.
+    """
+    now = time.time()
+    cached = _minted.get(user_id)
+    if not fresh and cached is not None and cached[1] - now > INTERNAL_TOKEN_REFRESH_MARGIN:
+        _minted.move_to_end(user_id)
+        metrics.incr("internal_token.cache_hits")
+        return cached[0]
+
+    expires_at = now + INTERNAL_TOKEN_TTL
+    exp = datetime.datetime.fromtimestamp(expires_at, datetime.UTC)
+    payload = {
+        "iss": EXPECTED_ISSUER,
+        "aud": EXPECTED_AUDIENCE,
+        "sub": user_id,
+        "exp": exp.isoformat().replace("+00:00", "Z"),
+    }
+    token = encode(PASETO_KEY, payload).decode("utf-8")
+    metrics.incr("internal_token.minted")
+
+    _minted[user_id] = (token, expires_at)
+    _minted.move_to_end(user_id)
+    while len(_minted) > INTERNAL_TOKEN_CACHE_SIZE:
+        _minted.popitem(last=False)
+    return token
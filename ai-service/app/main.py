@@ -3,10 +3,10 @@
 import asyncio
 import base64
 import contextlib
+import datetime
 import json
 import logging
 import os
-import httpx
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
@@ -15,27 +15,63 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-CHAT_SERVICE_URL = os.getenv("CHAT_SERVICE_URL", "http://chat_service:8000")
-
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse, Response
 
 from app.auth.dependencies import verify_websocket_handshake
-from app.auth.paseto import verify_internal_token
+from app.auth.paseto import mint_internal_token, verify_internal_token
 from app.services.context.graphrag import (
     evict_idle_graphs,
     retrieve_context,
     schedule_ingestion,
 )
+from app.services.guardrails.engine import GuardrailResult, scan as scan_guardrails
+from app.services.guardrails.output import OutputGuardrail
+from app.services.guardrails.rules import EMERGENCY, OFF_TOPIC
+from app.services.history.cache import (
+    HISTORY_LIMIT,
+    SessionHistory,
+    get_history,
+    put_history,
+)
+from app.services.history.summary import fetch_summary, schedule_summary
+from app.services.history.writer import get_chat_writer, start_chat_writer, stop_chat_writer
 from app.services.llm.generate_output import stream_response
+from app.services.stt.streaming import AudioStream, StreamConfig, get_streaming_recognizer
 from app.services.stt.stt import transcribe_audio
-from app.services.tts.tts import synthesize_speech
-from app.services.safety.check import check_safety, check_relevance
+from app.services.stt.upload import read_stt_upload
+from app.services.tts.cache import synthesize_speech_cached, warm_tts_cache
+from app.services.tts.segmenter import SentenceSegmenter
+from app.services.tts.tts import DEFAULT_AUDIO_FORMAT, AudioFormat, parse_audio_format
+from app.utils import metrics
+from app.utils.coalescer import DEFAULT_COALESCE, CoalesceConfig, coalesced, parse_coalesce
+from app.utils.frames import (
+    FrameError,
+    decode_audio_message,
+    decode_base64_audio,
+    decode_frame,
+    encode_frame,
+)
+from app.utils.google_auth import start_google_auth, stop_google_auth
+from app.utils.http_client import close_chat_client, get_chat_client, init_chat_client
+from app.utils.ids import new_session_id
 from app.utils.llm_setup import setup_llm
+from app.utils.rate_limit import BACKGROUND, get_vertex_limiter
 from app.utils.setup_client import get_client
+from app.utils.stages import Stage, run_stages
+from app.utils.task_scope import RequestScope
 
 logger = logging.getLogger(__name__)
 
+# Per-stage timeouts (seconds) for the pre-generation DAG in _handle_message.
+STAGE_HISTORY_TIMEOUT = float(os.getenv("STAGE_HISTORY_TIMEOUT", "5"))
+STAGE_CONTEXT_TIMEOUT = float(os.getenv("STAGE_CONTEXT_TIMEOUT", "15"))
+
+
+# Fixed replies; their audio is pre-synthesised into the TTS cache at startup.
+EMERGENCY_MESSAGE = "Emergency: We detected that you might be in distress. If you are experiencing a crisis, please contact emergency services or a crisis helpline immediately. Help is available."
+OFF_TOPIC_MESSAGE = "I am a friendly chatbot and I am not designed to help with coding or unrelated technical tasks. Let's chat about something else!"
+
 
 # ---------------------------------------------------------------------------
 # Lifespan: pre-warm singletons + periodic cache cleanup
@@ -51,6 +87,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     get_client()
     logger.info("Pre-warming LiteLLM + embedder…")
     setup_llm()
+    await init_chat_client()
+    await start_chat_writer(mint_internal_token)
+    # Fetch the Google token for STT/TTS now and keep it refreshed ahead of expiry.
+    start_google_auth()
     logger.info("Startup pre-warming complete.")
 
     # Background task to evict idle GraphRAG instances
@@ -60,13 +100,24 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
             await evict_idle_graphs()
 
     eviction_task = asyncio.create_task(_eviction_loop())
+    # Warm the TTS cache in the background so startup isn't blocked on TTS.
+    tts_warm_task = asyncio.create_task(
+        warm_tts_cache(
+            [EMERGENCY_MESSAGE, OFF_TOPIC_MESSAGE],
+            audio_formats=(DEFAULT_AUDIO_FORMAT, parse_audio_format("MP3")),
+        )
+    )
 
     yield
 
-    # Shutdown: cancel the eviction loop
-    eviction_task.cancel()
-    with contextlib.suppress(asyncio.CancelledError):
-        await eviction_task
+    # Shutdown: cancel the eviction loop and any unfinished warm-up
+    for task in (eviction_task, tts_warm_task):
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await stop_chat_writer()
+    await close_chat_client()
+    await stop_google_auth()
 
 
 app = FastAPI(title="Dear AI", lifespan=lifespan)
@@ -74,10 +125,15 @@ app = FastAPI(title="Dear AI", lifespan=lifespan)
 
 @dataclass
 class ConnectionState:
-    """Tracks the active task and request id for a socket."""
+    """Tracks the active task, request id, session history, and protocol mode for a socket."""
 
     active_task: asyncio.Task | None = None
     request_id: int = 0
+    history: SessionHistory | None = None
+    binary_audio: bool = False
+    audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT
+    coalesce: CoalesceConfig = DEFAULT_COALESCE
+    audio_stream: AudioStream | None = None
 
 
 @app.get("/health")
@@ -86,12 +142,20 @@ async def health() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics_endpoint() -> dict:
+    """In-process counters, timings, and connection pool stats."""
+    return metrics.snapshot()
+
+
 @app.post("/voice/tts")
 async def tts_endpoint(request: Request) -> Response:
     """Convert text to speech using Google Cloud TTS.
 
     Expects X-Internal-Auth header (PASETO) and JSON body: {"text": "..."}.
-    Returns audio/mpeg bytes.
+    An optional "audio_format" ("MP3" or {"encoding": ..., "sample_rate_hertz": ...})
+    selects the output; the default is OGG_OPUS. Returns the audio bytes with a
+    matching media type.
     """
     # --- Auth: verify the PASETO token injected by the gateway ---
     token = request.headers.get("x-internal-auth")
@@ -117,18 +181,22 @@ async def tts_endpoint(request: Request) -> Response:
         text = text[:5000]
 
     voice = body.get("voice", "en-US-Journey-F")
+    try:
+        audio_format = parse_audio_format(body.get("audio_format"))
+    except ValueError:
+        return JSONResponse(content={"error": "unsupported_audio_format"}, status_code=400)
 
     logger.info("TTS request from user %s (%d chars)", user_id, len(text))
 
     try:
-        audio_bytes = await synthesize_speech(text, voice=voice)
+        audio_bytes = await synthesize_speech_cached(text, voice=voice, audio_format=audio_format)
     except Exception as exc:
         logger.exception("TTS synthesis failed: %s", exc)
         return JSONResponse(content={"error": "tts_failed"}, status_code=500)
 
     return Response(
         content=audio_bytes,
-        media_type="audio/mpeg",
+        media_type=audio_format.media_type,
         headers={
             "Content-Disposition": "inline",
             "Cache-Control": "no-cache",
@@ -140,7 +208,9 @@ async def tts_endpoint(request: Request) -> Response:
 async def stt_endpoint(request: Request) -> dict:
     """Convert speech to text using Google Cloud STT.
 
-    Expects X-Internal-Auth header (PASETO) and JSON body: {"audio": "<base64>"}.
+    Expects X-Internal-Auth header (PASETO) and the recording as either a
+    raw ``application/octet-stream`` (or ``audio/*``) body, a multipart
+    upload with an ``audio`` file field, or JSON ``{"audio": "<base64>"}``.
     Returns {"transcript": "..."}.
     """
     # --- Auth ---
@@ -152,25 +222,13 @@ async def stt_endpoint(request: Request) -> dict:
     if not user_id:
         return JSONResponse(content={"error": "invalid_auth"}, status_code=401)
 
-    # --- Parse body ---
-    try:
-        body = await request.json()
-    except Exception:
-        return JSONResponse(content={"error": "invalid_json"}, status_code=400)
-
-    audio_b64 = body.get("audio", "")
-    if not audio_b64:
+    # --- Read body ---
+    audio_bytes = await read_stt_upload(request)
+    if isinstance(audio_bytes, JSONResponse):
+        return audio_bytes
+    if not audio_bytes:
         return JSONResponse(content={"error": "missing_audio"}, status_code=400)
 
-    try:
-        audio_bytes = base64.b64decode(audio_b64)
-    except Exception:
-        return JSONResponse(content={"error": "invalid_audio_encoding"}, status_code=400)
-
-    # Cap audio size to 10 MB
-    if len(audio_bytes) > 10 * 1024 * 1024:
-        return JSONResponse(content={"error": "audio_too_large"}, status_code=400)
-
     logger.info("STT request from user %s (%d bytes)", user_id, len(audio_bytes))
 
     try:
@@ -183,7 +241,10 @@ async def stt_endpoint(request: Request) -> dict:
 
 
 async def _cancel_active(state: ConnectionState) -> None:
-    """Cancel any in-flight task and wait for cleanup."""
+    """Cancel any in-flight task (and open audio stream) and wait for cleanup."""
+    if state.audio_stream is not None:
+        state.audio_stream.close()
+        state.audio_stream = None
     if state.active_task and not state.active_task.done():
         state.active_task.cancel()
         try:
@@ -206,43 +267,140 @@ async def _safe_send_json(
         logger.debug("WebSocket send failed: %s", exc)
 
 
-async def _fetch_tts_audio_b64(text: str, voice: str) -> str:
-    """Synthesize speech and return it as base64."""
-    audio_bytes = await synthesize_speech(text, voice=voice)
-    return base64.b64encode(audio_bytes).decode("utf-8")
+async def _send_audio(
+    websocket: WebSocket,
+    state: ConnectionState,
+    request_id: int,
+    audio: bytes,
+    *,
+    final: bool = False,
+) -> None:
+    """Send audio as a binary frame or as base64 JSON, per the socket's mode."""
+    if not state.binary_audio:
+        await _safe_send_json(
+            websocket,
+            state,
+            request_id,
+            {"layer": "audio", "audio": base64.b64encode(audio).decode("utf-8"), "final": final},
+        )
+        return
+    if request_id != state.request_id:
+        return
+    try:
+        await websocket.send_bytes(encode_frame("audio", request_id, audio, final=final))
+    except Exception as exc:
+        logger.debug("WebSocket send failed: %s", exc)
+
+
+async def _fetch_tts_audio(text: str, voice: str, audio_format: AudioFormat) -> bytes:
+    """Synthesize speech (through the TTS cache) and return the raw audio."""
+    return await synthesize_speech_cached(text, voice=voice, audio_format=audio_format)
+
+
+async def _load_history(
+    state: ConnectionState,
+    user_id: str,
+    session_id: str,
+    internal_token: str,
+    is_new_session: bool,
+) -> SessionHistory:
+    """Return the session history, hitting chat-service only on a cold start."""
+    cached = state.history
+    if cached and cached.session_id == session_id and cached.is_fresh():
+        metrics.incr("history_cache.hits_connection")
+        return cached
+
+    cached = get_history(user_id, session_id)
+    if cached is not None:
+        metrics.incr("history_cache.hits_shared")
+    else:
+        messages = []
+        summary, summarized_until = "", ""
+        if not is_new_session:
+            metrics.incr("history_cache.misses")
+            # Only the newest messages created after the rolling summary are needed.
+            summary, summarized_until = await fetch_summary(session_id, internal_token)
+            params = {"limit": HISTORY_LIMIT, "latest": "true"}
+            if summarized_until:
+                params["after"] = summarized_until
+            resp = await get_chat_client().get(
+                f"/chats/{session_id}",
+                params=params,
+                headers={"X-Internal-Auth": internal_token},
+            )
+            if resp.status_code == 200:
+                messages = resp.json()
+        cached = SessionHistory.from_messages(
+            user_id, session_id, messages, summary=summary, summarized_until=summarized_until
+        )
+        put_history(cached)
+
+    state.history = cached
+    return cached
+
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _spawn_background(coro) -> asyncio.Task:
+    """Run *coro* detached from any request so cancelling a turn does not stop it."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
 
 
-def _get_internal_token(user_id: str) -> str:
-    import datetime
-    from pyseto import encode
-    from app.auth.paseto import PASETO_KEY
-    now = datetime.datetime.now(datetime.timezone.utc)
-    exp = (now + datetime.timedelta(minutes=5)).isoformat().replace("+00:00", "Z")
-    payload = {
-        "iss": os.getenv("PASETO_ISSUER", "dear-ai-gateway"),
-        "aud": os.getenv("PASETO_AUDIENCE", "dear-ai-python-backend"),
-        "sub": user_id,
-        "exp": exp
-    }
-    return encode(PASETO_KEY, payload).decode("utf-8")
+async def _create_session(user_id: str, session_id: str, token: str, first_message: str) -> None:
+    """Create the session row in chat-service, then auto-title it.
+
+    The insert runs detached and is only awaited (shielded) here, so a
+    superseded turn still leaves the session row behind.  Auto-titling
+    stays in the turn's scope: cancelling the turn stops the extra LLM
+    call, and the session keeps the placeholder title.
+    """
+    created = await asyncio.shield(_spawn_background(_insert_session(session_id, token)))
+    if created:
+        await _auto_title_session(user_id, session_id, first_message)
+
+
+async def _insert_session(session_id: str, token: str) -> bool:
+    """Create the session row (idempotent); returns False when the request failed.
+
+    Chat-service also creates a missing session when its first message is
+    saved, so a failure here only costs the auto-generated title.
+    """
+    try:
+        resp = await get_chat_client().post(
+            "/sessions",
+            json={"id": session_id, "title": "New Chat"},
+            headers={"X-Internal-Auth": token},
+        )
+    except Exception as e:
+        logger.error(f"Failed to create session {session_id}: {e}")
+        return False
+    if resp.status_code != 200:
+        logger.error(f"Failed to create session {session_id}: {resp.text}")
+        return False
+    return True
 
 
 async def _auto_title_session(user_id: str, session_id: str, first_message: str):
     try:
         genai_client, model = get_client()
         prompt = f"Generate a very short title (max 5 words) for a chat that starts with this message. Return ONLY the title string, no quotes.\n\nMessage: {first_message}"
-        response = await genai_client.aio.models.generate_content(
-            model=str(model),
-            contents=prompt,
+        response = await get_vertex_limiter().call(
+            lambda: genai_client.aio.models.generate_content(
+                model=str(model),
+                contents=prompt,
+            ),
+            label="Auto-title",
+            priority=BACKGROUND,
+        )
+        title = response.text.strip().replace('"', "")
+        token = mint_internal_token(user_id)
+        await get_chat_client().patch(
+            f"/sessions/{session_id}", json={"title": title}, headers={"X-Internal-Auth": token}
         )
-        title = response.text.strip().replace('"', '')
-        token = _get_internal_token(user_id)
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            await client.patch(
-                f"{CHAT_SERVICE_URL}/sessions/{session_id}",
-                json={"title": title},
-                headers={"X-Internal-Auth": token}
-            )
     except Exception as e:
         logger.error(f"Auto-title failed: {e}")
 
@@ -253,7 +411,7 @@ async def _handle_message(
     user_id: str,
     token: str,
     content: str | None,
-    audio_b64: str | None,
+    audio_bytes: bytes | None,
     voice_mode: bool,
     voice: str,
     request_id: int,
@@ -264,253 +422,325 @@ async def _handle_message(
 
     Ingestion of the new message into the graph runs as a fire-and-forget
     background task so it never blocks the response.
+    TTS synthesis, the TTS sender and session creation (with auto-titling)
+    are owned by a ``RequestScope`` so cancelling the turn tears all of
+    them down; only the shielded session insert outlives it.
     """
     try:
-        primary_emotion = None
-        if emotions:
-            valid_emotions = [e for e in emotions if e and isinstance(e, str)]
-            if valid_emotions:
-                counts = {}
-                for e in valid_emotions:
-                    counts[e] = counts.get(e, 0) + 1
-                max_count = max(counts.values())
-                candidates = [e for e, count in counts.items() if count == max_count]
-                for e in reversed(valid_emotions):
-                    if e in candidates:
-                        primary_emotion = e
-                        break
+        async with RequestScope(f"req-{request_id}") as scope:
+            # Snapshot the socket's format so a mid-turn change can't mix encodings.
+            audio_format = state.audio_format
+            coalesce = state.coalesce
+            primary_emotion = None
+            if emotions:
+                valid_emotions = [e for e in emotions if e and isinstance(e, str)]
+                if valid_emotions:
+                    counts = {}
+                    for e in valid_emotions:
+                        counts[e] = counts.get(e, 0) + 1
+                    max_count = max(counts.values())
+                    candidates = [e for e, count in counts.items() if count == max_count]
+                    for e in reversed(valid_emotions):
+                        if e in candidates:
+                            primary_emotion = e
+                            break
+
+            # --- STT ---
+            if audio_bytes:
+                try:
+                    content = await transcribe_audio(audio_bytes)
+                    if content and content.strip():
+                        await _safe_send_json(
+                            websocket,
+                            state,
+                            request_id,
+                            {"layer": "transcript", "content": content.strip(), "final": False},
+                        )
+                except Exception as exc:
+                    logger.error(f"[{request_id}] Failed to transcribe audio: {exc}")
+                    await _safe_send_json(websocket, state, request_id, {"error": "stt_failed"})
+                    return
+
+            if not content or not content.strip():
+                # Nothing to process
+                await _safe_send_json(
+                    websocket, state, request_id, {"layer": "rag", "content": "", "final": True}
+                )
+                return
+
+            content = content.strip()
+
+            # --- Pre-generation stages (run as a DAG, see run_stages) ---
+            async def _check_guardrails(_: dict) -> GuardrailResult:
+                # One pass over the message for every rule category.
+                return scan_guardrails(content)
+
+            async def _mint_token(_: dict) -> str:
+                return mint_internal_token(user_id)
+
+            async def _open_session(deps: dict) -> tuple[str, bool]:
+                if session_id:
+                    active_id, is_new = session_id, False
+                else:
+                    # New session: the id is generated locally and the chat-service
+                    # row is created off the critical path.
+                    active_id, is_new = new_session_id(), True
+
+                # Notify client of the active session ID so it can resume/continue
+                await _safe_send_json(
+                    websocket,
+                    state,
+                    request_id,
+                    {"layer": "session_id", "content": active_id, "final": False},
+                )
 
-        # --- STT ---
-        if audio_b64:
-            try:
-                audio_bytes = base64.b64decode(audio_b64)
-                content = await transcribe_audio(audio_bytes)
-                if content and content.strip():
-                    await _safe_send_json(
-                        websocket, state, request_id, 
-                        {"layer": "transcript", "content": content.strip(), "final": False}
+                if is_new:
+                    scope.spawn(
+                        _create_session(user_id, active_id, deps["token"], content),
+                        name="create-session",
                     )
-            except Exception as exc:
-                logger.error(f"[{request_id}] Failed to decode or transcribe audio: {exc}")
-                await _safe_send_json(websocket, state, request_id, {"error": "stt_failed"})
-                return
 
-        if not content or not content.strip():
-            # Nothing to process
-            await _safe_send_json(
-                websocket, state, request_id,
-                {"layer": "rag", "content": "", "final": True}
+                await _safe_send_json(
+                    websocket,
+                    state,
+                    request_id,
+                    {
+                        "layer": "immediate",
+                        "content": "Thanks for sharing - give me a moment to think.",
+                        "final": False,
+                    },
+                )
+                return active_id, is_new
+
+            async def _fetch_history(deps: dict) -> SessionHistory:
+                active_id, is_new = deps["session"]
+                return await _load_history(state, user_id, active_id, deps["token"], is_new)
+
+            async def _retrieve_graph_context(_: dict) -> str:
+                # Fast path: retrieve existing context (no write)
+                logger.info(f"[{request_id}] Retrieving graph context…")
+                return await retrieve_context(user_id, content)
+
+            def _passed_guardrails(deps: dict) -> bool:
+                verdict = deps["guardrails"]
+                return not (verdict.flagged(EMERGENCY) or verdict.flagged(OFF_TOPIC))
+
+            # Stage dependencies, timeouts and skip policies are declared here only.
+            results = await run_stages(
+                [
+                    Stage("guardrails", _check_guardrails),
+                    Stage("token", _mint_token),
+                    Stage(
+                        "session",
+                        _open_session,
+                        deps=("guardrails", "token"),
+                        when=_passed_guardrails,
+                    ),
+                    Stage(
+                        "history",
+                        _fetch_history,
+                        deps=("session", "token"),
+                        timeout=STAGE_HISTORY_TIMEOUT,
+                        on_error="skip",
+                        when=lambda deps: deps["session"] is not None,
+                    ),
+                    Stage(
+                        "context",
+                        _retrieve_graph_context,
+                        deps=("guardrails",),
+                        timeout=STAGE_CONTEXT_TIMEOUT,
+                        on_error="skip",
+                        default="No prior context found.",
+                        when=_passed_guardrails,
+                    ),
+                ],
+                label=str(request_id),
             )
-            return
 
-        content = content.strip()
+            # --- Safety Check ---
+            if results["guardrails"].flagged(EMERGENCY):
+                logger.warning(
+                    f"[{request_id}] Safety check failed for user {user_id}. Halting generation."
+                )
+                msg = EMERGENCY_MESSAGE
+                await _safe_send_json(
+                    websocket,
+                    state,
+                    request_id,
+                    {"layer": "emergency", "content": msg, "final": False},
+                )
+                if voice_mode:
+                    await _send_audio(
+                        websocket,
+                        state,
+                        request_id,
+                        await _fetch_tts_audio(msg, voice, audio_format),
+                    )
+                await _safe_send_json(
+                    websocket,
+                    state,
+                    request_id,
+                    {"layer": "emergency", "content": "", "final": True},
+                )
+                return
 
-        # --- Safety Check ---
-        if not check_safety(content):
-            logger.warning(f"[{request_id}] Safety check failed for user {user_id}. Halting generation.")
-            msg = "Emergency: We detected that you might be in distress. If you are experiencing a crisis, please contact emergency services or a crisis helpline immediately. Help is available."
-            await _safe_send_json(websocket, state, request_id, {"layer": "emergency", "content": msg, "final": False})
-            if voice_mode:
-                audio_b64 = await _fetch_tts_audio_b64(msg, voice)
-                await _safe_send_json(websocket, state, request_id, {"layer": "audio", "audio": audio_b64, "final": False})
-            await _safe_send_json(websocket, state, request_id, {"layer": "emergency", "content": "", "final": True})
-            return
+            # --- Relevance Check ---
+            if results["guardrails"].flagged(OFF_TOPIC):
+                logger.warning(
+                    f"[{request_id}] Relevance check failed for user {user_id}. Halting generation."
+                )
+                msg = OFF_TOPIC_MESSAGE
+                await _safe_send_json(
+                    websocket,
+                    state,
+                    request_id,
+                    {"layer": "irrelevant", "content": msg, "final": False},
+                )
+                if voice_mode:
+                    await _send_audio(
+                        websocket,
+                        state,
+                        request_id,
+                        await _fetch_tts_audio(msg, voice, audio_format),
+                    )
+                await _safe_send_json(
+                    websocket,
+                    state,
+                    request_id,
+                    {"layer": "irrelevant", "content": "", "final": True},
+                )
+                return
+
+            session_id = results["session"][0]
+            # A skipped history stage falls back to an uncached, empty history.
+            history = results["history"] or SessionHistory(user_id=user_id, session_id=session_id)
+            graph_context = results["context"]
+            logger.info(f"[{request_id}] Graph context retrieved! Starting LLM stream…")
+
+            # --- Stream the LLM response ---
+            ai_response_chunks = []
+            segmenter = SentenceSegmenter()
+
+            tts_queue = asyncio.Queue()
+            tts_worker = None
 
-        # --- Relevance Check ---
-        if not check_relevance(content):
-            logger.warning(f"[{request_id}] Relevance check failed for user {user_id}. Halting generation.")
-            msg = "I am a friendly chatbot and I am not designed to help with coding or unrelated technical tasks. Let's chat about something else!"
-            await _safe_send_json(websocket, state, request_id, {"layer": "irrelevant", "content": msg, "final": False})
             if voice_mode:
-                audio_b64 = await _fetch_tts_audio_b64(msg, voice)
-                await _safe_send_json(websocket, state, request_id, {"layer": "audio", "audio": audio_b64, "final": False})
-            await _safe_send_json(websocket, state, request_id, {"layer": "irrelevant", "content": "", "final": True})
-            return
 
-        internal_token = _get_internal_token(user_id)
-        
-        is_new_session = False
-        if not session_id:
-            # Create a new session
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                resp = await client.post(
-                    f"{CHAT_SERVICE_URL}/sessions",
-                    json={"title": "New Chat"},
-                    headers={"X-Internal-Auth": internal_token}
+                async def _tts_sender():
+                    logger.info(f"[{request_id}] TTS sender started")
+                    while True:
+                        item = await tts_queue.get()
+                        if item is None:
+                            logger.info(f"[{request_id}] TTS sender received None, stopping")
+                            break
+                        try:
+                            logger.info(f"[{request_id}] TTS sender awaiting task")
+                            audio = await item
+                            logger.info(
+                                f"[{request_id}] TTS sender received audio, len: {len(audio) if audio else 0}, match_req: {request_id == state.request_id}"
+                            )
+                            if audio and request_id == state.request_id:
+                                await _send_audio(websocket, state, request_id, audio)
+                                logger.info(f"[{request_id}] TTS sender sent audio payload")
+                        except Exception as exc:
+                            logger.error(f"[{request_id}] TTS task failed: {exc}")
+
+                tts_worker = scope.spawn(_tts_sender(), name="tts-sender")
+
+            async def _send_rag(text: str) -> None:
+                await _safe_send_json(
+                    websocket,
+                    state,
+                    request_id,
+                    {
+                        "layer": "rag",
+                        "content": text,
+                        "final": False,
+                    },
                 )
-                if resp.status_code == 200:
-                    session_id = resp.json().get("id")
-                    is_new_session = True
-                else:
-                    logger.error(f"Failed to create session: {resp.text}")
-                    raise Exception("Could not create chat session")
 
-        # Notify client of the active session ID so it can resume/continue
-        await _safe_send_json(
-            websocket, state, request_id,
-            {"layer": "session_id", "content": session_id, "final": False}
-        )
+            async def _emit(text: str) -> None:
+                ai_response_chunks.append(text)
+                await coalescer.add(text)
 
-        if is_new_session:
-            asyncio.create_task(_auto_title_session(user_id, session_id, content))
+                if voice_mode:
+                    # Fire off a TTS task for every completed segment
+                    for segment in segmenter.feed(text):
+                        task = scope.spawn(
+                            _fetch_tts_audio(segment, voice, audio_format), name="tts"
+                        )
+                        tts_queue.put_nowait(task)
 
-        await _safe_send_json(
-            websocket,
-            state,
-            request_id,
-            {
-                "layer": "immediate",
-                "content": "Thanks for sharing - give me a moment to think.",
-                "final": False,
-            },
-        )
+            # Every chunk passes the output guardrail, then is batched into
+            # fewer frames by the coalescer (flushed before the final frame).
+            output_guard = OutputGuardrail()
+            async with (
+                coalesced(_send_rag, coalesce) as coalescer,
+                contextlib.aclosing(
+                    stream_response(
+                        content,
+                        graph_context,
+                        history.messages,
+                        primary_emotion,
+                        history_contents=history.contents,
+                        summary=history.summary,
+                    )
+                ) as llm_stream,
+            ):
+                async for chunk in llm_stream:
+                    text = output_guard.feed(chunk)
+                    if text:
+                        await _emit(text)
+                    if output_guard.suppressed:
+                        logger.warning(
+                            f"[{request_id}] Output guardrail suppressed the reply "
+                            f"({output_guard.matches[-1].rule_id})."
+                        )
+                        break
+                text = output_guard.flush()
+                if text:
+                    await _emit(text)
 
-        history = []
-        if not is_new_session:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                resp = await client.get(
-                    f"{CHAT_SERVICE_URL}/chats/{session_id}?limit=20",
-                    headers={"X-Internal-Auth": internal_token}
-                )
-                if resp.status_code == 200:
-                    history = resp.json()
-
-        # --- Fast path: retrieve existing context (no write) ---
-        logger.info(f"[{request_id}] Retrieving graph context…")
-        graph_context = await retrieve_context(user_id, content)
-        logger.info(
-            f"[{request_id}] Graph context retrieved! Starting LLM stream…"
-        )
+            # Handle any remaining text for TTS
+            if voice_mode:
+                segment = segmenter.flush()
+                if segment:
+                    task = scope.spawn(_fetch_tts_audio(segment, voice, audio_format), name="tts")
+                    tts_queue.put_nowait(task)
 
-        # --- Stream the LLM response ---
-        ai_response_chunks = []
-        current_sentence = []
-        import re
-        sentence_end_pattern = re.compile(r'([.?!])\s+')
-        
-        tts_queue = asyncio.Queue()
-        tts_worker = None
-        
-        if voice_mode:
-            async def _tts_sender():
-                logger.info(f"[{request_id}] TTS sender started")
-                while True:
-                    item = await tts_queue.get()
-                    if item is None:
-                        logger.info(f"[{request_id}] TTS sender received None, stopping")
-                        break
-                    try:
-                        logger.info(f"[{request_id}] TTS sender awaiting task")
-                        audio_b64 = await item
-                        logger.info(f"[{request_id}] TTS sender received audio, len: {len(audio_b64) if audio_b64 else 0}, match_req: {request_id == state.request_id}")
-                        if audio_b64 and request_id == state.request_id:
-                            await _safe_send_json(
-                                websocket, state, request_id,
-                                {
-                                    "layer": "audio",
-                                    "audio": audio_b64,
-                                    "final": False,
-                                }
-                            )
-                            logger.info(f"[{request_id}] TTS sender sent audio payload")
-                    except Exception as exc:
-                        logger.error(f"[{request_id}] TTS task failed: {exc}")
-            
-            tts_worker = asyncio.create_task(_tts_sender())
-
-        async for chunk in stream_response(content, graph_context, history, primary_emotion):
-            ai_response_chunks.append(chunk)
-            await _safe_send_json(
-                websocket,
-                state,
-                request_id,
-                {
-                    "layer": "rag",
-                    "content": chunk,
-                    "final": False,
-                },
+            ai_content = "".join(ai_response_chunks)
+
+            # --- Fire-and-forget: ingest the full interaction in the background ---
+            now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            ingest_text = (
+                f"Date: {now_str}\nSession: {session_id}\nUser: {content}\nAI: {ai_content}"
             )
+            schedule_ingestion(user_id, ingest_text)
 
+            # Wait for all background TTS tasks to finish before signaling completion
             if voice_mode:
-                current_sentence.append(chunk)
-                # Basic sentence detection: look for ., ?, ! followed by space
-                joined_sentence = "".join(current_sentence)
-                match = sentence_end_pattern.search(joined_sentence)
-                if match:
-                    # Split at the punctuation
-                    split_idx = match.end()
-                    sentence_to_speak = joined_sentence[:split_idx].strip()
-                    current_sentence = [joined_sentence[split_idx:]]
-                    
-                    if sentence_to_speak:
-                        # Fire off TTS task for this sentence
-                        task = asyncio.create_task(_fetch_tts_audio_b64(sentence_to_speak, voice))
-                        tts_queue.put_nowait(task)
+                tts_queue.put_nowait(None)
+                await tts_worker
+                await _send_audio(websocket, state, request_id, b"", final=True)
+            else:
+                await _safe_send_json(
+                    websocket,
+                    state,
+                    request_id,
+                    {
+                        "layer": "rag",
+                        "content": "",
+                        "final": True,
+                    },
+                )
 
-        # Handle any remaining text for TTS
-        if voice_mode and current_sentence:
-            sentence_to_speak = "".join(current_sentence).strip()
-            if sentence_to_speak:
-                task = asyncio.create_task(_fetch_tts_audio_b64(sentence_to_speak, voice))
-                tts_queue.put_nowait(task)
-
-        ai_content = "".join(ai_response_chunks)
-
-        # --- Fire-and-forget: ingest the full interaction in the background ---
-        import datetime
-        now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ingest_text = (
-            f"Date: {now_str}\n"
-            f"Session: {session_id}\n"
-            f"User: {content}\n"
-            f"AI: {ai_content}"
-        )
-        schedule_ingestion(user_id, ingest_text)
-
-        # Wait for all background TTS tasks to finish before signaling completion
-        if voice_mode:
-            tts_queue.put_nowait(None)
-            await tts_worker
-            await _safe_send_json(
-                websocket,
-                state,
-                request_id,
-                {
-                    "layer": "audio",
-                    "audio": "",
-                    "final": True,
-                },
-            )
-        else:
-            await _safe_send_json(
-                websocket,
-                state,
-                request_id,
-                {
-                    "layer": "rag",
-                    "content": "",
-                    "final": True,
-                },
+            # --- Save chat: write-through to the history cache, write-behind to chat-service ---
+            user_at, ai_at = get_chat_writer().enqueue_turn(
+                user_id, session_id, content, ai_content
             )
-        
-        # --- Save chat to chat-service ---
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                headers = {"X-Internal-Auth": internal_token}
-                # Save user message
-                await client.post(
-                    f"{CHAT_SERVICE_URL}/chats",
-                    json={"role": "user", "content": content, "session_id": session_id},
-                    headers=headers,
-                )
-                # Save AI message
-                await client.post(
-                    f"{CHAT_SERVICE_URL}/chats",
-                    json={"role": "ai", "content": ai_content, "session_id": session_id},
-                    headers=headers,
-                )
-        except Exception as e:
-            logger.error("Failed to save chat to chat-service: %s", e)
+            history.append("user", content, user_at)
+            history.append("ai", ai_content, ai_at)
+            schedule_summary(history, mint_internal_token)
 
     except asyncio.CancelledError:
         logger.info("Cancelled in-flight request %s", request_id)
@@ -529,6 +759,80 @@ async def _handle_message(
         )
 
 
+async def _handle_audio_stream(
+    websocket: WebSocket,
+    state: ConnectionState,
+    user_id: str,
+    token: str,
+    stream: AudioStream,
+    config: StreamConfig,
+    voice_mode: bool,
+    voice: str,
+    request_id: int,
+    session_id: str | None,
+    emotions: list[str] | None = None,
+) -> None:
+    """Forward a streamed recording to the recogniser, then answer its final transcript.
+
+    Interim transcripts are sent as ``transcript`` frames with ``final: False``
+    while the user is still speaking.
+    """
+    transcript = ""
+    try:
+        async for event in get_streaming_recognizer().recognize(stream, config):
+            transcript = event.text
+            if event.text or event.final:
+                await _safe_send_json(
+                    websocket,
+                    state,
+                    request_id,
+                    {"layer": "transcript", "content": event.text, "final": event.final},
+                )
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        logger.error(f"[{request_id}] Streaming STT failed: {exc}")
+        await _safe_send_json(websocket, state, request_id, {"error": "stt_failed"})
+        return
+    if stream.timed_out:
+        # The client stopped sending chunks without "end": drop the recording.
+        if state.audio_stream is stream:
+            state.audio_stream = None
+        await _safe_send_json(websocket, state, request_id, {"error": "audio_stream_timeout"})
+        return
+
+    await _handle_message(
+        websocket,
+        state,
+        user_id,
+        token,
+        transcript,
+        None,
+        voice_mode,
+        voice,
+        request_id,
+        session_id,
+        emotions,
+    )
+
+
+async def _push_stream_chunk(
+    websocket: WebSocket, state: ConnectionState, chunk: bytes, *, end: bool
+) -> None:
+    """Feed a chunk of the open audio stream; *end* closes the stream."""
+    stream = state.audio_stream
+    if stream is None:
+        await websocket.send_json({"error": "no_audio_stream"})
+        return
+    if chunk and not stream.push(chunk):
+        await _cancel_active(state)
+        await websocket.send_json({"error": "audio_too_large"})
+        return
+    if end:
+        stream.close()
+        state.audio_stream = None
+
+
 @app.websocket("/chat")
 async def chat_ws(websocket: WebSocket) -> None:
     """WebSocket chat handler with cancellation on new message."""
@@ -543,21 +847,122 @@ async def chat_ws(websocket: WebSocket) -> None:
 
     try:
         while True:
-            raw_message = await websocket.receive_text()
-            try:
-                payload = json.loads(raw_message)
-            except json.JSONDecodeError:
-                await websocket.send_json({"error": "invalid_json"})
-                continue
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if message.get("bytes") is not None:
+                # Binary frame: a streamed audio chunk, or audio_in header +
+                # JSON metadata + raw audio
+                try:
+                    frame = decode_frame(message["bytes"])
+                    if frame.layer == "audio_chunk":
+                        await _push_stream_chunk(websocket, state, frame.payload, end=frame.final)
+                        continue
+                    if frame.layer != "audio_in":
+                        raise FrameError(f"unexpected layer {frame.layer}")
+                    payload, audio_bytes = decode_audio_message(frame.payload)
+                except FrameError as exc:
+                    logger.debug("Invalid binary frame: %s", exc)
+                    await websocket.send_json({"error": "invalid_frame"})
+                    continue
+                # A client that sends binary audio can also receive it.
+                payload.setdefault("binary_audio", True)
+            else:
+                try:
+                    payload = json.loads(message.get("text") or "")
+                except json.JSONDecodeError:
+                    await websocket.send_json({"error": "invalid_json"})
+                    continue
+
+                # Streaming STT control: {"audio_stream": "start" | "end"} and
+                # base64 {"audio_chunk": ...} for clients without binary frames.
+                if payload.get("audio_chunk") or payload.get("audio_stream") == "end":
+                    try:
+                        chunk = decode_base64_audio(payload.get("audio_chunk") or "")
+                    except ValueError:
+                        await websocket.send_json({"error": "invalid_audio_encoding"})
+                        continue
+                    await _push_stream_chunk(
+                        websocket, state, chunk, end=payload.get("audio_stream") == "end"
+                    )
+                    continue
+
+                audio_bytes = None
+                if payload.get("audio"):
+                    try:
+                        audio_bytes = decode_base64_audio(payload["audio"])
+                    except ValueError:
+                        await websocket.send_json({"error": "invalid_audio_encoding"})
+                        continue
+
+            if payload.get("binary_audio") and not state.binary_audio:
+                state.binary_audio = True
+                await websocket.send_json({"layer": "protocol", "binary_audio": True})
+
+            if "audio_format" in payload:
+                try:
+                    audio_format = parse_audio_format(payload["audio_format"])
+                except ValueError:
+                    await websocket.send_json({"error": "unsupported_audio_format"})
+                    continue
+                if audio_format != state.audio_format:
+                    state.audio_format = audio_format
+                    await websocket.send_json(
+                        {"layer": "protocol", "audio_format": audio_format.to_dict()}
+                    )
+
+            if "coalesce" in payload:
+                try:
+                    coalesce = parse_coalesce(payload["coalesce"])
+                except ValueError:
+                    await websocket.send_json({"error": "invalid_coalesce"})
+                    continue
+                if coalesce != state.coalesce:
+                    state.coalesce = coalesce
+                    await websocket.send_json({"layer": "protocol", "coalesce": coalesce.to_dict()})
 
             content = payload.get("content")
-            audio_b64 = payload.get("audio")
             session_id = payload.get("session_id")
             voice_mode = payload.get("voice_mode", False)
             voice = payload.get("voice", "en-US-Journey-F")
             emotions = payload.get("emotions", [])
-            
-            if not content and not audio_b64:
+
+            if payload.get("audio_stream") == "start":
+                try:
+                    config = StreamConfig(
+                        encoding=str(payload.get("encoding", "WEBM_OPUS")),
+                        sample_rate_hertz=int(payload.get("sample_rate", 48000)),
+                    )
+                except (TypeError, ValueError):
+                    await websocket.send_json({"error": "invalid_audio_config"})
+                    continue
+
+                await _cancel_active(state)
+
+                state.request_id += 1
+                stream = AudioStream()
+                state.audio_stream = stream
+                state.active_task = asyncio.create_task(
+                    _handle_audio_stream(
+                        websocket,
+                        state,
+                        user_id,
+                        token,
+                        stream,
+                        config,
+                        voice_mode,
+                        voice,
+                        state.request_id,
+                        session_id,
+                        emotions,
+                    )
+                )
+                continue
+
+            if not content and not audio_bytes:
+                if payload.keys() & {"binary_audio", "audio_format", "coalesce"}:
+                    continue  # protocol negotiation only
                 await websocket.send_json({"error": "missing_content_or_audio"})
                 continue
 
@@ -568,7 +973,17 @@ async def chat_ws(websocket: WebSocket) -> None:
 
             state.active_task = asyncio.create_task(
                 _handle_message(
-                    websocket, state, user_id, token, content, audio_b64, voice_mode, voice, current_id, session_id, emotions
+                    websocket,
+                    state,
+                    user_id,
+                    token,
+                    content,
+                    audio_bytes,
+                    voice_mode,
+                    voice,
+                    current_id,
+                    session_id,
+                    emotions,
                 )
             )
     except WebSocketDisconnect:
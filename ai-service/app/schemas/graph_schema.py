@@ -1,8 +1,10 @@
 """Graph schema definitions for the Dear AI knowledge graph."""
 
 from enum import StrEnum
+from typing import TYPE_CHECKING
 
-from graphrag_sdk import EntityType, GraphSchema, RelationType
+if TYPE_CHECKING:
+    from graphrag_sdk import GraphSchema
 
 
 class EntityLabel(StrEnum):
@@ -28,15 +30,30 @@ class RelationLabel(StrEnum):
     CAUSES_MOOD = "CAUSES_MOOD"
 
 
-_cached_schema: GraphSchema | None = None
+# (source, target) entity labels of each relation.  Plain data, so code that
+# only needs the graph's shape (e.g. context rendering) does not import the SDK.
+RELATION_PATTERNS: dict[RelationLabel, tuple[EntityLabel, EntityLabel]] = {
+    RelationLabel.FEELS: (EntityLabel.USER, EntityLabel.MOOD),
+    RelationLabel.KNOWS: (EntityLabel.USER, EntityLabel.PERSON),
+    RelationLabel.FEELS_ABOUT: (EntityLabel.USER, EntityLabel.TOPIC),
+    RelationLabel.DISCUSSED: (EntityLabel.USER, EntityLabel.TOPIC),
+    RelationLabel.PARTICIPATED_IN: (EntityLabel.USER, EntityLabel.SESSION),
+    RelationLabel.REVEALED_MOOD: (EntityLabel.SESSION, EntityLabel.MOOD),
+    RelationLabel.DISCUSSED_TOPIC: (EntityLabel.SESSION, EntityLabel.TOPIC),
+    RelationLabel.CAUSES_MOOD: (EntityLabel.TOPIC, EntityLabel.MOOD),
+}
 
+_cached_schema: "GraphSchema | None" = None
 
-def create_graph_schema() -> GraphSchema:
+
+def create_graph_schema() -> "GraphSchema":
     """Build and return the cached GraphSchema for the Dear AI knowledge graph."""
     global _cached_schema
     if _cached_schema is not None:
         return _cached_schema
 
+    from graphrag_sdk import EntityType, GraphSchema, RelationType
+
     _cached_schema = GraphSchema(
         entities=[
             EntityType(label=EntityLabel.USER, description="The human chatting with the bot"),
@@ -61,42 +78,42 @@ def create_graph_schema() -> GraphSchema:
             RelationType(
                 label=RelationLabel.FEELS,
                 description="The current mood the user is experiencing",
-                patterns=[(EntityLabel.USER, EntityLabel.MOOD)],
+                patterns=[RELATION_PATTERNS[RelationLabel.FEELS]],
             ),
             RelationType(
                 label=RelationLabel.KNOWS,
                 description="A person the user interacts with",
-                patterns=[(EntityLabel.USER, EntityLabel.PERSON)],
+                patterns=[RELATION_PATTERNS[RelationLabel.KNOWS]],
             ),
             RelationType(
                 label=RelationLabel.FEELS_ABOUT,
                 description="How the user feels regarding a specific subject",
-                patterns=[(EntityLabel.USER, EntityLabel.TOPIC)],
+                patterns=[RELATION_PATTERNS[RelationLabel.FEELS_ABOUT]],
             ),
             RelationType(
                 label=RelationLabel.DISCUSSED,
                 description="A topic brought up in the conversation",
-                patterns=[(EntityLabel.USER, EntityLabel.TOPIC)],
+                patterns=[RELATION_PATTERNS[RelationLabel.DISCUSSED]],
             ),
             RelationType(
                 label=RelationLabel.PARTICIPATED_IN,
                 description="Connects the user to a specific chat session",
-                patterns=[(EntityLabel.USER, EntityLabel.SESSION)],
+                patterns=[RELATION_PATTERNS[RelationLabel.PARTICIPATED_IN]],
             ),
             RelationType(
                 label=RelationLabel.REVEALED_MOOD,
                 description="The mood the user expressed during the specific session",
-                patterns=[(EntityLabel.SESSION, EntityLabel.MOOD)],
+                patterns=[RELATION_PATTERNS[RelationLabel.REVEALED_MOOD]],
             ),
             RelationType(
                 label=RelationLabel.DISCUSSED_TOPIC,
                 description="What was talked about during this specific session",
-                patterns=[(EntityLabel.SESSION, EntityLabel.TOPIC)],
+                patterns=[RELATION_PATTERNS[RelationLabel.DISCUSSED_TOPIC]],
             ),
             RelationType(
                 label=RelationLabel.CAUSES_MOOD,
                 description="When a topic triggers or causes a specific emotion during the session",
-                patterns=[(EntityLabel.TOPIC, EntityLabel.MOOD)],
+                patterns=[RELATION_PATTERNS[RelationLabel.CAUSES_MOOD]],
             ),
         ],
     )
@@ -0,0 +1,280 @@
+"""Compact, ranked rendering of GraphRAG retrieval results.
+
+``str(retrieval_result)`` put the SDK's repr into the system prompt:
+markdown section headers, per-item metadata and the same fact repeated
+by several retrieval paths.  ``render_context`` parses the items into
+entities, relations and free-text notes, de-duplicates them across
+items, and renders one line per entity with its relations folded in::
+
+    Person: Sam (college friend) — KNOWS, CAUSES_MOOD:Anxious
+    Topic: Exams — CAUSES_MOOD:Anxious (before finals)
+
+Relations from the user's own node are shown as a bare type under the
+other entity (the user is implicit).  Entity types come from the graph
+schema's relation patterns, so no extra query is made.
+
+Lines are ranked by retrieval score (the item's score, or its section
+and position when the strategy gives none) boosted by recency (the
+newest dates found in entity names, e.g. Session IDs) and added until
+``GRAPH_CONTEXT_TOKEN_BUDGET`` estimated tokens are used.  Sizes before
+and after are on ``GET /metrics`` under ``graph_context``.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+
+from app.schemas.graph_schema import RELATION_PATTERNS, EntityLabel
+from app.services.llm.prompt_budget import estimate_tokens, truncate_to_tokens
+from app.utils import metrics
+
+GRAPH_CONTEXT_TOKEN_BUDGET = int(os.getenv("GRAPH_CONTEXT_TOKEN_BUDGET", "800"))
+
+RECENCY_WEIGHT = 0.25  # the newest dated line gets up to +25% on its score
+POSITION_DECAY = 0.05  # later lines of an unscored section rank a little lower
+MAX_RELATIONS_PER_LINE = 8
+DESCRIPTION_MAX_TOKENS = 20
+FACT_MAX_TOKENS = 20
+NOTE_MAX_TOKENS = 60
+
+# Weight of each MultiPath section when items carry no score.
+_SECTION_WEIGHTS = {
+    "cypher_results": 1.0,
+    "facts": 1.0,
+    "entities": 0.9,
+    "relationships": 0.8,
+    "passages": 0.6,
+}
+_SKIPPED_SECTIONS = {"hint"}  # question-type hints meant for the SDK's own LLM
+
+_EDGE = re.compile(r"\s*—\[([^\]]+)\]→\s*")
+_DATE = re.compile(r"(?<!\d)\d{4}-\d{2}-\d{2}(?!\d)")
+
+
+@dataclass
+class _Edge:
+    source: str
+    rel: str
+    target: str
+    fact: str = ""
+    score: float = 0.0
+
+
+@dataclass
+class _Entity:
+    name: str
+    description: str = ""
+    score: float = 0.0
+    order: int = 0
+    edges: list[_Edge] = field(default_factory=list)
+
+
+@dataclass
+class _Line:
+    text: str
+    score: float
+    order: int
+    date: str = ""
+
+
+def _key(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+# Relation label → (source type, target type) from the graph schema.
+_RELATION_TYPES: dict[str, tuple[str, str]] = {
+    str(label): (str(source), str(target)) for label, (source, target) in RELATION_PATTERNS.items()
+}
+
+
+class _Collector:
+    """De-duplicates entities, relations and notes across retrieval items."""
+
+    def __init__(self) -> None:
+        self.entities: dict[str, _Entity] = {}
+        self.edges: dict[tuple[str, str, str], _Edge] = {}
+        self.notes: dict[str, _Line] = {}
+        self.types: dict[str, str] = {}
+        self._order = 0
+
+    def _next(self) -> int:
+        self._order += 1
+        return self._order
+
+    def entity(self, name: str, score: float, description: str = "") -> _Entity:
+        key = _key(name)
+        entity = self.entities.get(key)
+        if entity is None:
+            entity = self.entities[key] = _Entity(name=name.strip(), order=self._next())
+        entity.score = max(entity.score, score)
+        if description and not entity.description:
+            entity.description = description
+        return entity
+
+    def edge(self, source: str, rel: str, target: str, fact: str, score: float) -> None:
+        rel = rel.strip()
+        key = (_key(source), rel, _key(target))
+        edge = self.edges.get(key)
+        if edge is None:
+            edge = self.edges[key] = _Edge(source.strip(), rel, target.strip())
+            self.entity(source, 0.0)
+            self.entity(target, 0.0)
+            if rel in _RELATION_TYPES:
+                source_type, target_type = _RELATION_TYPES[rel]
+                self.types.setdefault(key[0], source_type)
+                self.types.setdefault(key[2], target_type)
+        edge.score = max(edge.score, score)
+        if fact and not edge.fact:
+            edge.fact = fact
+
+    def note(self, text: str, score: float) -> None:
+        text = " ".join(text.split())
+        if not text:
+            return
+        key = text.casefold()
+        note = self.notes.get(key)
+        if note is None:
+            self.notes[key] = _Line(text, score, self._next())
+        else:
+            note.score = max(note.score, score)
+
+    def add_line(self, line: str, section: str, score: float) -> None:
+        parts = _EDGE.split(line)
+        if len(parts) >= 3:
+            # "a —[R]→ b: fact" or the 2-hop "a —[R1]→ b —[R2]→ c"
+            last, _, fact = parts[-1].partition(": ")
+            parts[-1] = last
+            for i in range(0, len(parts) - 2, 2):
+                hop_fact = fact if i == len(parts) - 3 else ""
+                self.edge(parts[i], parts[i + 1], parts[i + 2], hop_fact, score)
+        elif section == "entities":
+            name, _, description = line.partition(": ")
+            self.entity(name, score, description.strip())
+        else:
+            self.note(line, score)
+
+
+def _item_lines(content: str, section: str) -> list[str]:
+    if section == "passages":
+        return content.removeprefix("## Source Document Passages\n").split("\n---\n")
+    if section not in _SECTION_WEIGHTS:
+        return [content]  # a chunk or record from another strategy
+    lines = []
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        lines.append(line[2:] if line.startswith("- ") else line)
+    return lines
+
+
+def _collect(items) -> _Collector:
+    collector = _Collector()
+    for item in items:
+        metadata = item.metadata or {}
+        section = metadata.get("section", "") if isinstance(metadata, dict) else ""
+        if section in _SKIPPED_SECTIONS:
+            continue
+        base = item.score if item.score is not None else _SECTION_WEIGHTS.get(section, 0.5)
+        for position, line in enumerate(_item_lines(item.content or "", section)):
+            collector.add_line(line, section, base / (1 + POSITION_DECAY * position))
+    return collector
+
+
+def _format_edge(edge: _Edge, owner: str, user_keys: set[str]) -> str:
+    other = edge.target if _key(edge.source) == owner else edge.source
+    text = edge.rel if _key(other) in user_keys else f"{edge.rel}:{other}"
+    if edge.fact:
+        text += f" ({truncate_to_tokens(edge.fact, FACT_MAX_TOKENS)})"
+    return text
+
+
+def _entity_lines(collector: _Collector) -> list[_Line]:
+    user_keys = {key for key, kind in collector.types.items() if kind == EntityLabel.USER}
+
+    # Each relation is shown once, under its non-user endpoint (or its source).
+    for edge in collector.edges.values():
+        source, target = _key(edge.source), _key(edge.target)
+        owner = target if source in user_keys and target not in user_keys else source
+        collector.entities[owner].edges.append(edge)
+
+    targets = {_key(n) for e in collector.edges.values() for n in (e.source, e.target)}
+    lines = []
+    for key, entity in collector.entities.items():
+        if not entity.edges and (key in user_keys or (key in targets and not entity.description)):
+            continue  # already shown in another entity's line
+        edges = sorted(entity.edges, key=lambda e: -e.score)[:MAX_RELATIONS_PER_LINE]
+        kind = collector.types.get(key)
+        text = f"{kind}: {entity.name}" if kind else entity.name
+        if entity.description:
+            text += f" ({truncate_to_tokens(entity.description, DESCRIPTION_MAX_TOKENS)})"
+        if edges:
+            text += " — " + ", ".join(_format_edge(e, key, user_keys) for e in edges)
+        names = [entity.name] + [n for e in edges for n in (e.source, e.target)]
+        dates = [d for n in names for d in _DATE.findall(n)]
+        score = max([entity.score] + [e.score for e in edges])
+        lines.append(_Line(text, score, entity.order, max(dates, default="")))
+    return lines
+
+
+def _rank(lines: list[_Line]) -> list[_Line]:
+    dates = sorted({line.date for line in lines if line.date})
+    freshness = {date: (i + 1) / len(dates) for i, date in enumerate(dates)}
+    return sorted(
+        lines,
+        key=lambda line: (
+            -line.score * (1 + RECENCY_WEIGHT * freshness.get(line.date, 0.0)),
+            line.order,
+        ),
+    )
+
+
+def render_context(items, budget: int = GRAPH_CONTEXT_TOKEN_BUDGET) -> str:
+    """Render retrieval *items* as ranked, de-duplicated lines within *budget* tokens."""
+    collector = _collect(items)
+    notes = []
+    for key, note in collector.notes.items():
+        if key in collector.entities:
+            continue  # a bare name (e.g. a Cypher result) that has its own line
+        note.text = truncate_to_tokens(note.text, NOTE_MAX_TOKENS)
+        dates = _DATE.findall(note.text)
+        note.date = max(dates, default="")
+        notes.append(note)
+    ranked = _rank(_entity_lines(collector) + notes)
+
+    kept: list[str] = []
+    used = 0
+    for line in ranked:
+        cost = estimate_tokens(line.text) + 1  # newline
+        if used + cost > budget:
+            break
+        kept.append(line.text)
+        used += cost
+
+    raw_tokens = sum(estimate_tokens(item.content or "") for item in items)
+    _record(raw_tokens, used, len(kept), len(ranked) - len(kept))
+    return "\n".join(kept)
+
+
+_stats = {"renders": 0, "raw_tokens": 0, "tokens": 0, "lines": 0, "dropped_lines": 0}
+
+
+def _record(raw_tokens: int, tokens: int, lines: int, dropped: int) -> None:
+    _stats["renders"] += 1
+    _stats["raw_tokens"] += raw_tokens
+    _stats["tokens"] += tokens
+    _stats["lines"] += lines
+    _stats["dropped_lines"] += dropped
+
+
+def stats() -> dict:
+    renders, raw = _stats["renders"], _stats["raw_tokens"]
+    return {
+        "budget": GRAPH_CONTEXT_TOKEN_BUDGET,
+        **_stats,
+        "tokens_avg": round(_stats["tokens"] / renders, 1) if renders else 0.0,
+        "reduction": round(1 - _stats["tokens"] / raw, 4) if raw else 0.0,
+    }
+
+
+metrics.register_provider("graph_context", stats)
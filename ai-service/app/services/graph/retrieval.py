@@ -4,6 +4,8 @@ import logging
 
 from graphrag_sdk import GraphRAG
 
+from app.services.graph.render import render_context
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,4 +17,8 @@ async def get_graph_context(rag: GraphRAG, user_query: str) -> str:
         logger.info("No prior context found in graph for query: '%s'", user_query)
         return "No prior context found."
 
-    return str(retrieval_result)
+    context = render_context(retrieval_result.items)
+    if not context:
+        logger.info("Graph retrieval for query '%s' left nothing to render", user_query)
+        return "No prior context found."
+    return context
@@ -0,0 +1,264 @@
+"""Single-pass multi-pattern guardrail engine.
+
+All rules in ``rules.RULES`` are compiled once, at import, into a single
+pattern that ``scan`` runs over the message once.  Python's ``re`` tries
+every alternative at every position, so a bare ``a|b|c`` would be no
+faster than separate searches; the combined pattern is built to fail
+fast instead:
+
+* the text is case-folded once and the pattern compiled without
+  ``IGNORECASE`` (so literals compare directly);
+* alternatives anchored with ``\\b`` before a word character are grouped
+  behind one ``(?<!\\w)`` gate, so they are only tried at word starts;
+* other alternatives with a known set of first characters get a
+  one-character lookahead gate.
+
+Only at the (rare) positions where the combined pattern hits are the
+individual rules confirmed, so every ``(rule, position)`` match is
+reported.  Run ``bench_guardrails.py`` for numbers.
+"""
+
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass
+from re import _constants as sre_constants, _parser as sre_parse
+
+from app.services.guardrails.rules import RULES, Rule
+
+_WORD_BOUNDARY = "\\b"
+# Escapes whose meaning changes when lower-cased (\S vs \s, \B vs \b, ...).
+_UPPER_ESCAPE = re.compile(r"\\[A-Z]")
+
+
+@dataclass(frozen=True)
+class GuardrailMatch:
+    rule_id: str
+    category: str
+    start: int
+    end: int
+
+
+@dataclass(frozen=True)
+class GuardrailResult:
+    matches: tuple[GuardrailMatch, ...] = ()
+
+    @property
+    def categories(self) -> frozenset[str]:
+        return frozenset(match.category for match in self.matches)
+
+    @property
+    def rule_ids(self) -> tuple[str, ...]:
+        return tuple(dict.fromkeys(match.rule_id for match in self.matches))
+
+    def flagged(self, category: str) -> bool:
+        return any(match.category == category for match in self.matches)
+
+    def __bool__(self) -> bool:
+        """True when anything matched."""
+        return bool(self.matches)
+
+
+def _split_top_level(pattern: str) -> list[str]:
+    """Split *pattern* on ``|`` that is not inside a group or character class."""
+    parts, depth, start, i, in_class = [], 0, 0, 0, False
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+            if pattern[i + 1 : i + 2] == "]":
+                i += 1  # a leading "]" is literal
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            parts.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    parts.append(pattern[start:])
+    return parts
+
+
+def _first_chars(items) -> set[str] | None:
+    """Return every character a parsed pattern can start with, or None if unbounded."""
+    if not items:
+        return None
+    op, av = items[0]
+    if op is sre_constants.LITERAL:
+        return {chr(av)}
+    if op is sre_constants.SUBPATTERN:
+        return _first_chars(av[-1])
+    if op is sre_constants.BRANCH:
+        chars: set[str] = set()
+        for branch in av[1]:
+            first = _first_chars(branch)
+            if first is None:
+                return None
+            chars |= first
+        return chars
+    if op is sre_constants.IN:
+        chars = set()
+        for kind, value in av:
+            if kind is sre_constants.LITERAL:
+                chars.add(chr(value))
+            elif kind is sre_constants.RANGE and value[1] - value[0] < 64:
+                chars.update(chr(c) for c in range(value[0], value[1] + 1))
+            else:
+                return None
+        return chars
+    if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+        return _first_chars(av[2])
+    return None
+
+
+def _literal_prefixes(items) -> tuple[list[str], bool]:
+    """Return the literal text every match of a parsed pattern starts with.
+
+    The second item is True when the prefixes spell out the whole pattern.
+    A prefix of ``""`` means a match could start with anything.
+    """
+    prefixes, complete = [""], True
+    for op, av in items:
+        if op is sre_constants.AT:
+            continue  # \b, ^: zero width
+        if op is sre_constants.LITERAL:
+            prefixes = [prefix + chr(av) for prefix in prefixes]
+            continue
+        if op is sre_constants.SUBPATTERN:
+            sub, sub_complete = _literal_prefixes(av[-1])
+        elif op is sre_constants.BRANCH:
+            branches = [_literal_prefixes(branch) for branch in av[1]]
+            sub = [prefix for found, _ in branches for prefix in found]
+            sub_complete = all(done for _, done in branches)
+        else:
+            return prefixes, False
+        prefixes = [prefix + rest for prefix in prefixes for rest in sub]
+        if not sub_complete:
+            return prefixes, False
+    return prefixes, complete
+
+
+def _fold(alternative: str) -> str:
+    """Case-fold the literals of *alternative* (matched against case-folded text)."""
+    if _UPPER_ESCAPE.search(alternative):
+        return f"(?i:{alternative})"
+    return alternative.casefold()
+
+
+def _build_combined(rules: tuple[Rule, ...]) -> re.Pattern:
+    word_start: list[str] = []
+    others: list[str] = []
+    for rule in rules:
+        for alternative in _split_top_level(rule.pattern):
+            folded = _fold(alternative)
+            if folded.startswith(_WORD_BOUNDARY):
+                rest = folded[len(_WORD_BOUNDARY) :]
+                first = _first_chars(list(sre_parse.parse(rest)))
+                if first and all(c.isalnum() or c == "_" for c in first):
+                    word_start.append(f"(?:{rest})")
+                    continue
+            first = _first_chars(list(sre_parse.parse(folded)))
+            if first:
+                gate = "".join(re.escape(c) for c in sorted(first))
+                others.append(f"(?=[{gate}])(?:{folded})")
+            else:
+                others.append(f"(?:{folded})")
+    branches = others
+    if word_start:
+        branches = [f"(?<!\\w)(?:{'|'.join(word_start)})", *others]
+    return re.compile("|".join(branches))
+
+
+class GuardrailEngine:
+    """Compile a rule set into one pattern and scan text with it in a single pass."""
+
+    def __init__(self, rules: tuple[Rule, ...] | list[Rule]) -> None:
+        self.rules = tuple(rules)
+        self._compiled = [re.compile(rule.pattern, re.IGNORECASE) for rule in self.rules]
+        self._combined = _build_combined(self.rules)
+        # (literal start, whether it is the whole match) for hold_from.
+        self._prefixes: set[tuple[str, bool]] = set()
+        for rule in self.rules:
+            prefixes, complete = _literal_prefixes(list(sre_parse.parse(rule.pattern)))
+            self._prefixes.update((prefix.casefold(), complete) for prefix in prefixes)
+
+    @property
+    def max_width(self) -> int | None:
+        """Longest text any rule can match, or None if some rule is unbounded."""
+        widths = [sre_parse.parse(rule.pattern, re.IGNORECASE).getwidth()[1] for rule in self.rules]
+        return None if any(w >= sre_constants.MAXREPEAT for w in widths) else max(widths, default=0)
+
+    def hold_from(self, text: str, pos: int = 0) -> int:
+        """Return the first position at or after *pos* where a match could still start.
+
+        A position is live while the text from it to the end agrees with
+        the literal start of some rule, so more text could complete a
+        match there; a rule that is one literal is decided once the
+        character after it has arrived.  Returns ``len(text)`` when nothing
+        from *pos* on can still match.
+        """
+        folded = text.casefold()
+        if len(folded) != len(text):
+            return pos
+        for start in range(pos, len(text)):
+            tail = folded[start:]
+            if any(
+                prefix.startswith(tail) or (not complete and tail.startswith(prefix))
+                for prefix, complete in self._prefixes
+            ):
+                return start
+        return len(text)
+
+    def scan(self, text: str) -> GuardrailResult:
+        """Return every rule match in *text* (empty result when clean)."""
+        return GuardrailResult(tuple(self.finditer(text)))
+
+    def finditer(self, text: str, pos: int = 0) -> Iterator[GuardrailMatch]:
+        """Yield rule matches starting at or after *pos*, in order of position.
+
+        Characters before *pos* are only used as context (``\\b``).
+        """
+        if pos >= len(text):
+            return
+        folded = text.casefold()
+        if len(folded) != len(text):
+            # Folding changed offsets (e.g. "ß" -> "ss"): scan rule by rule.
+            yield from self._scan_each(text, pos)
+            return
+
+        search = self._combined.search
+        while (hit := search(folded, pos)) is not None:
+            yield from self._confirm(text, hit.start())
+            # Continue from the next character so overlapping matches of
+            # other rules starting inside this one are still found.
+            pos = hit.start() + 1
+
+    def _confirm(self, text: str, start: int) -> list[GuardrailMatch]:
+        found = []
+        for rule, pattern in zip(self.rules, self._compiled, strict=True):
+            m = pattern.match(text, start)
+            if m is not None:
+                found.append(GuardrailMatch(rule.id, rule.category, m.start(), m.end()))
+        return found
+
+    def _scan_each(self, text: str, pos: int) -> list[GuardrailMatch]:
+        matches = [
+            GuardrailMatch(rule.id, rule.category, m.start(), m.end())
+            for rule, pattern in zip(self.rules, self._compiled, strict=True)
+            for m in pattern.finditer(text, pos)
+        ]
+        matches.sort(key=lambda match: match.start)
+        return matches
+
+
+_engine = GuardrailEngine(RULES)
+
+
+def scan(text: str) -> GuardrailResult:
+    """Scan *text* against all guardrail rules with the shared engine."""
+    return _engine.scan(text)
@@ -0,0 +1,113 @@
+"""Streaming guardrail for the LLM response.
+
+``OutputGuardrail.feed`` is called with each chunk from ``stream_response``
+and returns the text that is safe to send right now.  The output rules
+(``rules.OUTPUT_RULES``) all have a bounded width ``W``, so only the last
+``W`` characters can still be the start of a match spanning the next
+chunk.  Of those, only the tail from the first position that still agrees
+with the literal start of a rule (``GuardrailEngine.hold_from``) is held
+back, so an ordinary first chunk goes out at once.  Everything before it
+is scanned once, released, and dropped from the buffer (apart from one
+character of ``\\b`` context).
+
+On a match the rule's category decides the action (``OUTPUT_ACTIONS``):
+
+* ``redact`` replaces the matched text with ``OUTPUT_REDACTION`` and
+  keeps streaming;
+* ``suppress`` releases the clean text before the match, then withholds
+  everything that follows — the caller ends the reply.
+
+Feed latency is recorded as ``output_guardrail.feed`` on ``GET /metrics``.
+"""
+
+import os
+import time
+
+from app.services.guardrails.engine import GuardrailEngine, GuardrailMatch
+from app.services.guardrails.rules import OUTPUT_ACTIONS, OUTPUT_RULES
+from app.utils import metrics
+
+OUTPUT_REDACTION = os.getenv("OUTPUT_REDACTION", "[removed]")
+
+_output_engine = GuardrailEngine(OUTPUT_RULES)
+
+
+class OutputGuardrail:
+    """Incremental scanner for one streamed response."""
+
+    def __init__(
+        self,
+        engine: GuardrailEngine = _output_engine,
+        *,
+        actions: dict[str, str] = OUTPUT_ACTIONS,
+        redaction: str = OUTPUT_REDACTION,
+    ) -> None:
+        width = engine.max_width
+        if width is None:
+            raise ValueError("output guardrail rules must have a bounded match width")
+        self._engine = engine
+        self._actions = actions
+        self._redaction = redaction
+        self._hold = width  # trailing characters a match could still start in
+        # All positions below are absolute offsets into the response so far.
+        self._buf = ""
+        self._offset = 0  # position of _buf[0]
+        self._scanned = 0  # matches starting before this have been handled
+        self._released = 0  # text before this has been returned
+        self._redacted_to = 0  # end of the last redacted span
+        self.suppressed = False
+        self.matches: list[GuardrailMatch] = []
+
+    def feed(self, chunk: str) -> str:
+        """Add *chunk* and return the text that can be sent now (may be empty)."""
+        if self.suppressed or not chunk:
+            return ""
+        start = time.perf_counter()
+        self._buf += chunk
+        end = self._offset + len(self._buf)
+        window = max(self._scanned, end - self._hold) - self._offset
+        released = self._advance(self._offset + self._engine.hold_from(self._buf, window))
+        metrics.observe("output_guardrail.feed", time.perf_counter() - start)
+        return released
+
+    def flush(self) -> str:
+        """Scan and return the held-back tail at the end of the stream."""
+        if self.suppressed:
+            return ""
+        return self._advance(self._offset + len(self._buf))
+
+    def _advance(self, safe_end: int) -> str:
+        # Matches starting before *safe_end* can be decided: the buffer holds
+        # their full extent plus the character after it.
+        if safe_end <= self._scanned:
+            return ""
+        buf, offset = self._buf, self._offset
+        out: list[str] = []
+        cursor = self._released
+        for match in self._engine.finditer(buf, self._scanned - offset):
+            start, end = match.start + offset, match.end + offset
+            if start >= safe_end:
+                break
+            self.matches.append(GuardrailMatch(match.rule_id, match.category, start, end))
+            action = self._actions.get(match.category, "redact")
+            metrics.incr(f"output_guardrail.{action}")
+            if action == "suppress":
+                out.append(buf[cursor - offset : max(cursor, start) - offset])
+                self.suppressed = True
+                self._buf = ""
+                return "".join(out)
+            if start >= self._redacted_to:
+                out.append(buf[cursor - offset : start - offset])
+                out.append(self._redaction)
+            cursor = max(cursor, end)
+            self._redacted_to = max(self._redacted_to, end)
+
+        release_to = max(safe_end, cursor)
+        out.append(buf[cursor - offset : release_to - offset])
+        self._released = release_to
+        self._scanned = safe_end
+        # Keep one released character as \b / lookbehind context.
+        keep = max(offset, safe_end - 1)
+        self._buf = buf[keep - offset :]
+        self._offset = keep
+        return "".join(out)
@@ -1,6 +1,20 @@
 """Regex-based guardrail checks for user input."""
 
-import re
+from app.services.guardrails.engine import scan
+from app.services.guardrails.rules import (
+    CODE_EXECUTION,
+    PROMPT_INJECTION,
+    SELF_HARM,
+    TOXICITY,
+)
+
+# Checked in this order; the first flagged category is reported.
+_REASONS = (
+    (PROMPT_INJECTION, "prompt_injection_or_command_detected"),
+    (CODE_EXECUTION, "script_or_code_execution_detected"),
+    (SELF_HARM, "self_harm_or_violence_detected"),
+    (TOXICITY, "toxicity_detected"),
+)
 
 
 def check_query_safety(user_query: str) -> dict:
@@ -8,35 +22,8 @@ def check_query_safety(user_query: str) -> dict:
 
     Returns a dict with keys: is_safe (bool), reason (str).
     """
-    pattern_injection = re.compile(
-        r"\b(ignore previous instructions|forget everything|system prompt|bypass rules|you are now|DAN)\b"
-        r"|^\s*(/|sudo |exec )",
-        re.IGNORECASE,
-    )
-
-    pattern_code = re.compile(
-        r"(<script.*?>|javascript:|os\.system|subprocess|eval\()"
-        r"|\b(DROP TABLE|TRUNCATE TABLE|DELETE FROM|SELECT \* FROM)\b",
-        re.IGNORECASE,
-    )
-
-    pattern_harm = re.compile(
-        r"\b(kill myself|suicide|end my life|cut myself|slit my|shoot myself)\b",
-        re.IGNORECASE,
-    )
-
-    pattern_toxicity = re.compile(r"\b(hate speech word 1|hate speech word 2)\b", re.IGNORECASE)
-
-    if pattern_injection.search(user_query):
-        return {"is_safe": False, "reason": "prompt_injection_or_command_detected"}
-
-    if pattern_code.search(user_query):
-        return {"is_safe": False, "reason": "script_or_code_execution_detected"}
-
-    if pattern_harm.search(user_query):
-        return {"is_safe": False, "reason": "self_harm_or_violence_detected"}
-
-    if pattern_toxicity.search(user_query):
-        return {"is_safe": False, "reason": "toxicity_detected"}
-
+    categories = scan(user_query).categories
+    for category, reason in _REASONS:
+        if category in categories:
+            return {"is_safe": False, "reason": reason}
     return {"is_safe": True, "reason": "passed_regex_checks"}
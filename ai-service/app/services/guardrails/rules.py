@@ -0,0 +1,100 @@
+"""Guardrail rule table.
+
+Every rule has a stable id (``<category>.<n>``) and a category.  The
+engine compiles all of them into one combined pattern at import
+time; add new rules here rather than compiling regexes at call sites.
+"""
+
+from dataclasses import dataclass
+
+EMERGENCY = "emergency"
+OFF_TOPIC = "off_topic"
+PROMPT_INJECTION = "prompt_injection"
+CODE_EXECUTION = "code_execution"
+SELF_HARM = "self_harm"
+TOXICITY = "toxicity"
+PROMPT_LEAK = "prompt_leak"
+UNSAFE_MARKUP = "unsafe_markup"
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    category: str
+    pattern: str
+
+
+def _rules(category: str, patterns: list[str]) -> list[Rule]:
+    return [Rule(f"{category}.{i}", category, p) for i, p in enumerate(patterns)]
+
+
+# Immediate danger, self-harm, suicide or severe emergency (check_safety).
+# Word boundaries avoid matching substrings of unrelated words, though the
+# patterns stay broad enough to catch intent.
+EMERGENCY_PATTERNS = [
+    r"\b(suicide|kill(ing)?\s+myself|end(ing)?\s+my\s+life|want\s+to\s+die)\b",
+    r"\b(self-harm|cut(ting)?\s+myself|hurt(ing)?\s+myself)\b",
+    r"\b(overdose|swallow(ing)?\s+pills)\b",
+    r"\b(shoot(ing)?\s+myself|hang(ing)?\s+myself|jump(ing)?\s+off)\b",
+    r"\b(don'?t\s+want\s+to\s+live|can'?t\s+take\s+it\s+anymore|better\s+off\s+dead)\b",
+]
+
+# Programming and other tasks a friendly chatbot should decline (check_relevance).
+IRRELEVANT_PATTERNS = [
+    r"\b(write code|code in|javascript|python|c\+\+|java|html|css|sql|script|debug|compile)\b",
+    r"\b(how to code|write a script|function for|array|variable|database|api|json)\b",
+    r"\b(build an app|create a website|program a|developer)\b",
+]
+
+# regex_guardrail.check_query_safety, in its reporting priority order.
+INJECTION_PATTERNS = [
+    r"\b(ignore previous instructions|forget everything|system prompt|bypass rules|you are now|DAN)\b"
+    r"|^\s*(/|sudo |exec )",
+]
+CODE_PATTERNS = [
+    r"(<script.*?>|javascript:|os\.system|subprocess|eval\()"
+    r"|\b(DROP TABLE|TRUNCATE TABLE|DELETE FROM|SELECT \* FROM)\b",
+]
+HARM_PATTERNS = [
+    r"\b(kill myself|suicide|end my life|cut myself|slit my|shoot myself)\b",
+]
+TOXICITY_PATTERNS = [
+    r"\b(hate speech word 1|hate speech word 2)\b",
+]
+
+RULES: tuple[Rule, ...] = tuple(
+    _rules(EMERGENCY, EMERGENCY_PATTERNS)
+    + _rules(OFF_TOPIC, IRRELEVANT_PATTERNS)
+    + _rules(PROMPT_INJECTION, INJECTION_PATTERNS)
+    + _rules(CODE_EXECUTION, CODE_PATTERNS)
+    + _rules(SELF_HARM, HARM_PATTERNS)
+    + _rules(TOXICITY, TOXICITY_PATTERNS)
+)
+
+# --- Output rules: checked on the streamed LLM response (output.py) --------
+# Every output pattern must have a bounded width: the streaming guardrail
+# holds back at most that many characters across chunk boundaries.
+
+# Fragments of the system prompt (prompt_manager.build_system_prompt).
+PROMPT_LEAK_PATTERNS = [
+    r"\b(CRITICAL INSTRUCTIONS|BACKGROUND USER CONTEXT|You are Dear AI, an empathetic)\b",
+    r"\*\*thought\*\*",
+]
+# Markup a client rendering the reply as HTML would execute.
+UNSAFE_MARKUP_PATTERNS = [
+    r"<script\b|</script>|javascript:",
+]
+
+OUTPUT_RULES: tuple[Rule, ...] = tuple(
+    _rules(PROMPT_LEAK, PROMPT_LEAK_PATTERNS)
+    + _rules(UNSAFE_MARKUP, UNSAFE_MARKUP_PATTERNS)
+    + _rules(TOXICITY, TOXICITY_PATTERNS)
+)
+
+# What the output guardrail does on a match: "suppress" ends the reply,
+# "redact" replaces the matched text and keeps streaming.
+OUTPUT_ACTIONS = {
+    PROMPT_LEAK: "suppress",
+    UNSAFE_MARKUP: "redact",
+    TOXICITY: "redact",
+}
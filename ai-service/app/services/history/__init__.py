@@ -0,0 +1 @@
+"""Chat history services for ai_service."""
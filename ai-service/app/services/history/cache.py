@@ -0,0 +1,132 @@
+"""Two-layer cache of recent chat history per session.
+
+ai-service writes every turn to chat-service itself, so after the first
+fetch the history can be kept locally and updated write-through instead
+of re-reading ``GET /chats/{session_id}`` on every message.
+
+* Layer 1 — the ``SessionHistory`` attached to the socket's
+  ``ConnectionState`` (no lookup at all for the active session).
+* Layer 2 — a process-wide LRU keyed by ``(user_id, session_id)`` with a
+  TTL and size bound, shared across reconnects and parallel sockets.
+
+Both layers hold the same ``SessionHistory`` object, so appending a turn
+updates them together.  The GenAI ``Content`` list used by
+``stream_response`` is cached alongside the raw messages.
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from google.genai import types
+
+from app.services.llm.generate_output import build_content
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+HISTORY_LIMIT = int(os.getenv("HISTORY_LIMIT", "20"))
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", str(30 * 60)))
+HISTORY_CACHE_MAX_SESSIONS = int(os.getenv("HISTORY_CACHE_MAX_SESSIONS", "1000"))
+
+
+@dataclass
+class SessionHistory:
+    """Recent messages of one session plus their prebuilt ``Content`` list."""
+
+    user_id: str
+    session_id: str
+    messages: list[dict[str, str]] = field(default_factory=list)
+    contents: list[types.Content] = field(default_factory=list)
+    # ``summary`` covers every message up to and including the one created
+    # at ``summarized_until`` (chat-service's ``created_at``); only a fold
+    # in summary.py advances it.
+    summary: str = ""
+    summarized_until: str = ""
+    touched_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_messages(
+        cls,
+        user_id: str,
+        session_id: str,
+        messages: list[dict],
+        *,
+        summary: str = "",
+        summarized_until: str = "",
+    ) -> "SessionHistory":
+        history = cls(
+            user_id=user_id,
+            session_id=session_id,
+            summary=summary,
+            summarized_until=summarized_until,
+        )
+        for msg in messages[-HISTORY_LIMIT:]:
+            history.messages.append(
+                {
+                    "role": msg.get("role", "user"),
+                    "content": msg.get("content", ""),
+                    "created_at": msg.get("created_at") or "",
+                }
+            )
+        history.contents = [build_content(msg) for msg in history.messages]
+        return history
+
+    def append(self, role: str, content: str, created_at: str = "") -> None:
+        """Append a message, keeping only the most recent ``HISTORY_LIMIT``.
+
+        *created_at* is the timestamp the message is stored with in
+        chat-service; a summary fold uses it as its watermark.  Summaries
+        normally fold older turns long before the limit is hit.
+        """
+        msg = {"role": role, "content": content, "created_at": created_at}
+        self.messages.append(msg)
+        self.contents.append(build_content(msg))
+        if len(self.messages) > HISTORY_LIMIT:
+            metrics.incr("history_cache.trimmed", len(self.messages) - HISTORY_LIMIT)
+            del self.messages[:-HISTORY_LIMIT]
+            del self.contents[:-HISTORY_LIMIT]
+        self.touched_at = time.monotonic()
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.touched_at <= HISTORY_CACHE_TTL
+
+
+# ---------------------------------------------------------------------------
+# Layer 2: process-wide LRU
+# ---------------------------------------------------------------------------
+
+_cache: OrderedDict[tuple[str, str], SessionHistory] = OrderedDict()
+
+
+def get_history(user_id: str, session_id: str) -> SessionHistory | None:
+    """Return the cached history for a session, or None on miss/expiry."""
+    key = (user_id, session_id)
+    history = _cache.get(key)
+    if history is None:
+        return None
+    if not history.is_fresh():
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    history.touched_at = time.monotonic()
+    return history
+
+
+def put_history(history: SessionHistory) -> None:
+    """Insert or refresh a session's history, evicting the least recent entries."""
+    key = (history.user_id, history.session_id)
+    _cache[key] = history
+    _cache.move_to_end(key)
+    while len(_cache) > HISTORY_CACHE_MAX_SESSIONS:
+        _cache.popitem(last=False)
+        metrics.incr("history_cache.evictions")
+
+
+def cache_stats() -> dict:
+    return {"sessions": len(_cache), "max_sessions": HISTORY_CACHE_MAX_SESSIONS}
+
+
+metrics.register_provider("history_cache", cache_stats)
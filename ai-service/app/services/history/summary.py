@@ -0,0 +1,137 @@
+"""Rolling per-session summaries that keep the prompt size bounded.
+
+Once a cached ``SessionHistory`` holds more than
+``SUMMARY_TRIGGER_MESSAGES`` messages, a background task folds all but
+the last ``SUMMARY_TAIL_MESSAGES`` into the session's summary with one
+call to a cheap model (``SUMMARY_MODEL``).  The folded messages are then
+dropped from the history, so ``stream_response`` receives the summary
+plus a short tail of recent turns instead of an ever-growing list, and
+turns past ``HISTORY_LIMIT`` are summarised instead of silently lost.
+
+The summary and the ``created_at`` of the newest message it covers are
+stored in chat-service (``PUT /sessions/{id}/summary``), so a cold load
+fetches only the messages created after that watermark.  A failed summary leaves the history as it
+was; the next turn tries again.
+"""
+
+import asyncio
+import logging
+import os
+from collections.abc import Callable
+
+from google.genai import types
+
+from app.services.history.cache import SessionHistory
+from app.utils import metrics
+from app.utils.http_client import get_chat_client
+from app.utils.rate_limit import BACKGROUND, get_vertex_limiter
+from app.utils.setup_client import get_client
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_TRIGGER_MESSAGES = int(os.getenv("SUMMARY_TRIGGER_MESSAGES", "16"))
+SUMMARY_TAIL_MESSAGES = int(os.getenv("SUMMARY_TAIL_MESSAGES", "6"))
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gemini-2.5-flash-lite")
+SUMMARY_MAX_WORDS = int(os.getenv("SUMMARY_MAX_WORDS", "200"))
+
+_in_progress: set[tuple[str, str]] = set()
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _summary_prompt(previous: str, messages: list[dict[str, str]]) -> str:
+    transcript = "\n".join(
+        f"{'AI' if msg['role'] == 'ai' else 'User'}: {msg['content']}" for msg in messages
+    )
+    return (
+        "You maintain a running summary of a conversation between a user and their "
+        "supportive AI companion. Update the summary with the new messages. Keep facts "
+        "about the user, their feelings, people and events they mentioned, and anything "
+        "the AI promised or suggested. Write plain prose in the third person, at most "
+        f"{SUMMARY_MAX_WORDS} words. Return ONLY the updated summary.\n\n"
+        f"Current summary:\n{previous or '(none yet)'}\n\n"
+        f"New messages:\n{transcript}"
+    )
+
+
+async def _generate_summary(previous: str, messages: list[dict[str, str]]) -> str:
+    client, model = get_client()
+    response = await get_vertex_limiter().call(
+        lambda: client.aio.models.generate_content(
+            model=SUMMARY_MODEL or model,
+            contents=_summary_prompt(previous, messages),
+            config=types.GenerateContentConfig(temperature=0.2),
+        ),
+        label="Session summary",
+        priority=BACKGROUND,
+    )
+    return (response.text or "").strip()
+
+
+async def summarize_session(history: SessionHistory, token_factory: Callable[[str], str]) -> bool:
+    """Fold the older messages of *history* into its summary. Returns True on success."""
+    fold = history.messages[: max(0, len(history.messages) - SUMMARY_TAIL_MESSAGES)]
+    if not fold:
+        return False
+    try:
+        with metrics.timed("summary.generate"):
+            summary = await _generate_summary(history.summary, fold)
+    except Exception as exc:
+        metrics.incr("summary.errors")
+        logger.warning("Summary of session %s failed: %s", history.session_id, exc)
+        return False
+    if not summary:
+        return False
+
+    # Turns appended meanwhile are fine; give up if the folded prefix changed.
+    if history.messages[: len(fold)] != fold:
+        return False
+    del history.messages[: len(fold)]
+    del history.contents[: len(fold)]
+    history.summary = summary
+    history.summarized_until = fold[-1].get("created_at") or history.summarized_until
+    metrics.incr("summary.folded_messages", len(fold))
+
+    try:
+        resp = await get_chat_client().put(
+            f"/sessions/{history.session_id}/summary",
+            json={"summary": summary, "last_message_at": history.summarized_until or None},
+            headers={"X-Internal-Auth": token_factory(history.user_id)},
+        )
+        if resp.status_code != 200:
+            logger.warning("Saving summary of session %s failed: %s", history.session_id, resp.text)
+    except Exception as exc:
+        # The cached summary is still used; it is saved again after the next fold.
+        logger.warning("Saving summary of session %s failed: %s", history.session_id, exc)
+    return True
+
+
+def schedule_summary(
+    history: SessionHistory, token_factory: Callable[[str], str]
+) -> asyncio.Task | None:
+    """Start a background summary when *history* has grown past the trigger."""
+    key = (history.user_id, history.session_id)
+    if len(history.messages) <= SUMMARY_TRIGGER_MESSAGES or key in _in_progress:
+        return None
+
+    async def _run() -> None:
+        try:
+            await summarize_session(history, token_factory)
+        finally:
+            _in_progress.discard(key)
+
+    _in_progress.add(key)
+    task = asyncio.create_task(_run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def fetch_summary(session_id: str, token: str) -> tuple[str, str]:
+    """Return ``(summary, last_message_at)`` stored for a session (empty if none)."""
+    resp = await get_chat_client().get(
+        f"/sessions/{session_id}/summary", headers={"X-Internal-Auth": token}
+    )
+    if resp.status_code != 200:
+        return "", ""
+    data = resp.json()
+    return data.get("summary") or "", data.get("last_message_at") or ""
@@ -0,0 +1,300 @@
+"""Write-behind persistence of chat turns to chat-service.
+
+``_handle_message`` only enqueues a finished turn; a background flusher
+sends queued messages to ``POST /chats/batch`` once the batch size or
+flush interval is reached, retrying with exponential backoff.  When
+chat-service stays unreachable the batch is spilled to a local SQLite
+spool and replayed once chat-service is healthy again, so turns survive
+outages and restarts.
+
+Every message carries a client-generated id and timestamp, which makes
+retries and spool replays idempotent on the chat-service side.  Only a
+validation error (400/422) drops a batch; anything else, including an
+auth error (retried with a freshly minted token), keeps it for a retry.
+"""
+
+import asyncio
+import contextlib
+import datetime
+import logging
+import os
+import random
+import sqlite3
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+
+from app.utils import metrics
+from app.utils.http_client import get_chat_client
+from app.utils.ids import uuid7
+
+logger = logging.getLogger(__name__)
+
+CHAT_WRITER_BATCH_SIZE = int(os.getenv("CHAT_WRITER_BATCH_SIZE", "50"))
+CHAT_WRITER_FLUSH_INTERVAL = float(os.getenv("CHAT_WRITER_FLUSH_INTERVAL", "1.0"))
+CHAT_WRITER_MAX_RETRIES = int(os.getenv("CHAT_WRITER_MAX_RETRIES", "3"))
+CHAT_WRITER_RETRY_BASE = float(os.getenv("CHAT_WRITER_RETRY_BASE", "0.5"))
+CHAT_SPOOL_PATH = os.getenv("CHAT_SPOOL_PATH", "/tmp/dear-ai-chat-spool.sqlite3")
+CHAT_SPOOL_REPLAY_INTERVAL = float(os.getenv("CHAT_SPOOL_REPLAY_INTERVAL", "30"))
+
+# Statuses that retrying cannot fix: the payload itself is invalid.
+_REJECTED_STATUSES = {400, 422}
+_AUTH_STATUSES = {401, 403}
+
+
+@dataclass
+class PendingMessage:
+    """A chat message waiting to be persisted."""
+
+    id: str
+    user_id: str
+    session_id: str
+    role: str
+    content: str
+    created_at: str
+
+    def to_payload(self) -> dict:
+        return {
+            "id": self.id,
+            "session_id": self.session_id,
+            "role": self.role,
+            "content": self.content,
+            "created_at": self.created_at,
+        }
+
+
+class _Spool:
+    """SQLite-backed overflow store, accessed from worker threads only."""
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            " id TEXT PRIMARY KEY, user_id TEXT, session_id TEXT,"
+            " role TEXT, content TEXT, created_at TEXT)"
+        )
+        self._conn.commit()
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def add(self, messages: list[PendingMessage]) -> None:
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO spool VALUES "
+            "(:id, :user_id, :session_id, :role, :content, :created_at)",
+            [asdict(msg) for msg in messages],
+        )
+        self._conn.commit()
+
+    def peek(self, limit: int) -> list[PendingMessage]:
+        rows = self._conn.execute(
+            "SELECT id, user_id, session_id, role, content, created_at"
+            " FROM spool ORDER BY created_at LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [PendingMessage(*row) for row in rows]
+
+    def remove(self, ids: list[str]) -> None:
+        self._conn.executemany("DELETE FROM spool WHERE id = ?", [(i,) for i in ids])
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class ChatWriter:
+    """Queue + background flusher for chat messages."""
+
+    def __init__(self, token_factory: Callable[..., str]) -> None:
+        # Called as token_factory(user_id, fresh=bool); see mint_internal_token.
+        self._token_factory = token_factory
+        self._queue: list[PendingMessage] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._spool: _Spool | None = None
+        self._spool_rows = 0
+        self._last_replay = 0.0
+
+    async def start(self) -> None:
+        if CHAT_SPOOL_PATH:
+            try:
+                self._spool = await asyncio.to_thread(_Spool, CHAT_SPOOL_PATH)
+                self._spool_rows = await asyncio.to_thread(self._spool.count)
+            except sqlite3.Error as exc:
+                logger.error("Chat spool unavailable at %s: %s", CHAT_SPOOL_PATH, exc)
+                self._spool = None
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher, draining the queue (to chat-service or the spool)."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self._flush()
+        if self._spool is not None:
+            await asyncio.to_thread(self._spool.close)
+            self._spool = None
+
+    def enqueue_turn(
+        self, user_id: str, session_id: str, user_content: str, ai_content: str
+    ) -> tuple[str, str]:
+        """Queue the user and AI messages of one turn without blocking.
+
+        Returns the ``created_at`` the two messages are stored with.
+        """
+        now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+        stamps = []
+        for offset, (role, content) in enumerate((("user", user_content), ("ai", ai_content))):
+            # Offset the AI message so ordering by created_at is stable.
+            created_at = (now + datetime.timedelta(microseconds=offset)).isoformat()
+            stamps.append(created_at)
+            self._queue.append(
+                PendingMessage(uuid7(), user_id, session_id, role, content, created_at)
+            )
+        metrics.incr("chat_writer.enqueued", 2)
+        if len(self._queue) >= CHAT_WRITER_BATCH_SIZE:
+            self._wakeup.set()
+        return stamps[0], stamps[1]
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), CHAT_WRITER_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                await self._flush()
+                if self._spool_rows and (
+                    time.monotonic() - self._last_replay >= CHAT_SPOOL_REPLAY_INTERVAL
+                ):
+                    await self._replay_spool()
+            except Exception as exc:
+                logger.error("Chat writer flush failed: %s", exc)
+
+    async def _flush(self) -> None:
+        while self._queue:
+            batch = self._queue[:CHAT_WRITER_BATCH_SIZE]
+            del self._queue[:CHAT_WRITER_BATCH_SIZE]
+            try:
+                failed = await self._send(batch)
+            except asyncio.CancelledError:
+                # Shutting down mid-send: requeue so stop() drains it.
+                self._queue[:0] = batch
+                raise
+            if failed:
+                await self._spill(failed)
+
+    async def _send(self, messages: list[PendingMessage]) -> list[PendingMessage]:
+        """Send *messages* (one request per user); return the ones that failed."""
+        by_user: dict[str, list[PendingMessage]] = {}
+        for msg in messages:
+            by_user.setdefault(msg.user_id, []).append(msg)
+
+        failed: list[PendingMessage] = []
+        for user_id, user_messages in by_user.items():
+            if not await self._post_with_retry(user_id, user_messages):
+                failed.extend(user_messages)
+        return failed
+
+    async def _post_with_retry(self, user_id: str, messages: list[PendingMessage]) -> bool:
+        """POST one user's messages; True once they are saved or rejected as invalid."""
+        payload = {"messages": [msg.to_payload() for msg in messages]}
+        fresh_token = False
+        for attempt in range(CHAT_WRITER_MAX_RETRIES):
+            try:
+                resp = await get_chat_client().post(
+                    "/chats/batch",
+                    json=payload,
+                    headers={"X-Internal-Auth": self._token_factory(user_id, fresh=fresh_token)},
+                )
+                if resp.status_code == 200:
+                    metrics.incr("chat_writer.batches")
+                    metrics.incr("chat_writer.saved", len(messages))
+                    return True
+                if resp.status_code in _REJECTED_STATUSES:
+                    # Invalid payload; spooling would only replay the same error.
+                    for msg in messages:
+                        logger.error(
+                            "Dropping chat message %s of session %s: chat-service "
+                            "rejected it (status=%s): %s",
+                            msg.id,
+                            msg.session_id,
+                            resp.status_code,
+                            resp.text,
+                        )
+                    metrics.incr("chat_writer.dropped", len(messages))
+                    return True
+                # Expired or mis-minted token: retry with a new one.
+                fresh_token = resp.status_code in _AUTH_STATUSES
+                logger.warning("chat-service batch save returned %s", resp.status_code)
+            except Exception as exc:
+                logger.warning("chat-service batch save failed: %s", exc)
+
+            metrics.incr("chat_writer.retries")
+            if attempt < CHAT_WRITER_MAX_RETRIES - 1:
+                delay = CHAT_WRITER_RETRY_BASE * (2**attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+        return False
+
+    async def _spill(self, messages: list[PendingMessage]) -> None:
+        if self._spool is None:
+            logger.error("Dropping %d chat messages: chat-service down and no spool", len(messages))
+            metrics.incr("chat_writer.dropped", len(messages))
+            return
+        await asyncio.to_thread(self._spool.add, messages)
+        self._spool_rows = await asyncio.to_thread(self._spool.count)
+        metrics.incr("chat_writer.spooled", len(messages))
+        logger.warning("Spooled %d chat messages to %s", len(messages), CHAT_SPOOL_PATH)
+
+    async def _replay_spool(self) -> None:
+        """Re-send spooled messages oldest first; stop at the first failure."""
+        self._last_replay = time.monotonic()
+        while self._spool is not None and self._spool_rows:
+            batch = await asyncio.to_thread(self._spool.peek, CHAT_WRITER_BATCH_SIZE)
+            if not batch:
+                self._spool_rows = 0
+                return
+            failed = {msg.id for msg in await self._send(batch)}
+            sent = [msg.id for msg in batch if msg.id not in failed]
+            if sent:
+                await asyncio.to_thread(self._spool.remove, sent)
+                metrics.incr("chat_writer.replayed", len(sent))
+            self._spool_rows = await asyncio.to_thread(self._spool.count)
+            if failed:
+                return
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "spooled": self._spool_rows,
+            "spool_enabled": self._spool is not None,
+        }
+
+
+_writer: ChatWriter | None = None
+
+
+async def start_chat_writer(token_factory: Callable[..., str]) -> ChatWriter:
+    """Create and start the process-wide chat writer (called from the lifespan)."""
+    global _writer
+    if _writer is None:
+        _writer = ChatWriter(token_factory)
+        await _writer.start()
+        metrics.register_provider("chat_writer", _writer.stats)
+    return _writer
+
+
+async def stop_chat_writer() -> None:
+    """Drain and stop the chat writer."""
+    global _writer
+    if _writer is not None:
+        await _writer.stop()
+        _writer = None
+
+
+def get_chat_writer() -> ChatWriter:
+    """Return the running chat writer."""
+    if _writer is None:
+        raise RuntimeError("Chat writer is not running")
+    return _writer
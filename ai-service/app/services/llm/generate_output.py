@@ -1,62 +1,102 @@
 """LLM streaming helpers."""
 
 import asyncio
+import contextlib
 import logging
+import time
 from collections.abc import AsyncGenerator
-from typing import List, Dict
 
 from google.genai import types
 
-from app.services.llm.prompt_manager import build_system_prompt
+from app.services.llm.hedge import LLM_HEDGE, hedged_stream, record_ttft
+from app.services.llm.prompt_budget import assemble_prompt
+from app.utils.rate_limit import get_vertex_limiter
 from app.utils.setup_client import get_client
 
 logger = logging.getLogger(__name__)
 
 
+def build_content(msg: dict[str, str]) -> types.Content:
+    """Convert a chat-service message dict into a GenAI ``Content``."""
+    # Map roles: 'ai' -> 'model', 'user' -> 'user'
+    role = "model" if msg.get("role") == "ai" else "user"
+    return types.Content(role=role, parts=[types.Part.from_text(text=msg.get("content", ""))])
+
+
+async def _stream_texts(
+    client, model: str, contents: list[types.Content], config: types.GenerateContentConfig
+) -> AsyncGenerator[str, None]:
+    """Open one Gemini stream and yield its text, recording time to first token."""
+    start = time.perf_counter()
+    response_stream = await client.aio.models.generate_content_stream(
+        model=str(model),
+        contents=contents,
+        config=config,
+    )
+    first = True
+    async for chunk in response_stream:
+        if chunk.text:
+            if first:
+                record_ttft(time.perf_counter() - start)
+                first = False
+            yield chunk.text
+
+
 async def stream_response(
     user_query: str,
     graph_context: str,
-    history: List[Dict[str, str]] = None,
+    history: list[dict[str, str]] | None = None,
     emotion: str | None = None,
+    history_contents: list[types.Content] | None = None,
+    summary: str | None = None,
 ) -> AsyncGenerator[str, None]:
-    """Stream model output for a user query with optional context, chat history, and emotion."""
+    """Stream model output for a user query with optional context, chat history, and emotion.
+
+    When *history_contents* is given (e.g. from the session history cache)
+    it is used as-is instead of rebuilding ``Content`` objects from *history*.
+    *summary* is the session's rolling summary of turns no longer in the
+    history.  The prompt is trimmed to ``PROMPT_TOKEN_BUDGET`` by
+    ``assemble_prompt``.
+    """
     client, model = get_client()
 
-    system_instruction = build_system_prompt(graph_context, emotion)
+    # Build contents from history unless the cached Contents were passed in.
+    if history_contents is None:
+        history_contents = [build_content(msg) for msg in history or []]
+
+    # Fit system prompt, query, history and graph context into the token budget.
+    plan = assemble_prompt(user_query, graph_context, history_contents, emotion, summary)
+    logger.info(
+        "Prompt tokens ~%d (%s); dropped %d history messages%s",
+        plan.tokens["total"],
+        ", ".join(f"{k}={v}" for k, v in plan.tokens.items() if k != "total"),
+        plan.dropped_messages,
+        ", graph context truncated" if plan.context_truncated else "",
+    )
+    contents = plan.contents
 
     config = types.GenerateContentConfig(
-        system_instruction=system_instruction,
+        system_instruction=plan.system_instruction,
         temperature=0.6,
     )
 
-    # Build contents from history
-    contents = []
-    if history:
-        for msg in history:
-            # Map roles: 'ai' -> 'model', 'user' -> 'user'
-            role = "model" if msg.get("role") == "ai" else "user"
-            contents.append(
-                types.Content(
-                    role=role, parts=[types.Part.from_text(text=msg.get("content", ""))]
-                )
-            )
+    # Retries only happen before any text was yielded, so the client never
+    # sees a repeated prefix; quota waits are shared via the limiter.
+    limiter = get_vertex_limiter()
 
-    # Append the current user query
-    contents.append(
-        types.Content(role="user", parts=[types.Part.from_text(text=user_query)])
-    )
+    def _open() -> AsyncGenerator[str, None]:
+        return _stream_texts(client, model, contents, config)
 
-    for attempt in range(3):
+    attempt = 0
+    while True:
+        await limiter.acquire()
+        started = False
         try:
-            response_stream = await client.aio.models.generate_content_stream(
-                model=str(model),
-                contents=contents,
-                config=config,
-            )
-
-            async for chunk in response_stream:
-                if chunk.text:
-                    yield chunk.text
+            texts = hedged_stream(_open) if LLM_HEDGE else _open()
+            async with contextlib.aclosing(texts):
+                async for text in texts:
+                    started = True
+                    yield text
 
             return  # Success, exit the retry loop
 
@@ -64,14 +104,17 @@ async def stream_response(
             logger.info("LLM generation cancelled")
             raise
         except Exception as exc:
-            if "429" in str(exc) and attempt < 2:
+            delay = None if started else limiter.backoff(exc, attempt)
+            if delay is not None:
                 logger.warning(
-                    "Hit 429 Quota limit on Vertex AI. Retrying in 2 seconds (attempt %d/3)...",
+                    "Hit 429 Quota limit on Vertex AI. Retrying in %.1f seconds (attempt %d/%d)...",
+                    delay,
                     attempt + 1,
+                    limiter.max_attempts,
                 )
-                await asyncio.sleep(2)
+                attempt += 1
                 continue
 
             logger.error("LLM generation failed: %s", exc)
-            yield f"I'm having a little trouble connecting my thoughts right now. Could we try that again?"
+            yield "I'm having a little trouble connecting my thoughts right now. Could we try that again?"
             return
@@ -0,0 +1,127 @@
+"""Hedged LLM streams for a faster first token.
+
+The first Gemini token dominates a turn's latency and its tail is
+erratic.  With ``LLM_HEDGE`` on, ``hedged_stream`` opens the usual
+stream and, if no text has arrived after the ``LLM_HEDGE_PERCENTILE``
+of recent time-to-first-token (``llm.ttft``), opens an identical second
+one.  Whichever yields text first is streamed to the caller; the other
+is cancelled.
+
+Hedges are limited to ``LLM_HEDGE_BUDGET`` (a fraction) of requests and
+are only sent when the shared Vertex rate limiter has a token free, so
+hedging never adds to a quota problem.  Hedge and win rates are
+reported under ``llm_hedge`` on ``GET /metrics``.
+"""
+
+import asyncio
+import contextlib
+import os
+from collections.abc import AsyncIterator, Callable
+
+from app.utils import metrics
+from app.utils.rate_limit import get_vertex_limiter
+
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+# Floor for the threshold, and the threshold until enough TTFTs are known.
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.3"))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "2.0"))
+LLM_HEDGE_MIN_SAMPLES = 20
+
+TTFT_METRIC = "llm.ttft"
+
+_stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "ttft_samples": 0}
+
+
+def record_ttft(seconds: float) -> None:
+    """Record one stream's time to first token (feeds the hedge threshold)."""
+    metrics.observe(TTFT_METRIC, seconds)
+    _stats["ttft_samples"] += 1
+
+
+def hedge_delay() -> float:
+    """Seconds to wait for the first token before sending a hedge."""
+    if _stats["ttft_samples"] < LLM_HEDGE_MIN_SAMPLES:
+        return LLM_HEDGE_DEFAULT_DELAY
+    threshold = metrics.percentile(TTFT_METRIC, LLM_HEDGE_PERCENTILE)
+    return max(LLM_HEDGE_MIN_DELAY, threshold or LLM_HEDGE_DEFAULT_DELAY)
+
+
+def _within_budget() -> bool:
+    return _stats["hedged"] + 1 <= LLM_HEDGE_BUDGET * _stats["requests"]
+
+
+async def _next_text(stream: AsyncIterator[str]) -> str | None:
+    return await anext(stream, None)
+
+
+async def hedged_stream(open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+    """Stream from ``open_stream()``, hedging with a second call on a slow first token.
+
+    *open_stream* must return a fresh async iterator of text each call.
+    Errors from one stream are ignored while the other can still win; if
+    both fail, the primary's error is raised.
+    """
+    _stats["requests"] += 1
+    primary = open_stream()
+    streams = {asyncio.create_task(_next_text(primary)): primary}
+    winner: AsyncIterator[str] | None = None
+    first: str | None = None
+    try:
+        done, _ = await asyncio.wait(streams, timeout=hedge_delay())
+        if not done and _within_budget() and get_vertex_limiter().try_acquire():
+            _stats["hedged"] += 1
+            metrics.incr("llm.hedged")
+            hedge = open_stream()
+            streams[asyncio.create_task(_next_text(hedge))] = hedge
+
+        error: BaseException | None = None
+        pending = set(streams)
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Prefer the primary if both finished in the same wake-up.
+            for task in sorted(done, key=lambda t: streams[t] is not primary):
+                exc = task.exception()
+                if exc is None:
+                    winner, first = streams[task], task.result()
+                    break
+                if error is None or streams[task] is primary:
+                    error = exc
+        if winner is None:
+            raise error
+        if winner is not primary:
+            _stats["hedge_wins"] += 1
+            metrics.incr("llm.hedge_wins")
+    finally:
+        for task, stream in streams.items():
+            if stream is winner:
+                continue
+            task.cancel()
+            with contextlib.suppress(BaseException):
+                await task
+            with contextlib.suppress(Exception):
+                await stream.aclose()
+
+    async with contextlib.aclosing(winner):
+        if first is None:
+            return
+        yield first
+        async for text in winner:
+            yield text
+
+
+def stats() -> dict:
+    requests, hedged = _stats["requests"], _stats["hedged"]
+    return {
+        "enabled": LLM_HEDGE,
+        "requests": requests,
+        "hedged": hedged,
+        "hedge_wins": _stats["hedge_wins"],
+        "hedge_rate": round(hedged / requests, 4) if requests else 0.0,
+        "win_rate": round(_stats["hedge_wins"] / hedged, 4) if hedged else 0.0,
+        "threshold_seconds": round(hedge_delay(), 3),
+    }
+
+
+metrics.register_provider("llm_hedge", stats)
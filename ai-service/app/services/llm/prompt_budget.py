@@ -0,0 +1,185 @@
+"""Token-budgeted prompt assembly for ``stream_response``.
+
+History, the system prompt and the graph context used to be forwarded
+verbatim, so prompt size (and prefill latency) grew without bound.
+``assemble_prompt`` fills ``PROMPT_TOKEN_BUDGET`` in priority order:
+
+1. system instructions, the session summary and the current query
+   (always kept);
+2. the most recent history exchanges, up to ``PROMPT_RECENT_MESSAGES``
+   messages;
+3. the graph context (truncated at a line boundary to fit);
+4. older exchanges, newest first.
+
+History is kept as a contiguous tail of whole exchanges (a user message
+and the model replies after it), so it always starts on a user turn;
+the first exchange that does not fit stops it.  Messages are never split.  Tokens are estimated locally
+(about four characters per token for Gemini models), which is close
+enough for budgeting and costs no API call.  Per-turn counts are on
+``GET /metrics`` under ``prompt``.
+"""
+
+import os
+from dataclasses import dataclass, field
+
+from google.genai import types
+
+from app.services.llm.prompt_manager import build_system_prompt
+from app.utils import metrics
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+PROMPT_RECENT_MESSAGES = int(os.getenv("PROMPT_RECENT_MESSAGES", "6"))
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4  # role and turn delimiters
+MIN_CONTEXT_TOKENS = 32  # a shorter fragment of graph context is not worth sending
+
+_NO_CONTEXT = "No prior context found"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate for *text*."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def content_text(content: types.Content) -> str:
+    return "".join(part.text or "" for part in content.parts or ())
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut *text* to about *max_tokens*, preferring a line or word boundary."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    if limit <= 0:
+        return ""
+    cut = text[:limit]
+    for sep in ("\n", " "):
+        idx = cut.rfind(sep)
+        if idx >= limit // 2:
+            return cut[:idx].rstrip()
+    return cut
+
+
+@dataclass
+class PromptPlan:
+    system_instruction: str
+    contents: list[types.Content]
+    tokens: dict[str, int] = field(default_factory=dict)
+    dropped_messages: int = 0
+    context_truncated: bool = False
+
+
+def assemble_prompt(
+    user_query: str,
+    graph_context: str,
+    history_contents: list[types.Content],
+    emotion: str | None = None,
+    summary: str | None = None,
+    *,
+    budget: int = PROMPT_TOKEN_BUDGET,
+    recent_messages: int = PROMPT_RECENT_MESSAGES,
+) -> PromptPlan:
+    """Build the system instruction and contents for one turn within *budget* tokens."""
+    system_tokens = estimate_tokens(build_system_prompt("", emotion, summary))
+    query_tokens = estimate_tokens(user_query) + MESSAGE_OVERHEAD_TOKENS
+    remaining = budget - system_tokens - query_tokens
+
+    sizes = [estimate_tokens(content_text(c)) + MESSAGE_OVERHEAD_TOKENS for c in history_contents]
+    start = len(sizes)  # history_contents[start:] is kept
+
+    # (first index, tokens) of each exchange, oldest first; anything before
+    # the first user message can never be kept.
+    exchanges: list[tuple[int, int]] = []
+    end = len(sizes)
+    for i in range(len(sizes) - 1, -1, -1):
+        if history_contents[i].role == "user":
+            exchanges.append((i, sum(sizes[i:end])))
+            end = i
+    exchanges.reverse()
+
+    # Most recent exchanges first.
+    recent_tokens = 0
+    while (
+        exchanges
+        and len(sizes) - exchanges[-1][0] <= recent_messages
+        and exchanges[-1][1] <= remaining
+    ):
+        start, cost = exchanges.pop()
+        remaining -= cost
+        recent_tokens += cost
+
+    # Then the graph context, truncated to what is left.
+    context = graph_context or ""
+    truncated = False
+    if context and _NO_CONTEXT not in context:
+        fitted = truncate_to_tokens(context, max(remaining, 0))
+        if fitted != context and estimate_tokens(fitted) < MIN_CONTEXT_TOKENS:
+            fitted = ""
+        truncated = fitted != context
+        context = fitted
+    context_tokens = estimate_tokens(context) if context and _NO_CONTEXT not in context else 0
+    remaining -= context_tokens
+
+    # Older exchanges with whatever budget remains.
+    older_tokens = 0
+    while exchanges and exchanges[-1][1] <= remaining:
+        start, cost = exchanges.pop()
+        remaining -= cost
+        older_tokens += cost
+
+    contents = list(history_contents[start:])
+    contents.append(types.Content(role="user", parts=[types.Part.from_text(text=user_query)]))
+    tokens = {
+        "system": system_tokens,
+        "query": query_tokens,
+        "recent": recent_tokens,
+        "context": context_tokens,
+        "older": older_tokens,
+        "total": system_tokens + query_tokens + recent_tokens + context_tokens + older_tokens,
+    }
+    plan = PromptPlan(
+        system_instruction=build_system_prompt(context, emotion, summary),
+        contents=contents,
+        tokens=tokens,
+        dropped_messages=start,
+        context_truncated=truncated,
+    )
+    _record(plan, budget)
+    return plan
+
+
+_stats = {
+    "turns": 0,
+    "tokens_total": 0,
+    "tokens_max": 0,
+    "over_budget": 0,
+    "dropped_messages": 0,
+    "context_truncated": 0,
+}
+_last: dict[str, int] = {}
+
+
+def _record(plan: PromptPlan, budget: int) -> None:
+    total = plan.tokens["total"]
+    _stats["turns"] += 1
+    _stats["tokens_total"] += total
+    _stats["tokens_max"] = max(_stats["tokens_max"], total)
+    _stats["over_budget"] += total > budget
+    _stats["dropped_messages"] += plan.dropped_messages
+    _stats["context_truncated"] += plan.context_truncated
+    _last.clear()
+    _last.update(plan.tokens)
+
+
+def stats() -> dict:
+    turns = _stats["turns"]
+    return {
+        "budget": PROMPT_TOKEN_BUDGET,
+        **_stats,
+        "tokens_avg": round(_stats["tokens_total"] / turns, 1) if turns else 0.0,
+        "last_turn": dict(_last),
+    }
+
+
+metrics.register_provider("prompt", stats)
@@ -1,8 +1,10 @@
 """Prompt construction for the LLM."""
 
 
-def build_system_prompt(graph_context: str, emotion: str | None = None) -> str:
-    """Create the system prompt with optional graph context and emotion appended."""
+def build_system_prompt(
+    graph_context: str, emotion: str | None = None, summary: str | None = None
+) -> str:
+    """Create the system prompt with optional graph context, emotion and session summary appended."""
     base_instructions = (
         "You are Dear AI, an empathetic, highly conversational companion. "
         "Your goal is to provide thoughtful, supportive, and natural responses. "
@@ -39,5 +41,12 @@ def build_system_prompt(graph_context: str, emotion: str | None = None) -> str:
             "-------------------------------\n"
         )
 
-    return base_instructions + context_block
+    summary_block = ""
+    if summary:
+        summary_block = (
+            "\n--- EARLIER IN THIS CONVERSATION (summary) ---\n"
+            f"{summary}\n"
+            "-------------------------------\n"
+        )
 
+    return base_instructions + context_block + summary_block
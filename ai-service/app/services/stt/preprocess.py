@@ -0,0 +1,244 @@
+"""Local audio preprocessing before upload to Google STT.
+
+Client recordings arrive as 48 kHz (often stereo) WEBM_OPUS with silence
+at both ends.  Before upload the audio is decoded, downmixed to mono,
+resampled to 16 kHz (all the recogniser needs for speech), trimmed with
+an energy-based voice-activity detector and re-encoded compactly
+(OGG_OPUS by default).  Smaller uploads mean lower STT latency.
+
+Recordings longer than ``STT_SEGMENT_SECONDS`` are additionally split at
+the quietest point near each segment limit so they can be transcribed in
+parallel (see ``transcribe_audio``).
+
+Decoding and encoding use PyAV + numpy from the optional ``audio``
+extra; without them the audio is passed through unchanged.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+from app.utils import metrics
+
+try:
+    import av
+    import numpy as np
+except ImportError:  # optional "audio" extra
+    av = None
+    np = None
+
+logger = logging.getLogger(__name__)
+
+STT_PREPROCESS = os.getenv("STT_PREPROCESS", "true").lower() in ("1", "true", "yes")
+STT_TARGET_SAMPLE_RATE = 16000
+STT_UPLOAD_ENCODING = os.getenv("STT_UPLOAD_ENCODING", "OGG_OPUS")
+STT_OPUS_BITRATE = int(os.getenv("STT_OPUS_BITRATE", "24000"))
+STT_VAD_MIN_RMS = float(os.getenv("STT_VAD_MIN_RMS", "300"))
+STT_VAD_PAD_MS = int(os.getenv("STT_VAD_PAD_MS", "200"))
+STT_SEGMENT_SECONDS = float(os.getenv("STT_SEGMENT_SECONDS", "30"))
+
+VAD_FRAME_MS = 20
+
+# Google STT encoding name -> (PyAV container format, codec)
+_ENCODERS = {"OGG_OPUS": ("ogg", "libopus"), "FLAC": ("flac", "flac")}
+
+
+@dataclass(frozen=True)
+class PreparedAudio:
+    """Audio ready for upload, with the config Google needs to decode it.
+
+    ``segments`` holds one upload per recognize call, in order: a single
+    entry for normal clips, several for split long recordings and none
+    when the recording was only silence.
+    """
+
+    segments: tuple[bytes, ...]
+    encoding: str
+    sample_rate_hertz: int
+    bytes_in: int
+    seconds_in: float | None = None
+    seconds_out: float | None = None
+
+    @property
+    def bytes_out(self) -> int:
+        return sum(len(segment) for segment in self.segments)
+
+    @property
+    def reduction(self) -> float:
+        """Fraction of the original upload size that was saved."""
+        return 1 - self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+
+
+def preprocessing_available() -> bool:
+    return av is not None and np is not None
+
+
+def decode_to_pcm(audio: bytes, *, encoding: str, sample_rate_hertz: int) -> "np.ndarray":
+    """Decode *audio* to 16 kHz mono int16 PCM."""
+    buf = io.BytesIO(audio)
+    if encoding == "LINEAR16" and not audio.startswith(b"RIFF"):
+        # Headerless PCM: tell FFmpeg how to read it.
+        container = av.open(
+            buf, format="s16le", options={"sample_rate": str(sample_rate_hertz), "channels": "1"}
+        )
+    else:
+        container = av.open(buf)
+
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=STT_TARGET_SAMPLE_RATE)
+    chunks = []
+    with container:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                chunks.append(out.to_ndarray().reshape(-1))
+        for out in resampler.resample(None):
+            chunks.append(out.to_ndarray().reshape(-1))
+    if not chunks:
+        return np.zeros(0, dtype=np.int16)
+    return np.concatenate(chunks)
+
+
+def frame_rms(pcm: "np.ndarray", frame_ms: int = VAD_FRAME_MS) -> "np.ndarray":
+    """Return the RMS energy of consecutive *frame_ms* frames of *pcm*."""
+    frame = STT_TARGET_SAMPLE_RATE * frame_ms // 1000
+    count = len(pcm) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = pcm[: count * frame].astype(np.float32).reshape(count, frame)
+    return np.sqrt((frames * frames).mean(axis=1))
+
+
+def voiced_frames(rms: "np.ndarray") -> "np.ndarray":
+    """Boolean mask of frames above an adaptive energy threshold."""
+    if rms.size == 0:
+        return np.zeros(0, dtype=bool)
+    noise_floor, loud = np.percentile(rms, (10, 90))
+    # Cap by the loud frames so recordings with few pauses (where the 10th
+    # percentile is already speech) are not trimmed away entirely.
+    return rms > max(STT_VAD_MIN_RMS, min(noise_floor * 2, loud * 0.25))
+
+
+def trim_silence(pcm: "np.ndarray") -> "np.ndarray":
+    """Drop leading and trailing silence, keeping ``STT_VAD_PAD_MS`` of padding."""
+    voiced = np.flatnonzero(voiced_frames(frame_rms(pcm)))
+    if voiced.size == 0:
+        return pcm[:0]
+    frame = STT_TARGET_SAMPLE_RATE * VAD_FRAME_MS // 1000
+    pad = STT_VAD_PAD_MS // VAD_FRAME_MS
+    start = max(0, int(voiced[0]) - pad) * frame
+    end = min(len(pcm), (int(voiced[-1]) + 1 + pad) * frame)
+    return pcm[start:end]
+
+
+def split_at_silence(pcm: "np.ndarray", max_seconds: float = STT_SEGMENT_SECONDS) -> list:
+    """Split *pcm* into pieces of at most *max_seconds*, cutting at the quietest frame.
+
+    Each cut is placed at the lowest-energy point in the second half of
+    the allowed window, so words are not chopped unless a speaker never
+    pauses (then the cut is still bounded by *max_seconds*).
+    """
+    frame = STT_TARGET_SAMPLE_RATE * VAD_FRAME_MS // 1000
+    max_frames = int(max_seconds * 1000) // VAD_FRAME_MS
+    rms = frame_rms(pcm)
+    if max_frames < 2 or len(rms) <= max_frames:
+        return [pcm]
+
+    # Smooth over ~100 ms so a single quiet frame inside a word is not chosen.
+    smooth = np.convolve(rms, np.ones(5) / 5, mode="same")
+    pieces = []
+    start = 0
+    while len(rms) - start > max_frames:
+        lo = start + max_frames // 2
+        hi = start + max_frames
+        # Latest quietest frame in the window, so segments stay as long as allowed.
+        cut = hi - 1 - int(np.argmin(smooth[lo:hi][::-1]))
+        pieces.append(pcm[start * frame : cut * frame])
+        start = cut
+    pieces.append(pcm[start * frame :])
+    return pieces
+
+
+def encode_pcm(pcm: "np.ndarray", encoding: str = STT_UPLOAD_ENCODING) -> bytes:
+    """Encode 16 kHz mono int16 PCM as *encoding* (OGG_OPUS, FLAC or LINEAR16)."""
+    if encoding == "LINEAR16":
+        return pcm.astype("<i2").tobytes()
+
+    container_format, codec = _ENCODERS[encoding]
+    buf = io.BytesIO()
+    with av.open(buf, "w", format=container_format) as out:
+        stream = out.add_stream(codec, rate=STT_TARGET_SAMPLE_RATE, layout="mono")
+        if codec == "libopus":
+            stream.bit_rate = STT_OPUS_BITRATE
+        frame = av.AudioFrame.from_ndarray(pcm.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = STT_TARGET_SAMPLE_RATE
+        for packet in stream.encode(frame):
+            out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+    return buf.getvalue()
+
+
+def _preprocess_sync(
+    audio: bytes, encoding: str, sample_rate_hertz: int, split: bool
+) -> PreparedAudio:
+    pcm = decode_to_pcm(audio, encoding=encoding, sample_rate_hertz=sample_rate_hertz)
+    seconds_in = len(pcm) / STT_TARGET_SAMPLE_RATE
+    speech = trim_silence(pcm)
+    seconds_out = len(speech) / STT_TARGET_SAMPLE_RATE
+    if speech.size == 0:
+        return PreparedAudio(
+            (), STT_UPLOAD_ENCODING, STT_TARGET_SAMPLE_RATE, len(audio), seconds_in, 0.0
+        )
+
+    pieces = split_at_silence(speech) if split else [speech]
+    segments = tuple(encode_pcm(piece) for piece in pieces)
+    if len(segments) == 1 and len(segments[0]) >= len(audio) and seconds_out >= seconds_in:
+        # Nothing gained (e.g. an already tiny clip): upload the original.
+        return PreparedAudio(
+            (audio,), encoding, sample_rate_hertz, len(audio), seconds_in, seconds_in
+        )
+    return PreparedAudio(
+        segments, STT_UPLOAD_ENCODING, STT_TARGET_SAMPLE_RATE, len(audio), seconds_in, seconds_out
+    )
+
+
+async def preprocess_audio(
+    audio: bytes, *, encoding: str, sample_rate_hertz: int, split: bool = False
+) -> PreparedAudio:
+    """Shrink *audio* for upload; falls back to the original on any failure.
+
+    With *split*, recordings longer than ``STT_SEGMENT_SECONDS`` come back
+    as several segments cut at silence.
+    """
+    original = PreparedAudio((audio,), encoding, sample_rate_hertz, len(audio))
+    if not STT_PREPROCESS or not preprocessing_available() or not audio:
+        return original
+
+    start = time.perf_counter()
+    try:
+        prepared = await asyncio.to_thread(
+            _preprocess_sync, audio, encoding, sample_rate_hertz, split
+        )
+    except Exception as exc:
+        logger.warning("STT preprocessing failed, uploading original audio: %s", exc)
+        metrics.incr("stt_preprocess.errors")
+        return original
+    elapsed = time.perf_counter() - start
+
+    metrics.observe("stt_preprocess", elapsed)
+    metrics.incr("stt_preprocess.bytes_in", prepared.bytes_in)
+    metrics.incr("stt_preprocess.bytes_out", prepared.bytes_out)
+    logger.info(
+        "STT preprocess: %d -> %d bytes (%.0f%% smaller), %.2fs -> %.2fs audio, "
+        "%d segment(s), %.0f ms",
+        prepared.bytes_in,
+        prepared.bytes_out,
+        prepared.reduction * 100,
+        prepared.seconds_in or 0.0,
+        prepared.seconds_out or 0.0,
+        len(prepared.segments),
+        elapsed * 1000,
+    )
+    return prepared
@@ -0,0 +1,205 @@
+"""Streaming speech-to-text for the chat WebSocket.
+
+The client sends audio chunks while it records; they are pushed into an
+``AudioStream`` and forwarded to a ``StreamingRecognizer`` that yields
+interim and final ``TranscriptEvent``s, so the final transcript is ready
+almost as soon as the user stops talking.
+
+``GoogleStreamingRecognizer`` uses the gRPC ``streaming_recognize`` API
+from the optional ``google-cloud-speech`` package, authenticated with the
+process-wide credentials from ``app.utils.google_auth``.  When it is not
+installed, ``BufferedRecognizer`` collects the chunks and falls back to
+the REST ``transcribe_audio`` call.  Tests can install a local stand-in
+with ``set_streaming_recognizer``.
+
+A stream that receives no chunk for ``STT_STREAM_IDLE_TIMEOUT`` seconds
+ends on its own, so a client that never sends ``end`` does not hold a
+recogniser open.
+"""
+
+import asyncio
+import logging
+import os
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Protocol
+
+from app.services.stt.stt import transcribe_audio
+from app.utils import metrics
+from app.utils.google_auth import get_credential_manager
+
+logger = logging.getLogger(__name__)
+
+STT_STREAM_MAX_BYTES = int(os.getenv("STT_STREAM_MAX_BYTES", str(10 * 1024 * 1024)))
+STT_STREAM_IDLE_TIMEOUT = float(os.getenv("STT_STREAM_IDLE_TIMEOUT", "15"))
+
+
+@dataclass(frozen=True)
+class StreamConfig:
+    encoding: str = "WEBM_OPUS"
+    sample_rate_hertz: int = 48000
+    language_code: str = "en-US"
+
+
+@dataclass(frozen=True)
+class TranscriptEvent:
+    """A transcript update; ``text`` is the full transcript so far."""
+
+    text: str
+    final: bool
+
+
+class StreamingRecognizer(Protocol):
+    def recognize(
+        self, chunks: AsyncIterator[bytes], config: StreamConfig
+    ) -> AsyncIterator[TranscriptEvent]:
+        """Consume audio *chunks* and yield transcript events, ending with a final one."""
+        ...
+
+
+class AudioStream:
+    """Async iterator of audio chunks fed from the WebSocket receive loop."""
+
+    def __init__(
+        self,
+        max_bytes: int = STT_STREAM_MAX_BYTES,
+        idle_timeout: float = STT_STREAM_IDLE_TIMEOUT,
+    ) -> None:
+        self._queue: asyncio.Queue[bytes | None] = asyncio.Queue()
+        self._max_bytes = max_bytes
+        self._idle_timeout = idle_timeout if idle_timeout > 0 else None
+        self._received = 0
+        self.closed = False
+        self.timed_out = False  # ended because no chunk arrived in time
+
+    def push(self, chunk: bytes) -> bool:
+        """Queue *chunk*; returns False (and closes) once the size cap is exceeded."""
+        if self.closed:
+            return False
+        self._received += len(chunk)
+        if self._received > self._max_bytes:
+            self.close()
+            return False
+        self._queue.put_nowait(chunk)
+        return True
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._queue.put_nowait(None)
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[bytes]:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(self._queue.get(), self._idle_timeout)
+            except TimeoutError:
+                metrics.incr("stt_stream.idle_timeouts")
+                self.timed_out = True
+                self.closed = True
+                return
+            if chunk is None:
+                return
+            yield chunk
+
+
+class BufferedRecognizer:
+    """Fallback recogniser: buffer the stream, then one REST recognize call."""
+
+    async def recognize(
+        self, chunks: AsyncIterator[bytes], config: StreamConfig
+    ) -> AsyncIterator[TranscriptEvent]:
+        audio = bytearray()
+        async for chunk in chunks:
+            audio += chunk
+        text = ""
+        if audio:
+            text = await transcribe_audio(
+                bytes(audio),
+                encoding=config.encoding,
+                sample_rate_hertz=config.sample_rate_hertz,
+                language_code=config.language_code,
+            )
+        yield TranscriptEvent(text=text, final=True)
+
+
+class GoogleStreamingRecognizer:
+    """Google Cloud Speech ``streaming_recognize`` over gRPC."""
+
+    def __init__(self) -> None:
+        from google.cloud import speech
+
+        self._speech = speech
+        self._client = None
+
+    async def _get_client(self):
+        # Built on first use: the shared credentials are loaded asynchronously,
+        # and the background refresher then keeps them valid for gRPC too.
+        if self._client is None:
+            manager = get_credential_manager()
+            _, project = await manager.get_auth_data()
+            self._client = self._speech.SpeechAsyncClient(
+                credentials=manager.credentials,
+                client_options={"quota_project_id": project} if project else None,
+            )
+        return self._client
+
+    async def recognize(
+        self, chunks: AsyncIterator[bytes], config: StreamConfig
+    ) -> AsyncIterator[TranscriptEvent]:
+        speech = self._speech
+        streaming_config = speech.StreamingRecognitionConfig(
+            config=speech.RecognitionConfig(
+                encoding=getattr(speech.RecognitionConfig.AudioEncoding, config.encoding),
+                sample_rate_hertz=config.sample_rate_hertz,
+                language_code=config.language_code,
+                model="latest_long",
+                enable_automatic_punctuation=True,
+            ),
+            interim_results=True,
+        )
+
+        async def _requests() -> AsyncIterator:
+            yield speech.StreamingRecognizeRequest(streaming_config=streaming_config)
+            async for chunk in chunks:
+                yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+        finals: list[str] = []
+        client = await self._get_client()
+        responses = await client.streaming_recognize(requests=_requests())
+        async for response in responses:
+            for result in response.results:
+                if not result.alternatives:
+                    continue
+                text = result.alternatives[0].transcript.strip()
+                if result.is_final:
+                    finals.append(text)
+                    yield TranscriptEvent(text=" ".join(finals), final=False)
+                else:
+                    yield TranscriptEvent(text=" ".join([*finals, text]), final=False)
+
+        yield TranscriptEvent(text=" ".join(finals).strip(), final=True)
+
+
+_recognizer: StreamingRecognizer | None = None
+
+
+def get_streaming_recognizer() -> StreamingRecognizer:
+    """Return the process-wide recogniser, preferring Google streaming."""
+    global _recognizer
+    if _recognizer is None:
+        try:
+            _recognizer = GoogleStreamingRecognizer()
+        except Exception as exc:
+            # ImportError when google-cloud-speech is absent.
+            logger.warning("Streaming STT unavailable (%s); using buffered REST recognition", exc)
+            _recognizer = BufferedRecognizer()
+    return _recognizer
+
+
+def set_streaming_recognizer(recognizer: StreamingRecognizer | None) -> None:
+    """Override the recogniser (e.g. a local stand-in in tests); None resets it."""
+    global _recognizer
+    _recognizer = recognizer
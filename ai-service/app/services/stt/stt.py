@@ -2,33 +2,98 @@
 
 import asyncio
 import base64
+import json
 import logging
-
 import os
-import google.auth
-import google.auth.transport.requests
+from collections.abc import AsyncIterator
+
 import httpx
 
+from app.services.stt.preprocess import preprocess_audio
+from app.utils import metrics
+from app.utils.google_auth import google_auth_headers
+
 logger = logging.getLogger(__name__)
 
 GCP_STT_URL = "https://speech.googleapis.com/v1/speech:recognize"
+STT_SEGMENT_CONCURRENCY = int(os.getenv("STT_SEGMENT_CONCURRENCY", "4"))
 
-_credentials = None
-_project_id = None
 
-
-def _get_auth_data() -> tuple[str, str | None]:
-    """Get a valid access token and project ID using Application Default Credentials."""
-    global _credentials, _project_id
-    if _credentials is None:
-        _credentials, _project_id = google.auth.default(
-            scopes=["https://www.googleapis.com/auth/cloud-platform"]
+async def _recognize(
+    client: httpx.AsyncClient,
+    headers: dict[str, str],
+    audio_bytes: bytes,
+    *,
+    encoding: str,
+    sample_rate_hertz: int,
+    language_code: str,
+) -> str:
+    """Run one synchronous ``speech:recognize`` call and return its transcript."""
+    config = {
+        "encoding": encoding,
+        "sampleRateHertz": sample_rate_hertz,
+        "languageCode": language_code,
+        "model": "latest_long",
+        "enableAutomaticPunctuation": True,
+    }
+    # Build the JSON around the base64 audio instead of serialising it as a
+    # str: the audio is encoded once and never copied through json.dumps.
+    parts = (
+        b'{"config":' + json.dumps(config).encode() + b',"audio":{"content":"',
+        base64.b64encode(audio_bytes),
+        b'"}}',
+    )
+
+    async def _body() -> AsyncIterator[bytes]:
+        for part in parts:
+            yield part
+
+    response = await client.post(
+        GCP_STT_URL,
+        headers={**headers, "Content-Length": str(sum(len(part) for part in parts))},
+        content=_body(),
+    )
+    if response.status_code != 200:
+        logger.error(
+            "Google STT failed (status=%s): %s",
+            response.status_code,
+            response.text,
         )
-    if not _credentials.valid:
-        _credentials.refresh(google.auth.transport.requests.Request())
-        
-    project_to_use = os.environ.get("VERTEX_PROJECT") or _project_id
-    return _credentials.token, project_to_use
+        raise RuntimeError(f"Google STT returned {response.status_code}")
+
+    results = response.json().get("results", [])
+    transcript = " ".join(
+        result["alternatives"][0]["transcript"] for result in results if result.get("alternatives")
+    )
+    return transcript.strip()
+
+
+async def _recognize_segments(
+    client: httpx.AsyncClient,
+    headers: dict[str, str],
+    segments: tuple[bytes, ...],
+    **config,
+) -> str:
+    """Transcribe *segments* with bounded concurrency and stitch the text in order."""
+    limit = asyncio.Semaphore(STT_SEGMENT_CONCURRENCY)
+
+    async def _one(segment: bytes) -> str:
+        async with limit:
+            return await _recognize(client, headers, segment, **config)
+
+    error: Exception | None = None
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(_one(segment)) for segment in segments]
+    except ExceptionGroup as eg:
+        error = eg.exceptions[0]
+    if error is not None:
+        # One failed segment fails the transcript; the others were cancelled.
+        # Raised outside the except so the segment's own traceback is kept.
+        raise error
+    metrics.incr("stt.segmented_requests")
+    metrics.incr("stt.segments", len(segments))
+    return " ".join(text for task in tasks if (text := task.result())).strip()
 
 
 async def transcribe_audio(
@@ -37,54 +102,37 @@ async def transcribe_audio(
     encoding: str = "WEBM_OPUS",
     sample_rate_hertz: int = 48000,
     language_code: str = "en-US",
+    preprocess: bool = True,
 ) -> str:
     """Transcribe audio bytes using Google Cloud STT.
 
+    Unless *preprocess* is False the audio is first shrunk locally
+    (mono 16 kHz, silence trimmed, re-encoded; see ``preprocess.py``).
+    Long recordings are split at silence into ``STT_SEGMENT_SECONDS``
+    pieces that are recognised in parallel, so latency follows the
+    segment length rather than the recording length.
+
     Returns the transcribed text, or an empty string if nothing was recognised.
     """
-    access_token, project_id = await asyncio.to_thread(_get_auth_data)
-
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json",
-    }
-    if project_id:
-        headers["x-goog-user-project"] = project_id
-
-    audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
-
-    body = {
-        "config": {
-            "encoding": encoding,
-            "sampleRateHertz": sample_rate_hertz,
-            "languageCode": language_code,
-            "model": "latest_long",
-            "enableAutomaticPunctuation": True,
-        },
-        "audio": {
-            "content": audio_b64,
-        },
+    segments = (audio_bytes,)
+    if preprocess:
+        prepared = await preprocess_audio(
+            audio_bytes, encoding=encoding, sample_rate_hertz=sample_rate_hertz, split=True
+        )
+        if not prepared.segments:
+            return ""  # only silence, nothing to recognise
+        segments = prepared.segments
+        encoding = prepared.encoding
+        sample_rate_hertz = prepared.sample_rate_hertz
+
+    headers = await google_auth_headers()
+
+    config = {
+        "encoding": encoding,
+        "sample_rate_hertz": sample_rate_hertz,
+        "language_code": language_code,
     }
-
     async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(GCP_STT_URL, headers=headers, json=body)
-
-        if response.status_code != 200:
-            logger.error(
-                "Google STT failed (status=%s): %s",
-                response.status_code,
-                response.text,
-            )
-            raise RuntimeError(f"Google STT returned {response.status_code}")
-
-        data = response.json()
-        results = data.get("results", [])
-        if not results:
-            return ""
-
-        transcript = " ".join(
-            result["alternatives"][0]["transcript"]
-            for result in results
-            if result.get("alternatives")
-        )
-        return transcript.strip()
+        if len(segments) == 1:
+            return await _recognize(client, headers, segments[0], **config)
+        return await _recognize_segments(client, headers, segments, **config)
@@ -0,0 +1,94 @@
+"""Reading recorded audio uploaded to ``POST /voice/stt``.
+
+Clients send the recording as a raw ``application/octet-stream`` (or
+``audio/*``) body, a multipart upload with an ``audio`` (or ``file``)
+field, or legacy JSON ``{"audio": "<base64>"}``.  Every form is capped at
+``STT_MAX_UPLOAD_BYTES`` of audio, including chunked uploads without a
+``Content-Length``.
+"""
+
+import json
+import os
+from collections.abc import AsyncGenerator
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from app.utils.frames import decode_base64_audio
+
+# Max recorded audio accepted by /voice/stt (raw bytes, after base64 decoding).
+STT_MAX_UPLOAD_BYTES = int(os.getenv("STT_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+
+class _UploadTooLarge(Exception):
+    """Raised while streaming a request body that exceeds its size cap."""
+
+
+async def _capped_stream(request: Request, limit: int) -> AsyncGenerator[bytes, None]:
+    """Yield the request body, aborting as soon as more than *limit* bytes arrive."""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise _UploadTooLarge
+        yield chunk
+
+
+async def read_stt_upload(request: Request) -> bytes | JSONResponse:
+    """Return the uploaded audio, or an error response.
+
+    Raw (``application/octet-stream`` / ``audio/*``) and multipart bodies
+    are streamed with the size cap enforced as they arrive, so an
+    oversized upload is rejected without being buffered.  The legacy
+    JSON body carries base64 and is decoded once.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    content_length = request.headers.get("content-length")
+    is_raw = content_type == "application/octet-stream" or content_type.startswith("audio/")
+    # Multipart framing and base64 add overhead on top of the raw audio.
+    if is_raw:
+        limit = STT_MAX_UPLOAD_BYTES
+    elif content_type == "multipart/form-data":
+        limit = STT_MAX_UPLOAD_BYTES + 64 * 1024
+    else:
+        limit = STT_MAX_UPLOAD_BYTES * 4 // 3 + 64 * 1024
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        return JSONResponse(content={"error": "audio_too_large"}, status_code=413)
+
+    try:
+        if is_raw:
+            return b"".join([chunk async for chunk in _capped_stream(request, limit)])
+
+        if content_type == "multipart/form-data":
+            parser = MultiPartParser(
+                request.headers, _capped_stream(request, limit), max_files=1, max_fields=10
+            )
+            form = await parser.parse()
+            try:
+                upload = form.get("audio") or form.get("file")
+                if not isinstance(upload, UploadFile):
+                    return JSONResponse(content={"error": "missing_audio"}, status_code=400)
+                audio_bytes = await upload.read()
+            finally:
+                await form.close()
+        else:
+            body = json.loads(b"".join([chunk async for chunk in _capped_stream(request, limit)]))
+            audio_b64 = body.get("audio") if isinstance(body, dict) else None
+            if audio_b64 is None or audio_b64 == "":
+                return JSONResponse(content={"error": "missing_audio"}, status_code=400)
+            try:
+                audio_bytes = decode_base64_audio(audio_b64)
+            except ValueError:
+                return JSONResponse(content={"error": "invalid_audio_encoding"}, status_code=400)
+    except _UploadTooLarge:
+        return JSONResponse(content={"error": "audio_too_large"}, status_code=413)
+    except MultiPartException:
+        return JSONResponse(content={"error": "invalid_multipart"}, status_code=400)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return JSONResponse(content={"error": "invalid_json"}, status_code=400)
+
+    if len(audio_bytes) > STT_MAX_UPLOAD_BYTES:
+        return JSONResponse(content={"error": "audio_too_large"}, status_code=413)
+    return audio_bytes
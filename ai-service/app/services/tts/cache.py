@@ -0,0 +1,275 @@
+"""Content-addressed cache in front of Google Cloud TTS.
+
+Audio is keyed by a SHA-256 of ``(text, voice, language, encoding, sample rate)``.
+The first tier is an in-memory LRU bounded by a byte budget; the optional
+second tier stores audio files under ``TTS_CACHE_DIR`` (also bounded) so
+canned phrases survive restarts.  The disk tier's size is tracked in an
+index built from one directory scan, so writes do not re-scan it.
+
+Only audio worth reusing is stored: phrases passed to ``warm_tts_cache``
+and texts up to ``TTS_CACHE_MAX_TEXT_CHARS`` (short acknowledgements and
+segments that recur).  Longer streamed sentences are synthesised without
+touching the cache.  Concurrent requests for the same key always share a
+single synthesis call.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from app.services.tts.tts import (
+    DEFAULT_AUDIO_FORMAT,
+    DEFAULT_LANGUAGE,
+    DEFAULT_VOICE,
+    AudioFormat,
+    synthesize_speech,
+)
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "")
+TTS_CACHE_DISK_MAX_BYTES = int(os.getenv("TTS_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+TTS_CACHE_MAX_TEXT_CHARS = int(os.getenv("TTS_CACHE_MAX_TEXT_CHARS", "40"))
+
+_memory: OrderedDict[str, bytes] = OrderedDict()
+_memory_bytes = 0
+_inflight: dict[str, asyncio.Future[bytes]] = {}
+_pinned: set[str] = set()  # phrases passed to warm_tts_cache
+
+# Disk tier index: key -> file size, least recently used first.  Disk I/O
+# runs in worker threads, so the index is guarded by a lock.
+_disk_index: OrderedDict[str, int] = OrderedDict()
+_disk_bytes = 0
+_disk_indexed_dir: str | None = None
+_disk_lock = threading.Lock()
+
+
+def cache_key(
+    text: str,
+    voice: str = DEFAULT_VOICE,
+    language_code: str = DEFAULT_LANGUAGE,
+    audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT,
+) -> str:
+    """Return the content address for a synthesis request."""
+    raw = "\x1f".join(
+        (
+            text,
+            voice,
+            language_code,
+            audio_format.encoding,
+            str(audio_format.sample_rate_hertz or ""),
+        )
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(text: str) -> bool:
+    """Return True for text whose audio is worth keeping."""
+    return text in _pinned or len(text) <= TTS_CACHE_MAX_TEXT_CHARS
+
+
+def _memory_get(key: str) -> bytes | None:
+    audio = _memory.get(key)
+    if audio is not None:
+        _memory.move_to_end(key)
+    return audio
+
+
+def _memory_put(key: str, audio: bytes) -> None:
+    global _memory_bytes
+    if len(audio) > TTS_CACHE_MAX_BYTES:
+        return
+    previous = _memory.pop(key, None)
+    if previous is not None:
+        _memory_bytes -= len(previous)
+    _memory[key] = audio
+    _memory_bytes += len(audio)
+    while _memory_bytes > TTS_CACHE_MAX_BYTES:
+        _, evicted = _memory.popitem(last=False)
+        _memory_bytes -= len(evicted)
+        metrics.incr("tts_cache.evictions")
+
+
+def _disk_path(key: str) -> Path:
+    return Path(TTS_CACHE_DIR) / f"{key}.audio"
+
+
+def _disk_load() -> None:
+    """Index the files already in ``TTS_CACHE_DIR``, oldest first (once per directory)."""
+    global _disk_bytes, _disk_indexed_dir
+    if _disk_indexed_dir == TTS_CACHE_DIR:
+        return
+    directory = Path(TTS_CACHE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    files = sorted(
+        ((p.stat(), p) for p in directory.glob("*.audio")), key=lambda item: item[0].st_mtime
+    )
+    _disk_index.clear()
+    _disk_index.update((p.stem, st.st_size) for st, p in files)
+    _disk_bytes = sum(_disk_index.values())
+    _disk_indexed_dir = TTS_CACHE_DIR
+
+
+def _disk_forget(key: str) -> None:
+    global _disk_bytes
+    _disk_bytes -= _disk_index.pop(key, 0)
+
+
+def _disk_get(key: str) -> bytes | None:
+    with _disk_lock:
+        _disk_load()
+        if key not in _disk_index:
+            return None
+        _disk_index.move_to_end(key)
+    path = _disk_path(key)
+    try:
+        audio = path.read_bytes()
+    except FileNotFoundError:
+        with _disk_lock:
+            _disk_forget(key)
+        return None
+    path.touch()  # restarts rebuild the LRU order from mtimes
+    return audio
+
+
+def _disk_put(key: str, audio: bytes) -> None:
+    global _disk_bytes
+    if len(audio) > TTS_CACHE_DISK_MAX_BYTES:
+        return
+    with _disk_lock:
+        _disk_load()
+    tmp = Path(TTS_CACHE_DIR) / f"{key}.tmp"
+    tmp.write_bytes(audio)
+    tmp.replace(_disk_path(key))
+
+    evicted = []
+    with _disk_lock:
+        _disk_forget(key)
+        _disk_index[key] = len(audio)
+        _disk_bytes += len(audio)
+        while _disk_bytes > TTS_CACHE_DISK_MAX_BYTES:
+            old, size = _disk_index.popitem(last=False)
+            _disk_bytes -= size
+            evicted.append(old)
+    for old in evicted:
+        _disk_path(old).unlink(missing_ok=True)
+        metrics.incr("tts_cache.disk_evictions")
+
+
+async def _lookup(key: str) -> bytes | None:
+    audio = _memory_get(key)
+    if audio is not None:
+        metrics.incr("tts_cache.hits_memory")
+        return audio
+    if TTS_CACHE_DIR:
+        try:
+            audio = await asyncio.to_thread(_disk_get, key)
+        except OSError as exc:
+            logger.warning("TTS disk cache read failed: %s", exc)
+            audio = None
+        if audio is not None:
+            metrics.incr("tts_cache.hits_disk")
+            _memory_put(key, audio)
+            return audio
+    return None
+
+
+async def _store(key: str, audio: bytes) -> None:
+    _memory_put(key, audio)
+    if TTS_CACHE_DIR:
+        try:
+            await asyncio.to_thread(_disk_put, key, audio)
+        except OSError as exc:
+            logger.warning("TTS disk cache write failed: %s", exc)
+
+
+async def synthesize_speech_cached(
+    text: str,
+    *,
+    voice: str = DEFAULT_VOICE,
+    language_code: str = DEFAULT_LANGUAGE,
+    audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT,
+) -> bytes:
+    """Return synthesized audio for *text*, served from cache when possible."""
+    key = cache_key(text, voice, language_code, audio_format)
+    cacheable = is_cacheable(text)
+    if cacheable:
+        audio = await _lookup(key)
+        if audio is not None:
+            return audio
+
+    while (pending := _inflight.get(key)) is not None:
+        metrics.incr("tts_cache.hits_inflight")
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            task = asyncio.current_task()
+            if not pending.cancelled() or (task is not None and task.cancelling()):
+                raise
+            # The request that owned the synthesis was cancelled; take over.
+
+    metrics.incr("tts_cache.misses" if cacheable else "tts_cache.uncached")
+    future: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        audio = await synthesize_speech(
+            text, voice=voice, language_code=language_code, audio_format=audio_format
+        )
+        if cacheable:
+            await _store(key, audio)
+        future.set_result(audio)
+        return audio
+    except BaseException as exc:
+        # Waiters get the failure; on cancellation they synthesise themselves.
+        if isinstance(exc, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else is waiting
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+async def warm_tts_cache(
+    phrases: list[str],
+    *,
+    voice: str = DEFAULT_VOICE,
+    audio_formats: tuple[AudioFormat, ...] = (DEFAULT_AUDIO_FORMAT,),
+) -> None:
+    """Pre-synthesise fixed phrases so their first use costs no round-trip.
+
+    The phrases are pinned as cacheable whatever their length.
+    """
+    _pinned.update(phrases)
+    jobs = [(text, fmt) for fmt in dict.fromkeys(audio_formats) for text in phrases]
+    results = await asyncio.gather(
+        *(synthesize_speech_cached(text, voice=voice, audio_format=fmt) for text, fmt in jobs),
+        return_exceptions=True,
+    )
+    failed = sum(isinstance(result, BaseException) for result in results)
+    if failed:
+        logger.warning("TTS cache warm-up failed for %d of %d phrases", failed, len(jobs))
+    else:
+        logger.info("TTS cache warmed with %d phrases", len(jobs))
+
+
+def cache_stats() -> dict:
+    return {
+        "entries": len(_memory),
+        "bytes": _memory_bytes,
+        "max_bytes": TTS_CACHE_MAX_BYTES,
+        "disk_enabled": bool(TTS_CACHE_DIR),
+        "disk_entries": len(_disk_index),
+        "disk_bytes": _disk_bytes,
+        "max_text_chars": TTS_CACHE_MAX_TEXT_CHARS,
+    }
+
+
+metrics.register_provider("tts_cache", cache_stats)
@@ -0,0 +1,172 @@
+"""Incremental sentence segmentation of streamed LLM text for TTS.
+
+``SentenceSegmenter.feed`` is called with each LLM chunk and returns the
+segments that are ready to synthesise.  Only newly arrived characters
+are scanned, and the pending buffer is bounded by ``max_chars``, so the
+total cost is linear in the length of the response.
+
+* Abbreviations ("Dr.", "e.g.") and single initials do not end a
+  sentence, nor does "No." before a number ("No. 5"); decimals never do
+  because a boundary needs trailing whitespace.
+* Sentences shorter than ``min_chars`` are merged with the following one
+  so short replies cost fewer TTS calls.
+* Text without a boundary is force-split near ``max_chars``.
+* With ``eager_first`` the first segment is cut at the first clause
+  boundary (comma, semicolon, colon, dash) to start audio sooner.
+"""
+
+import os
+
+TTS_SEGMENT_MIN_CHARS = int(os.getenv("TTS_SEGMENT_MIN_CHARS", "40"))
+TTS_SEGMENT_MAX_CHARS = int(os.getenv("TTS_SEGMENT_MAX_CHARS", "400"))
+TTS_EAGER_FIRST_SEGMENT = os.getenv("TTS_EAGER_FIRST_SEGMENT", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+ABBREVIATIONS = frozenset(
+    {
+        "dr", "mr", "mrs", "ms", "prof", "sr", "jr", "st", "mt", "vs", "etc",
+        "e.g", "i.e", "a.m", "p.m", "approx", "fig", "inc", "ltd",
+    }
+)  # fmt: skip
+# Abbreviations only when a number follows ("No. 5"); "I said no." ends a sentence.
+NUMBER_ABBREVIATIONS = frozenset({"No"})
+
+_SENTENCE_END = ".?!"
+_CLAUSE_END = ",;:\u2014\u2013"  # em and en dash
+_CLOSERS = "\"')]}\u201d\u2019"  # closing double and single quotes
+
+
+class SentenceSegmenter:
+    """Streaming splitter turning LLM chunks into TTS-sized segments."""
+
+    def __init__(
+        self,
+        *,
+        min_chars: int = TTS_SEGMENT_MIN_CHARS,
+        max_chars: int = TTS_SEGMENT_MAX_CHARS,
+        eager_first: bool = TTS_EAGER_FIRST_SEGMENT,
+        eager_min_chars: int = 12,
+    ) -> None:
+        self.min_chars = min_chars
+        self.max_chars = max(max_chars, min_chars + 1)
+        self.eager_first = eager_first
+        self.eager_min_chars = eager_min_chars
+        self._buf = ""
+        self._scan = 0  # next index in _buf that has not been examined
+        self._emitted = 0
+
+    def feed(self, text: str) -> list[str]:
+        """Add *text* and return any segments that are now complete."""
+        self._buf += text
+        segments: list[str] = []
+        buf = self._buf
+        i = self._scan
+        n = len(buf)
+
+        while i < n:
+            ch = buf[i]
+            end = -1
+            if ch in _SENTENCE_END:
+                end = self._sentence_end(buf, i)
+            elif self._emitted == 0 and self.eager_first and ch in _CLAUSE_END:
+                end = self._clause_end(buf, i)
+
+            if end == -2:
+                break  # need more input to decide
+            if end > 0 and self._ready(buf, end, ch in _SENTENCE_END):
+                segment = buf[:end].strip()
+                if segment:
+                    segments.append(segment)
+                    self._emitted += 1
+                buf = buf[end:]
+                n = len(buf)
+                i = 0
+                continue
+
+            if i >= self.max_chars:
+                cut = self._force_cut(buf)
+                segments.append(buf[:cut].strip())
+                self._emitted += 1
+                buf = buf[cut:]
+                n = len(buf)
+                i = 0
+                continue
+
+            i += 1
+
+        self._buf = buf
+        self._scan = i
+        return segments
+
+    def flush(self) -> str | None:
+        """Return whatever text is still pending (end of stream)."""
+        tail = self._buf.strip()
+        self._buf = ""
+        self._scan = 0
+        return tail or None
+
+    # -- helpers -------------------------------------------------------------
+
+    def _ready(self, buf: str, end: int, is_sentence: bool) -> bool:
+        length = len(buf[:end].strip())
+        if self._emitted == 0 and self.eager_first:
+            return length >= (1 if is_sentence else self.eager_min_chars)
+        return length >= self.min_chars
+
+    def _sentence_end(self, buf: str, i: int) -> int:
+        """Return the boundary index after a terminator at *i*, -1 if none, -2 if undecided."""
+        j = i + 1
+        n = len(buf)
+        # Swallow runs like "?!" or "..." and closing quotes/brackets.
+        while j < n and (buf[j] in _SENTENCE_END or buf[j] in _CLOSERS):
+            j += 1
+        if j >= n:
+            return -2
+        if not buf[j].isspace():
+            return -1
+        if buf[i] == ".":
+            word = self._word_before(buf, i)
+            if self._is_abbreviation(word):
+                return -1
+            if word in NUMBER_ABBREVIATIONS:
+                k = j
+                while k < n and buf[k].isspace():
+                    k += 1
+                if k >= n:
+                    return -2
+                if buf[k].isdigit():
+                    return -1
+        return j
+
+    def _clause_end(self, buf: str, i: int) -> int:
+        j = i + 1
+        if j >= len(buf):
+            return -2
+        return j if buf[j].isspace() else -1
+
+    @staticmethod
+    def _word_before(buf: str, i: int) -> str:
+        start = i
+        while start > 0 and (buf[start - 1].isalpha() or buf[start - 1] == "."):
+            start -= 1
+        return buf[start:i]
+
+    @staticmethod
+    def _is_abbreviation(word: str) -> bool:
+        if not word:
+            return False
+        if len(word) == 1 and word.isupper():
+            return True  # initials, e.g. "J. R. R. Tolkien"
+        return word.lower() in ABBREVIATIONS
+
+    def _force_cut(self, buf: str) -> int:
+        """Pick a split point at or before ``max_chars`` for boundary-less text."""
+        window = buf[: self.max_chars]
+        for sep in (", ", "; ", " "):
+            cut = window.rfind(sep)
+            if cut > self.min_chars:
+                return cut + len(sep)
+        return self.max_chars
@@ -1,36 +1,80 @@
 """Google Cloud Text-to-Speech service using ADC."""
 
-import asyncio
 import base64
 import logging
-
 import os
-import google.auth
-import google.auth.transport.requests
+from dataclasses import dataclass
+
 import httpx
 
+from app.utils.google_auth import google_auth_headers
+
 logger = logging.getLogger(__name__)
 
 GCP_TTS_URL = "https://texttospeech.googleapis.com/v1/text:synthesize"
 DEFAULT_VOICE = "en-US-Journey-F"
 DEFAULT_LANGUAGE = "en-US"
+# Opus at 24 kHz is a fraction of the size of MP3 for speech; clients that
+# cannot play it ask for "MP3" (see parse_audio_format).
+AUDIO_ENCODING = os.getenv("TTS_DEFAULT_ENCODING", "OGG_OPUS")
+
+# Encodings clients may negotiate, with their media type and the sample rate
+# used when the client does not ask for one (None = the voice's native rate).
+# LINEAR16 responses from Google carry a WAV header.
+MEDIA_TYPES = {"MP3": "audio/mpeg", "OGG_OPUS": "audio/ogg", "LINEAR16": "audio/wav"}
+DEFAULT_SAMPLE_RATES = {
+    "MP3": None,
+    "OGG_OPUS": int(os.getenv("TTS_OPUS_SAMPLE_RATE", "24000")),
+    "LINEAR16": int(os.getenv("TTS_LINEAR16_SAMPLE_RATE", "16000")),
+}
+SAMPLE_RATE_RANGE = (8000, 48000)
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """Output encoding and sample rate for synthesized audio."""
+
+    encoding: str = AUDIO_ENCODING
+    sample_rate_hertz: int | None = DEFAULT_SAMPLE_RATES.get(AUDIO_ENCODING)
 
-_credentials = None
-_project_id = None
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.encoding]
 
+    def to_dict(self) -> dict:
+        return {"encoding": self.encoding, "sample_rate_hertz": self.sample_rate_hertz}
 
-def _get_auth_data() -> tuple[str, str | None]:
-    """Get a valid access token and project ID using Application Default Credentials."""
-    global _credentials, _project_id
-    if _credentials is None:
-        _credentials, _project_id = google.auth.default(
-            scopes=["https://www.googleapis.com/auth/cloud-platform"]
-        )
-    if not _credentials.valid:
-        _credentials.refresh(google.auth.transport.requests.Request())
-        
-    project_to_use = os.environ.get("VERTEX_PROJECT") or _project_id
-    return _credentials.token, project_to_use
+
+DEFAULT_AUDIO_FORMAT = AudioFormat()
+
+
+def parse_audio_format(spec: str | dict | None) -> AudioFormat:
+    """Build an ``AudioFormat`` from a client request.
+
+    *spec* is an encoding name (``"OGG_OPUS"``) or an object with
+    ``encoding`` and optional ``sample_rate_hertz``.  Raises ``ValueError``
+    for unsupported encodings or sample rates.
+    """
+    if spec is None:
+        return DEFAULT_AUDIO_FORMAT
+    if isinstance(spec, str):
+        spec = {"encoding": spec}
+    if not isinstance(spec, dict):
+        raise ValueError("audio_format must be a string or an object")
+
+    encoding = str(spec.get("encoding", AUDIO_ENCODING)).upper()
+    if encoding not in MEDIA_TYPES:
+        raise ValueError(f"unsupported encoding {encoding}")
+    rate = spec.get("sample_rate_hertz")
+    if rate is None:
+        return AudioFormat(encoding, DEFAULT_SAMPLE_RATES[encoding])
+    try:
+        rate = int(rate)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("sample_rate_hertz must be an integer") from exc
+    if not SAMPLE_RATE_RANGE[0] <= rate <= SAMPLE_RATE_RANGE[1]:
+        raise ValueError(f"sample_rate_hertz must be within {SAMPLE_RATE_RANGE}")
+    return AudioFormat(encoding, rate)
 
 
 async def synthesize_speech(
@@ -38,19 +82,21 @@ async def synthesize_speech(
     *,
     voice: str = DEFAULT_VOICE,
     language_code: str = DEFAULT_LANGUAGE,
+    audio_format: AudioFormat = DEFAULT_AUDIO_FORMAT,
 ) -> bytes:
     """Synthesize speech from text using Google Cloud TTS.
 
-    Returns the audio content as MP3 bytes.
+    Returns the audio content encoded as *audio_format*.
     """
-    access_token, project_id = await asyncio.to_thread(_get_auth_data)
+    headers = await google_auth_headers()
 
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json",
+    audio_config = {
+        "audioEncoding": audio_format.encoding,
+        "speakingRate": 1.0,
+        "pitch": 0.0,
     }
-    if project_id:
-        headers["x-goog-user-project"] = project_id
+    if audio_format.sample_rate_hertz:
+        audio_config["sampleRateHertz"] = audio_format.sample_rate_hertz
 
     body = {
         "input": {"text": text},
@@ -58,11 +104,7 @@ async def synthesize_speech(
             "languageCode": language_code,
             "name": voice,
         },
-        "audioConfig": {
-            "audioEncoding": "MP3",
-            "speakingRate": 1.0,
-            "pitch": 0.0,
-        },
+        "audioConfig": audio_config,
     }
 
     async with httpx.AsyncClient(timeout=30.0) as client:
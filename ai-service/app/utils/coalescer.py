@@ -0,0 +1,157 @@
+"""Coalescing of streamed ``rag`` text into fewer WebSocket frames.
+
+Gemini streams many small chunks, and each one sent as its own frame
+costs JSON encoding, a WebSocket write and a request-id check; slow
+mobile links suffer most from the many small frames.  ``FrameCoalescer``
+buffers text and sends it as one frame when the buffer reaches
+``max_chars``, when ``window_ms`` has passed since the first buffered
+chunk, or when the stream ends, whichever comes first.
+
+A client picks its thresholds per connection with
+``{"coalesce": {"max_chars": 256, "window_ms": 15}}`` (``false`` or a
+zero window disables coalescing); the defaults come from
+``RAG_COALESCE_MAX_CHARS`` / ``RAG_COALESCE_WINDOW_MS``.
+"""
+
+import asyncio
+import contextlib
+import os
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+
+from app.utils import metrics
+
+RAG_COALESCE_MAX_CHARS = int(os.getenv("RAG_COALESCE_MAX_CHARS", "256"))
+RAG_COALESCE_WINDOW_MS = float(os.getenv("RAG_COALESCE_WINDOW_MS", "15"))
+
+# Bounds accepted from clients.
+MAX_CHARS_RANGE = (1, 16384)
+WINDOW_MS_RANGE = (0.0, 250.0)
+
+
+@dataclass(frozen=True)
+class CoalesceConfig:
+    max_chars: int = RAG_COALESCE_MAX_CHARS
+    window_ms: float = RAG_COALESCE_WINDOW_MS
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0 and self.max_chars > 1
+
+    def to_dict(self) -> dict:
+        return {"max_chars": self.max_chars, "window_ms": self.window_ms}
+
+
+DEFAULT_COALESCE = CoalesceConfig()
+COALESCE_OFF = CoalesceConfig(max_chars=1, window_ms=0.0)
+
+
+def parse_coalesce(spec: bool | dict | None) -> CoalesceConfig:
+    """Build a ``CoalesceConfig`` from a client request.
+
+    *spec* is ``true``/``false`` (defaults / off) or an object with
+    optional ``max_chars`` and ``window_ms``.  Raises ``ValueError`` for
+    values of the wrong type or out of range.
+    """
+    if spec is None or spec is True:
+        return DEFAULT_COALESCE
+    if spec is False:
+        return COALESCE_OFF
+    if not isinstance(spec, dict):
+        raise ValueError("coalesce must be a boolean or an object")
+    try:
+        max_chars = int(spec.get("max_chars", DEFAULT_COALESCE.max_chars))
+        window_ms = float(spec.get("window_ms", DEFAULT_COALESCE.window_ms))
+    except (TypeError, ValueError) as exc:
+        raise ValueError("max_chars and window_ms must be numbers") from exc
+    if not MAX_CHARS_RANGE[0] <= max_chars <= MAX_CHARS_RANGE[1]:
+        raise ValueError(f"max_chars must be within {MAX_CHARS_RANGE}")
+    if not WINDOW_MS_RANGE[0] <= window_ms <= WINDOW_MS_RANGE[1]:
+        raise ValueError(f"window_ms must be within {WINDOW_MS_RANGE}")
+    return CoalesceConfig(max_chars, window_ms)
+
+
+class FrameCoalescer:
+    """Buffer text for *send* and flush it on size, time window or ``close``.
+
+    Sends are serialised, so frames always go out in order even when the
+    window timer and a size-triggered flush race.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        config: CoalesceConfig = DEFAULT_COALESCE,
+    ) -> None:
+        self._send = send
+        self._config = config
+        self._parts: list[str] = []
+        self._size = 0
+        self._timer: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    async def add(self, text: str) -> None:
+        """Queue *text*; it is sent immediately when coalescing is off."""
+        if not text:
+            return
+        metrics.incr("coalesce.chunks")
+        if not self._config.enabled:
+            await self._send_now(text)
+            return
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._config.max_chars:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        """Send whatever is buffered now."""
+        self._cancel_timer()
+        if not self._parts:
+            return
+        text = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        await self._send_now(text)
+
+    async def close(self) -> None:
+        """Flush the buffer at end of stream and stop the window timer."""
+        await self.flush()
+        async with self._lock:
+            pass  # wait for a send the window timer already started
+
+    def discard(self) -> None:
+        """Drop buffered text and the timer (the request was cancelled)."""
+        self._cancel_timer()
+        self._parts.clear()
+        self._size = 0
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._config.window_ms / 1000)
+        self._timer = None  # don't let flush() cancel the running timer
+        await self.flush()
+
+    def _cancel_timer(self) -> None:
+        timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+
+    async def _send_now(self, text: str) -> None:
+        async with self._lock:
+            metrics.incr("coalesce.frames")
+            await self._send(text)
+
+
+@contextlib.asynccontextmanager
+async def coalesced(
+    send: Callable[[str], Awaitable[None]], config: CoalesceConfig = DEFAULT_COALESCE
+) -> AsyncIterator[FrameCoalescer]:
+    """``FrameCoalescer`` that is flushed on normal exit and discarded on error."""
+    coalescer = FrameCoalescer(send, config)
+    try:
+        yield coalescer
+    except BaseException:
+        coalescer.discard()
+        raise
+    await coalescer.close()
@@ -0,0 +1,104 @@
+"""Binary WebSocket frame codec for raw audio on ``/chat``.
+
+Control messages stay JSON; audio can travel as binary frames once the
+client opts in (``"binary_audio": true``), avoiding base64's ~33%
+overhead and the encode/decode CPU on both ends.
+
+Every binary frame starts with an 8-byte big-endian header::
+
+    version:u8  layer:u8  flags:u8  reserved:u8  request_id:u32
+
+* ``audio`` (server → client): payload is the raw synthesized audio.
+  ``FLAG_FINAL`` with an empty payload ends the turn's audio.
+* ``audio_in`` (client → server): payload is ``meta_len:u32``, a UTF-8
+  JSON object with the usual message fields (``session_id``,
+  ``voice_mode``, ...; may be empty), then the raw recorded audio.
+* ``audio_chunk`` (client → server): payload is a raw chunk of an audio
+  stream opened with ``{"audio_stream": "start"}``; ``FLAG_FINAL`` ends it.
+
+Clients without binary frames keep sending base64 audio in JSON messages;
+``decode_base64_audio`` validates and decodes it.
+"""
+
+import base64
+import json
+import struct
+from dataclasses import dataclass
+
+FRAME_VERSION = 1
+FLAG_FINAL = 0x01
+
+LAYER_CODES = {"audio": 1, "audio_in": 2, "audio_chunk": 3}
+_LAYER_NAMES = {code: name for name, code in LAYER_CODES.items()}
+
+_HEADER = struct.Struct("!BBBxI")
+_META_LEN = struct.Struct("!I")
+
+
+class FrameError(ValueError):
+    """Raised when a binary frame is malformed."""
+
+
+@dataclass(frozen=True)
+class Frame:
+    layer: str
+    request_id: int
+    final: bool
+    payload: bytes
+
+
+def encode_frame(
+    layer: str, request_id: int, payload: bytes = b"", *, final: bool = False
+) -> bytes:
+    """Build a binary frame for *layer*."""
+    header = _HEADER.pack(
+        FRAME_VERSION, LAYER_CODES[layer], FLAG_FINAL if final else 0, request_id & 0xFFFFFFFF
+    )
+    return header + payload
+
+
+def decode_frame(data: bytes) -> Frame:
+    """Parse a binary frame; raises ``FrameError`` when it is malformed."""
+    if len(data) < _HEADER.size:
+        raise FrameError("frame shorter than header")
+    version, layer_code, flags, request_id = _HEADER.unpack_from(data)
+    if version != FRAME_VERSION:
+        raise FrameError(f"unsupported frame version {version}")
+    layer = _LAYER_NAMES.get(layer_code)
+    if layer is None:
+        raise FrameError(f"unknown layer code {layer_code}")
+    return Frame(layer, request_id, bool(flags & FLAG_FINAL), data[_HEADER.size :])
+
+
+def decode_audio_message(payload: bytes) -> tuple[dict, bytes]:
+    """Split an ``audio_in`` payload into its JSON metadata and raw audio."""
+    if len(payload) < _META_LEN.size:
+        raise FrameError("missing metadata length")
+    (meta_len,) = _META_LEN.unpack_from(payload)
+    start = _META_LEN.size
+    if len(payload) < start + meta_len:
+        raise FrameError("metadata length exceeds frame")
+    meta: dict = {}
+    if meta_len:
+        try:
+            meta = json.loads(payload[start : start + meta_len])
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise FrameError("invalid metadata JSON") from exc
+        if not isinstance(meta, dict):
+            raise FrameError("metadata must be a JSON object")
+    return meta, payload[start + meta_len :]
+
+
+def encode_audio_message(meta: dict, audio: bytes, request_id: int = 0) -> bytes:
+    """Build an ``audio_in`` frame (the client-side counterpart, for tooling)."""
+    meta_bytes = json.dumps(meta).encode("utf-8") if meta else b""
+    return encode_frame(
+        "audio_in", request_id, _META_LEN.pack(len(meta_bytes)) + meta_bytes + audio
+    )
+
+
+def decode_base64_audio(value: object) -> bytes:
+    """Decode base64 audio from a JSON field; raises ``ValueError`` unless it is a valid string."""
+    if not isinstance(value, str):
+        raise ValueError("audio must be a base64 string")
+    return base64.b64decode(value)  # binascii.Error is a ValueError
@@ -0,0 +1,200 @@
+"""Shared Google Application Default Credentials for the voice APIs.
+
+STT and TTS call Google over plain HTTPS and need a bearer token; the
+streaming recogniser passes the same credentials to its gRPC client.  One
+``GoogleCredentialManager`` owns the credentials for the process:
+
+* a background task refreshes the token ``GOOGLE_TOKEN_REFRESH_MARGIN``
+  seconds before it expires, so requests never wait on OAuth;
+* concurrent refreshes (startup, a cold request, the background task)
+  collapse into a single in-flight refresh;
+* token age, time to expiry and refresh latency are exposed on
+  ``GET /metrics``.
+"""
+
+import asyncio
+import contextlib
+import datetime
+import logging
+import os
+import time
+
+import google.auth
+import google.auth.transport.requests
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_SCOPES = ("https://www.googleapis.com/auth/cloud-platform",)
+GOOGLE_TOKEN_REFRESH_MARGIN = float(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN", "300"))
+GOOGLE_TOKEN_RETRY_MAX = 300.0
+
+
+def _utcnow() -> datetime.datetime:
+    # google-auth stores ``expiry`` as a naive UTC datetime.
+    return datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+
+
+class GoogleCredentialManager:
+    """Process-wide ADC token holder with proactive, single-flight refresh."""
+
+    def __init__(self, scopes: tuple[str, ...] = GOOGLE_SCOPES) -> None:
+        self._scopes = scopes
+        self._credentials = None
+        self._project_id: str | None = None
+        self._refreshed_at: float | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self._background: asyncio.Task | None = None
+
+    # -- refresh ---------------------------------------------------------------
+
+    def _refresh_sync(self) -> None:
+        if self._credentials is None:
+            self._credentials, self._project_id = google.auth.default(scopes=list(self._scopes))
+        self._credentials.refresh(google.auth.transport.requests.Request())
+
+    async def _do_refresh(self) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._refresh_sync)
+        except Exception:
+            metrics.incr("google_auth.refresh_errors")
+            raise
+        metrics.observe("google_auth.refresh", time.perf_counter() - start)
+        metrics.incr("google_auth.refreshes")
+        self._refreshed_at = time.monotonic()
+
+    async def refresh(self) -> None:
+        """Refresh the token, joining a refresh that is already in flight."""
+        task = self._refresh_task
+        if task is None or task.done():
+            task = self._refresh_task = asyncio.create_task(self._do_refresh())
+        # Shield so a cancelled caller doesn't abort the refresh for everyone else.
+        await asyncio.shield(task)
+
+    @property
+    def credentials(self):
+        """The shared credentials object (None until the first refresh)."""
+        return self._credentials
+
+    def expires_in(self) -> float | None:
+        """Seconds until the current token expires (None if unknown)."""
+        creds = self._credentials
+        if creds is None or not creds.token:
+            return None
+        if creds.expiry is None:
+            return float("inf")
+        return (creds.expiry - _utcnow()).total_seconds()
+
+    def _usable(self) -> bool:
+        remaining = self.expires_in()
+        return remaining is not None and remaining > 0
+
+    # -- public API ------------------------------------------------------------
+
+    async def get_auth_data(self) -> tuple[str, str | None]:
+        """Return ``(access_token, project_id)``.
+
+        Only blocks when there is no usable token yet (first use or the
+        background refresher is not running); otherwise a token close to
+        expiry triggers a background refresh and the current one is used.
+        """
+        if not self._usable():
+            metrics.incr("google_auth.blocked_requests")
+            await self.refresh()
+        elif self.expires_in() < GOOGLE_TOKEN_REFRESH_MARGIN and (
+            self._refresh_task is None or self._refresh_task.done()
+        ):
+            self._refresh_task = asyncio.create_task(self._do_refresh())
+            self._refresh_task.add_done_callback(_log_refresh_failure)
+        project = os.environ.get("VERTEX_PROJECT") or self._project_id
+        return self._credentials.token, project
+
+    async def headers(self) -> dict[str, str]:
+        """Return JSON request headers carrying the bearer token and quota project."""
+        access_token, project_id = await self.get_auth_data()
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+        }
+        if project_id:
+            headers["x-goog-user-project"] = project_id
+        return headers
+
+    async def _refresh_loop(self) -> None:
+        failures = 0
+        floor = 0.0  # minimum wait once a refresh has succeeded
+        while True:
+            if failures:
+                delay = min(GOOGLE_TOKEN_RETRY_MAX, 5.0 * 2 ** (failures - 1))
+            else:
+                remaining = self.expires_in()
+                delay = (
+                    0.0
+                    if remaining is None
+                    else min(max(remaining - GOOGLE_TOKEN_REFRESH_MARGIN, floor), 3600.0)
+                )
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+            except Exception as exc:
+                failures += 1
+                logger.warning("Google token refresh failed (attempt %d): %s", failures, exc)
+                continue
+            failures = 0
+            floor = 30.0
+
+    def start(self) -> None:
+        if self._background is None or self._background.done():
+            self._background = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        for task in (self._background, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await task
+        self._background = None
+        self._refresh_task = None
+
+    def stats(self) -> dict:
+        remaining = self.expires_in()
+        return {
+            "token_age_seconds": (
+                round(time.monotonic() - self._refreshed_at, 1) if self._refreshed_at else None
+            ),
+            "expires_in_seconds": (
+                round(remaining, 1) if remaining not in (None, float("inf")) else None
+            ),
+            "background_refresh": self._background is not None and not self._background.done(),
+        }
+
+
+def _log_refresh_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background Google token refresh failed: %s", task.exception())
+
+
+_manager = GoogleCredentialManager()
+
+
+def get_credential_manager() -> GoogleCredentialManager:
+    return _manager
+
+
+def start_google_auth() -> None:
+    """Start the background token refresher (called from the lifespan)."""
+    _manager.start()
+
+
+async def stop_google_auth() -> None:
+    await _manager.stop()
+
+
+async def google_auth_headers() -> dict[str, str]:
+    """Shortcut for ``get_credential_manager().headers()``."""
+    return await _manager.headers()
+
+
+metrics.register_provider("google_auth", _manager.stats)
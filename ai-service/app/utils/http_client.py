@@ -0,0 +1,113 @@
+"""App-scoped pooled HTTP client for ai-service → chat-service traffic.
+
+A single ``httpx.AsyncClient`` is created in the FastAPI lifespan and
+shared by every WebSocket turn, so keep-alive connections are reused
+instead of paying a TCP (and pool) setup on each chat-service call.
+"""
+
+import logging
+import os
+
+import httpx
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+CHAT_SERVICE_URL = os.getenv("CHAT_SERVICE_URL", "http://chat_service:8000")
+
+CHAT_HTTP_TIMEOUT = float(os.getenv("CHAT_HTTP_TIMEOUT", "30"))
+CHAT_HTTP_MAX_CONNECTIONS = int(os.getenv("CHAT_HTTP_MAX_CONNECTIONS", "100"))
+CHAT_HTTP_MAX_KEEPALIVE = int(os.getenv("CHAT_HTTP_MAX_KEEPALIVE", "20"))
+CHAT_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("CHAT_HTTP_KEEPALIVE_EXPIRY", "30"))
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_enabled() -> bool:
+    """Return True when HTTP/2 is requested and the ``h2`` package is available."""
+    if os.getenv("CHAT_HTTP2", "false").lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("CHAT_HTTP2 is set but 'h2' is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+async def _on_request(request: httpx.Request) -> None:
+    metrics.incr("chat_http.requests")
+
+
+async def _on_response(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        metrics.incr("chat_http.errors")
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=CHAT_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=CHAT_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=CHAT_HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        base_url=CHAT_SERVICE_URL,
+        timeout=CHAT_HTTP_TIMEOUT,
+        limits=limits,
+        http2=_http2_enabled(),
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    )
+
+
+async def init_chat_client() -> httpx.AsyncClient:
+    """Create the shared chat-service client (called from the lifespan)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        logger.info(
+            "Chat-service HTTP client ready (max_connections=%d, keepalive=%d, http2=%s)",
+            CHAT_HTTP_MAX_CONNECTIONS,
+            CHAT_HTTP_MAX_KEEPALIVE,
+            _http2_enabled(),
+        )
+    return _client
+
+
+async def close_chat_client() -> None:
+    """Close the shared client and release pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_chat_client() -> httpx.AsyncClient:
+    """Return the shared chat-service client, creating it lazily if needed."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def pool_stats() -> dict:
+    """Return a snapshot of the connection pool for observability."""
+    stats = {
+        "open": _client is not None and not _client.is_closed,
+        "max_connections": CHAT_HTTP_MAX_CONNECTIONS,
+        "max_keepalive": CHAT_HTTP_MAX_KEEPALIVE,
+    }
+    if _client is None:
+        return stats
+
+    # httpx does not expose pool state publicly; read it from httpcore.
+    pool = getattr(_client._transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    stats["connections"] = len(connections)
+    stats["idle"] = sum(1 for conn in connections if conn.is_idle())
+    stats["active"] = stats["connections"] - stats["idle"]
+    stats["http2"] = bool(getattr(pool, "_http2", False))
+    return stats
+
+
+metrics.register_provider("chat_http", pool_stats)
@@ -0,0 +1,26 @@
+"""Identifier helpers for ai_service."""
+
+import os
+import time
+import uuid
+
+
+def uuid7() -> str:
+    """Return a time-ordered UUIDv7 string (48-bit ms timestamp + randomness)."""
+    unix_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (unix_ms & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76  # version 7
+    value |= (rand >> 68) << 64  # rand_a (12 bits)
+    value |= 0b10 << 62  # RFC 4122 variant
+    value |= rand & ((1 << 62) - 1)  # rand_b (62 bits)
+    return str(uuid.UUID(int=value))
+
+
+def new_session_id() -> str:
+    """Return a new chat session id.
+
+    Generating the id locally lets the client learn its session id
+    immediately instead of waiting on ``POST /sessions`` in chat-service.
+    """
+    return uuid7()
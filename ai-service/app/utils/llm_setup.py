@@ -1,12 +1,62 @@
 """Configure LiteLLM + embedder for GraphRAG usage."""
 
+import asyncio
+import logging
 import os
 import threading
+from collections.abc import Awaitable, Callable
+from typing import Any
 
 from graphrag_sdk import LiteLLM, LiteLLMEmbedder
 
+from app.utils.rate_limit import BACKGROUND, get_vertex_limiter, is_rate_limited
 from app.utils.setup_client import check_vertex, get_client
 
+logger = logging.getLogger(__name__)
+
+
+class RateLimitedLiteLLM(LiteLLM):
+    """``LiteLLM`` whose async calls go through the shared Vertex rate limiter.
+
+    Each attempt takes a background-priority token, so graph ingestion and
+    retrieval never delay the chat stream.  Quota errors are retried by the
+    limiter (backing off together with every other caller); other errors
+    (5xx, timeouts) keep the SDK's ``max_retries`` and ``2**attempt`` sleeps.
+    """
+
+    async def ainvoke(self, prompt: str, *, max_retries: int = 3, **kwargs: Any):
+        return await self._retry(
+            lambda: LiteLLM.ainvoke(self, prompt, max_retries=1, **kwargs), max_retries
+        )
+
+    async def ainvoke_messages(self, messages, *, max_retries: int = 3, **kwargs: Any):
+        return await self._retry(
+            lambda: LiteLLM.ainvoke_messages(self, messages, max_retries=1, **kwargs),
+            max_retries,
+        )
+
+    @staticmethod
+    async def _retry(fn: Callable[[], Awaitable[Any]], max_retries: int) -> Any:
+        limiter = get_vertex_limiter()
+        attempt = 0
+        while True:
+            try:
+                return await limiter.call(fn, label="GraphRAG LLM", priority=BACKGROUND)
+            except Exception as exc:
+                attempt += 1
+                if is_rate_limited(exc) or attempt >= max_retries:
+                    raise
+                delay = 2 ** (attempt - 1)
+                logger.warning(
+                    "GraphRAG LLM call failed (attempt %d/%d), retrying in %ds: %s",
+                    attempt,
+                    max_retries,
+                    delay,
+                    exc,
+                )
+                await asyncio.sleep(delay)
+
+
 _lock = threading.Lock()
 _cached_llm: LiteLLM | None = None
 _cached_embedder: LiteLLMEmbedder | None = None
@@ -25,8 +75,6 @@ def setup_llm() -> tuple[LiteLLM, LiteLLMEmbedder]:
             return _cached_llm, _cached_embedder
 
         _, model = get_client()
-        project = os.getenv("GOOGLE_CLOUD_PROJECT", "dear-ai-485310")
-        location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
         # Check for both variable names to protect against Docker env omissions
         endpoint_id = os.getenv("VERTEX_ENDPOINT_ID") or os.getenv("VERTEX_MODEL_ID")
 
@@ -35,10 +83,8 @@ def setup_llm() -> tuple[LiteLLM, LiteLLMEmbedder]:
                 "CRITICAL: Both VERTEX_ENDPOINT_ID and VERTEX_MODEL_ID are missing from the container environment!"
             )
 
-        custom_api_base = f"https://{location}-aiplatform.googleapis.com/v1/projects/{project}/locations/{location}/endpoints/{endpoint_id}"
-
         if check_vertex():
-            llm = LiteLLM(
+            llm = RateLimitedLiteLLM(
                 model="vertex_ai/gemini-2.5-flash-lite",
                 vertex_project=os.getenv("VERTEX_PROJECT"),
                 vertex_location=os.getenv("VERTEX_LOCATION"),
@@ -47,7 +93,7 @@ def setup_llm() -> tuple[LiteLLM, LiteLLMEmbedder]:
 
             embed_model = f"vertex_ai/{os.getenv('EMBEDDING_MODEL', 'text-embedding-004')}"
         else:
-            llm = LiteLLM(
+            llm = RateLimitedLiteLLM(
                 api_key=os.getenv("GEMINI_API_KEY"),
                 model=str(model),
                 temperature=0.0,
@@ -0,0 +1,85 @@
+"""Lightweight in-process metrics exposed on ``GET /metrics``.
+
+Counters and timings are plain module-level dicts: the service runs a
+single asyncio worker, so no locking is needed.  Components that own
+richer state (connection pools, caches) register a *provider* callable
+whose snapshot is merged into the output.
+"""
+
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+# Keep a bounded window of recent samples per timing for percentiles.
+_SAMPLE_WINDOW = 512
+
+_counters: defaultdict[str, int] = defaultdict(int)
+_timings: dict[str, deque[float]] = {}
+_timing_totals: defaultdict[str, list[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+_providers: dict[str, Callable[[], dict]] = {}
+
+
+def incr(name: str, value: int = 1) -> None:
+    """Increment counter *name* by *value*."""
+    _counters[name] += value
+
+
+def observe(name: str, seconds: float) -> None:
+    """Record a duration sample (in seconds) for timing *name*."""
+    samples = _timings.get(name)
+    if samples is None:
+        samples = _timings[name] = deque(maxlen=_SAMPLE_WINDOW)
+    samples.append(seconds)
+
+    totals = _timing_totals[name]
+    totals[0] += 1
+    totals[1] += seconds
+    totals[2] = max(totals[2], seconds)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Context manager that records the elapsed time of its block."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def percentile(name: str, pct: float) -> float | None:
+    """Return the *pct* percentile (0-100) of recent samples, or None."""
+    samples = _timings.get(name)
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[idx]
+
+
+def register_provider(name: str, provider: Callable[[], dict]) -> None:
+    """Register a callable whose dict is included under *name* in snapshots."""
+    _providers[name] = provider
+
+
+def snapshot() -> dict:
+    """Return all counters, timing summaries, and provider stats."""
+    timings = {}
+    for name, (count, total, max_seconds) in _timing_totals.items():
+        timings[name] = {
+            "count": count,
+            "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+            "max_ms": round(max_seconds * 1000, 3),
+            "p50_ms": round((percentile(name, 50) or 0.0) * 1000, 3),
+            "p95_ms": round((percentile(name, 95) or 0.0) * 1000, 3),
+        }
+
+    providers = {}
+    for name, provider in _providers.items():
+        try:
+            providers[name] = provider()
+        except Exception as exc:
+            providers[name] = {"error": str(exc)}
+
+    return {"counters": dict(_counters), "timings": timings, **providers}
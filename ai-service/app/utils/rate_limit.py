@@ -0,0 +1,236 @@
+"""Process-wide rate limiter for Gemini / Vertex AI calls.
+
+Every LLM call in the process (the chat stream, auto-titling, the
+GraphRAG LLM) takes a token from one ``VertexRateLimiter`` first:
+
+* a token bucket (``VERTEX_RATE_LIMIT_RPS`` sustained,
+  ``VERTEX_RATE_LIMIT_BURST`` burst) spaces calls out under load;
+* interactive callers (the chat stream) are served before background
+  ones (GraphRAG, summaries, auto-titles), each in arrival order, so
+  background work never delays a user's first token;
+* a 429 / ``RESOURCE_EXHAUSTED`` pauses the whole bucket, for the
+  server's ``Retry-After`` when present, otherwise exponential backoff
+  with full jitter, so a quota burst slows every caller down together
+  instead of each socket retrying in lockstep.
+
+Wait time, throttling and the current pause are on ``GET /metrics``.
+"""
+
+import asyncio
+import email.utils
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+VERTEX_RATE_LIMIT_RPS = float(os.getenv("VERTEX_RATE_LIMIT_RPS", "5"))
+VERTEX_RATE_LIMIT_BURST = int(os.getenv("VERTEX_RATE_LIMIT_BURST", "10"))
+VERTEX_MAX_ATTEMPTS = int(os.getenv("VERTEX_MAX_ATTEMPTS", "4"))
+VERTEX_BACKOFF_BASE = float(os.getenv("VERTEX_BACKOFF_BASE", "1.0"))
+VERTEX_BACKOFF_MAX = float(os.getenv("VERTEX_BACKOFF_MAX", "30"))
+
+T = TypeVar("T")
+
+# Priorities for acquire() / call(); lower is served first.
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """True for quota errors from google-genai, LiteLLM or plain HTTP."""
+    for attr in ("code", "status_code"):
+        if getattr(exc, attr, None) == 429:
+            return True
+    message = str(exc)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Seconds from the ``Retry-After`` header of the error's response, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class _Waiter:
+    __slots__ = ("event", "priority", "seq")
+
+    def __init__(self, priority: int, seq: int) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.event = asyncio.Event()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class VertexRateLimiter:
+    """Token bucket with prioritised FIFO waiters and a shared 429 pause."""
+
+    def __init__(
+        self,
+        rate: float = VERTEX_RATE_LIMIT_RPS,
+        burst: int = VERTEX_RATE_LIMIT_BURST,
+        *,
+        max_attempts: int = VERTEX_MAX_ATTEMPTS,
+        backoff_base: float = VERTEX_BACKOFF_BASE,
+        backoff_max: float = VERTEX_BACKOFF_MAX,
+    ) -> None:
+        self.rate = rate  # tokens per second; <= 0 disables the bucket
+        self.burst = max(1, burst)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: list[_Waiter] = []  # heap; the head is the next to be served
+        self._seq = itertools.count()
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: int = INTERACTIVE) -> None:
+        """Wait for a token and for any 429 pause to end.
+
+        Waiters are served by *priority*, then in arrival order; only the
+        head of the queue takes tokens.
+        """
+        start = time.monotonic()
+        waiter = _Waiter(priority, next(self._seq))
+        heapq.heappush(self._waiters, waiter)
+        try:
+            while True:
+                if self._waiters[0] is not waiter:
+                    waiter.event.clear()
+                    await waiter.event.wait()
+                    continue
+                now = time.monotonic()
+                self._refill(now)
+                delay = self._paused_until - now
+                if delay <= 0:
+                    if self.rate <= 0:
+                        break
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    delay = (1 - self._tokens) / self.rate
+                # A higher-priority arrival may become the head meanwhile;
+                # the loop re-checks after the sleep.
+                await asyncio.sleep(delay)
+        finally:
+            self._remove(waiter)
+        waited = time.monotonic() - start
+        metrics.observe("vertex_limiter.wait", waited)
+        if priority >= BACKGROUND:
+            metrics.observe("vertex_limiter.wait_background", waited)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        was_head = self._waiters[0] is waiter
+        self._waiters.remove(waiter)
+        heapq.heapify(self._waiters)
+        if was_head and self._waiters:
+            self._waiters[0].event.set()
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is free right now (for optional extra calls)."""
+        if self._waiters:
+            return False  # never jump the queue
+        now = time.monotonic()
+        self._refill(now)
+        if self._paused_until > now:
+            return False
+        if self.rate > 0:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+        return True
+
+    def backoff(self, exc: BaseException, attempt: int) -> float | None:
+        """Decide whether a failed call should be retried.
+
+        Returns None when *exc* is not a quota error or *attempt* (0-based)
+        was the last one.  Otherwise pauses the whole limiter and returns
+        the delay; the next ``acquire`` waits it out.
+        """
+        if not is_rate_limited(exc) or attempt + 1 >= self.max_attempts:
+            return None
+        delay = retry_after(exc)
+        if delay is None:
+            # Full jitter: spread the retries of concurrent callers.
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+        delay = min(delay, self.backoff_max)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        metrics.incr("vertex_limiter.throttled")
+        return delay
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        *,
+        label: str = "LLM call",
+        priority: int = INTERACTIVE,
+    ) -> T:
+        """Run ``await fn()`` under the limiter, retrying quota errors."""
+        attempt = 0
+        while True:
+            await self.acquire(priority)
+            try:
+                return await fn()
+            except Exception as exc:
+                delay = self.backoff(exc, attempt)
+                if delay is None:
+                    raise
+                logger.warning(
+                    "%s rate limited; retrying in %.1fs (attempt %d/%d)",
+                    label,
+                    delay,
+                    attempt + 1,
+                    self.max_attempts,
+                )
+                attempt += 1
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "waiting": len(self._waiters),
+            "waiting_background": sum(w.priority >= BACKGROUND for w in self._waiters),
+            "paused_for_seconds": round(max(0.0, self._paused_until - now), 2),
+        }
+
+
+_limiter = VertexRateLimiter()
+
+
+def get_vertex_limiter() -> VertexRateLimiter:
+    return _limiter
+
+
+metrics.register_provider("vertex_limiter", _limiter.stats)
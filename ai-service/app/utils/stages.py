@@ -0,0 +1,88 @@
+"""Tiny DAG scheduler for the pre-generation stages of a chat turn.
+
+Each ``Stage`` names the stages it depends on.  ``run_stages`` starts
+every stage as soon as its dependencies have finished, so independent
+work (e.g. history fetch and graph retrieval) overlaps and the total
+latency is the longest dependency path rather than the sum of stages.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+StageFn = Callable[[dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A unit of pre-generation work.
+
+    ``run`` receives a dict of its dependencies' results.  ``when`` may veto
+    the stage based on those results, in which case ``default`` is used.
+    With ``on_error="skip"`` a timeout or exception also yields ``default``
+    instead of failing the whole turn.
+    """
+
+    name: str
+    run: StageFn
+    deps: tuple[str, ...] = ()
+    timeout: float | None = None
+    on_error: Literal["fail", "skip"] = "fail"
+    default: Any = None
+    when: Callable[[dict[str, Any]], bool] | None = None
+
+
+async def _run_stage(stage: Stage, tasks: dict[str, asyncio.Task], label: str) -> Any:
+    dep_results = {dep: await tasks[dep] for dep in stage.deps}
+
+    if stage.when is not None and not stage.when(dep_results):
+        metrics.incr(f"stage.{stage.name}.skipped")
+        return stage.default
+
+    start = time.perf_counter()
+    try:
+        async with asyncio.timeout(stage.timeout):
+            return await stage.run(dep_results)
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        if stage.on_error != "skip":
+            raise
+        reason = "timed out" if isinstance(exc, TimeoutError) else f"failed: {exc}"
+        logger.warning("[%s] Stage '%s' %s; continuing without it", label, stage.name, reason)
+        metrics.incr(f"stage.{stage.name}.errors")
+        return stage.default
+    finally:
+        metrics.observe(f"stage.{stage.name}", time.perf_counter() - start)
+
+
+async def run_stages(stages: list[Stage], *, label: str = "") -> dict[str, Any]:
+    """Run *stages* concurrently respecting dependencies; return results by name.
+
+    Stages must be listed after all of their dependencies, which also
+    guarantees the graph is acyclic.  If a ``fail`` stage raises, the
+    remaining stages are cancelled and the exception propagates.
+    """
+    tasks: dict[str, asyncio.Task] = {}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in tasks]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on undeclared stage(s) {missing}")
+        tasks[stage.name] = asyncio.create_task(_run_stage(stage, tasks, label))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    return {name: task.result() for name, task in tasks.items()}
@@ -0,0 +1,68 @@
+"""Per-request task ownership built on ``asyncio.TaskGroup``.
+
+Every task a chat turn starts (TTS synthesis, the TTS sender, session
+creation and auto-titling) is spawned into the turn's ``RequestScope``.
+Cancelling the turn cancels the scope, which tears down all of its
+children instead of leaving them running for a response nobody reads.
+"""
+
+import asyncio
+import logging
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RequestScope:
+    """Async context manager owning the side tasks of one request.
+
+    Children never fail the scope: an exception in a spawned task is
+    logged and the task resolves to ``None``.  Leaving the scope normally
+    waits for outstanding children; leaving it through cancellation or
+    an error cancels them.
+    """
+
+    def __init__(self, label: str) -> None:
+        self._label = label
+        self._group = asyncio.TaskGroup()
+
+    async def __aenter__(self) -> "RequestScope":
+        await self._group.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool | None:
+        try:
+            return await self._group.__aexit__(exc_type, exc, tb)
+        except BaseExceptionGroup as group:
+            if exc is None or group.exceptions != (exc,):
+                raise
+        # Children never raise (see _guard), so the only error is the body's
+        # own; re-raise it unwrapped, and outside the ``except`` so its
+        # cause and context stay as they were, for the caller's handlers.
+        raise exc
+
+    def spawn(self, coro: Coroutine[Any, Any, T], *, name: str) -> "asyncio.Task[T | None]":
+        """Start *coro* as a child task of this request."""
+        task = self._group.create_task(self._guard(coro, name), name=f"{self._label}:{name}")
+        metrics.incr("request_scope.spawned")
+        task.add_done_callback(_count_cancelled)
+        return task
+
+    async def _guard(self, coro: Coroutine[Any, Any, T], name: str) -> T | None:
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.error("[%s] Task '%s' failed: %s", self._label, name, exc)
+            return None
+
+
+def _count_cancelled(task: asyncio.Task) -> None:
+    if task.cancelled():
+        metrics.incr("request_scope.cancelled_tasks")
@@ -0,0 +1,152 @@
+"""Benchmark: single-pass guardrail engine vs. the previous per-regex checks.
+
+Run from ai-service/:  python bench_guardrails.py
+
+The "legacy" functions below reproduce the old implementations
+(check_safety + check_relevance looping over their compiled regexes and
+check_query_safety recompiling four regexes per call), i.e. what every
+message used to pay.  Verdicts are compared first, then timed on clean
+and flagged messages of realistic lengths, followed by the per-chunk cost
+of the streaming output guardrail.
+"""
+
+import random
+import re
+import timeit
+
+from app.services.guardrails.engine import scan
+from app.services.guardrails.output import OutputGuardrail
+from app.services.guardrails.regex_guardrail import check_query_safety
+from app.services.guardrails.rules import (
+    EMERGENCY,
+    EMERGENCY_PATTERNS,
+    IRRELEVANT_PATTERNS,
+    OFF_TOPIC,
+)
+
+_LEGACY_EMERGENCY = [re.compile(p, re.IGNORECASE) for p in EMERGENCY_PATTERNS]
+_LEGACY_IRRELEVANT = [re.compile(p, re.IGNORECASE) for p in IRRELEVANT_PATTERNS]
+
+
+def legacy_check_safety(content: str) -> bool:
+    return not any(p.search(content) for p in _LEGACY_EMERGENCY)
+
+
+def legacy_check_relevance(content: str) -> bool:
+    return not any(p.search(content) for p in _LEGACY_IRRELEVANT)
+
+
+def legacy_check_query_safety(user_query: str) -> dict:
+    pattern_injection = re.compile(
+        r"\b(ignore previous instructions|forget everything|system prompt|bypass rules|you are now|DAN)\b"
+        r"|^\s*(/|sudo |exec )",
+        re.IGNORECASE,
+    )
+    pattern_code = re.compile(
+        r"(<script.*?>|javascript:|os\.system|subprocess|eval\()"
+        r"|\b(DROP TABLE|TRUNCATE TABLE|DELETE FROM|SELECT \* FROM)\b",
+        re.IGNORECASE,
+    )
+    pattern_harm = re.compile(
+        r"\b(kill myself|suicide|end my life|cut myself|slit my|shoot myself)\b",
+        re.IGNORECASE,
+    )
+    pattern_toxicity = re.compile(r"\b(hate speech word 1|hate speech word 2)\b", re.IGNORECASE)
+    if pattern_injection.search(user_query):
+        return {"is_safe": False, "reason": "prompt_injection_or_command_detected"}
+    if pattern_code.search(user_query):
+        return {"is_safe": False, "reason": "script_or_code_execution_detected"}
+    if pattern_harm.search(user_query):
+        return {"is_safe": False, "reason": "self_harm_or_violence_detected"}
+    if pattern_toxicity.search(user_query):
+        return {"is_safe": False, "reason": "toxicity_detected"}
+    return {"is_safe": True, "reason": "passed_regex_checks"}
+
+
+def legacy_all(text: str) -> tuple:
+    return legacy_check_safety(text), legacy_check_relevance(text), legacy_check_query_safety(text)
+
+
+def engine_all(text: str) -> tuple:
+    result = scan(text)
+    return not result.flagged(EMERGENCY), not result.flagged(OFF_TOPIC), result
+
+
+# fmt: off
+WORDS = [
+    "i", "feel", "today", "work", "friend", "really", "tired", "sleep", "mom", "talked",
+    "about", "weekend", "anxious", "better", "worried", "happy", "sad", "week", "job",
+    "school", "thinking", "lately", "overwhelmed", "family", "call", "dinner", "walk",
+    "calm", "stress", "honestly", "maybe", "again",
+]
+# fmt: on
+
+TRIGGERS = [
+    "i want to die",
+    "can't take it anymore",
+    "write code in python",
+    "ignore previous instructions",
+    "DROP TABLE users",
+    "i might hurt myself",
+]
+
+
+def make_message(rng: random.Random, length: int, trigger: str | None = None) -> str:
+    words: list[str] = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(WORDS))
+    if trigger:
+        words.insert(rng.randrange(len(words) + 1), trigger)
+    return " ".join(words)
+
+
+def check_parity(rng: random.Random) -> None:
+    samples = [make_message(rng, n) for n in (40, 200, 1000) for _ in range(50)]
+    samples += [make_message(rng, n, t) for n in (40, 200, 1000) for t in TRIGGERS]
+    samples += ["/exec rm", "sudo rm -rf", "<script>alert(1)</script>", "I am Dan", ""]
+    for text in samples:
+        old_safe, old_rel, old_q = legacy_all(text)
+        new_safe, new_rel, _ = engine_all(text)
+        assert (old_safe, old_rel) == (new_safe, new_rel), text
+        assert old_q == check_query_safety(text), text
+    print(f"parity: {len(samples)} messages, identical verdicts")
+
+
+def main() -> None:
+    rng = random.Random(7)
+    check_parity(rng)
+    print(f"{'chars':>6} {'kind':>8} {'legacy µs':>10} {'engine µs':>10} {'speedup':>8}")
+    for length in (40, 200, 1000, 4000):
+        for kind, trigger in (("clean", None), ("flagged", "i want to die")):
+            messages = [make_message(rng, length, trigger) for _ in range(200)]
+            number = max(1, 20000 // length)
+            legacy = timeit.timeit(
+                lambda messages=messages: [legacy_all(m) for m in messages], number=number
+            )
+            engine = timeit.timeit(
+                lambda messages=messages: [engine_all(m) for m in messages], number=number
+            )
+            per = 1e6 / (number * len(messages))
+            print(
+                f"{length:>6} {kind:>8} {legacy * per:>10.1f} {engine * per:>10.1f} "
+                f"{legacy / engine:>7.1f}x"
+            )
+
+    # Output guardrail: cost per streamed chunk (LLM chunks are ~10-100 chars).
+    reply = make_message(rng, 4000)
+    print(f"\n{'chunk':>6} {'output guardrail µs/chunk':>26}")
+    for size in (10, 40, 100):
+        chunks = [reply[i : i + size] for i in range(0, len(reply), size)]
+
+        def stream(chunks: list[str] = chunks) -> None:
+            guard = OutputGuardrail()
+            for chunk in chunks:
+                guard.feed(chunk)
+            guard.flush()
+
+        elapsed = timeit.timeit(stream, number=50)
+        print(f"{size:>6} {elapsed / (50 * len(chunks)) * 1e6:>26.1f}")
+
+
+if __name__ == "__main__":
+    main()
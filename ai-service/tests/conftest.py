@@ -0,0 +1,9 @@
+"""Shared test setup.
+
+``app.auth.paseto`` loads its key at import, so a throwaway key is set
+before any test module imports the app.
+"""
+
+import os
+
+os.environ.setdefault("PASETO_SYMMETRIC_KEY", "00" * 32)
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from app.services.tts.tts import (
+    DEFAULT_AUDIO_FORMAT,
+    DEFAULT_SAMPLE_RATES,
+    AudioFormat,
+    parse_audio_format,
+)
+
+
+def test_missing_spec_uses_the_default():
+    assert parse_audio_format(None) is DEFAULT_AUDIO_FORMAT
+
+
+@pytest.mark.skipif("TTS_DEFAULT_ENCODING" in os.environ, reason="default overridden")
+def test_voice_mode_defaults_to_opus_with_mp3_on_request():
+    assert DEFAULT_AUDIO_FORMAT.encoding == "OGG_OPUS"
+    assert DEFAULT_AUDIO_FORMAT.media_type == "audio/ogg"
+    assert parse_audio_format("mp3").media_type == "audio/mpeg"
+
+
+def test_encoding_name_uses_its_default_rate():
+    assert parse_audio_format("ogg_opus") == AudioFormat(
+        "OGG_OPUS", DEFAULT_SAMPLE_RATES["OGG_OPUS"]
+    )
+    assert parse_audio_format("MP3") == AudioFormat("MP3", None)
+
+
+def test_object_spec_with_sample_rate():
+    fmt = parse_audio_format({"encoding": "LINEAR16", "sample_rate_hertz": "24000"})
+    assert fmt == AudioFormat("LINEAR16", 24000)
+    assert fmt.media_type == "audio/wav"
+    assert fmt.to_dict() == {"encoding": "LINEAR16", "sample_rate_hertz": 24000}
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        "AAC",
+        {"encoding": "FLAC"},
+        {"encoding": "MP3", "sample_rate_hertz": "fast"},
+        {"encoding": "MP3", "sample_rate_hertz": 96000},
+        {"encoding": "MP3", "sample_rate_hertz": 4000},
+        5,
+    ],
+)
+def test_unsupported_specs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        parse_audio_format(spec)
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.utils.coalescer import COALESCE_OFF, CoalesceConfig, coalesced, parse_coalesce
+
+
+class _Sink:
+    def __init__(self) -> None:
+        self.frames: list[str] = []
+
+    async def __call__(self, text: str) -> None:
+        self.frames.append(text)
+
+
+async def test_flushes_when_buffer_reaches_max_chars():
+    sink = _Sink()
+    async with coalesced(sink, CoalesceConfig(max_chars=5, window_ms=1000)) as coalescer:
+        await coalescer.add("abc")
+        assert sink.frames == []
+        await coalescer.add("def")
+        assert sink.frames == ["abcdef"]
+        await coalescer.add("g")
+    assert sink.frames == ["abcdef", "g"]
+
+
+async def test_flushes_after_window():
+    sink = _Sink()
+    async with coalesced(sink, CoalesceConfig(max_chars=100, window_ms=5)) as coalescer:
+        await coalescer.add("a")
+        await coalescer.add("b")
+        await asyncio.sleep(0.05)
+        assert sink.frames == ["ab"]
+
+
+async def test_disabled_sends_every_chunk():
+    sink = _Sink()
+    async with coalesced(sink, COALESCE_OFF) as coalescer:
+        await coalescer.add("a")
+        await coalescer.add("")
+        await coalescer.add("b")
+    assert sink.frames == ["a", "b"]
+
+
+async def test_error_discards_buffer():
+    sink = _Sink()
+    with pytest.raises(RuntimeError):
+        async with coalesced(sink, CoalesceConfig(max_chars=100, window_ms=5)) as coalescer:
+            await coalescer.add("a")
+            raise RuntimeError("cancelled turn")
+    await asyncio.sleep(0.02)
+    assert sink.frames == []
+
+
+def test_parse_coalesce():
+    assert parse_coalesce(False) is COALESCE_OFF
+    assert parse_coalesce({"max_chars": 64, "window_ms": 10}) == CoalesceConfig(64, 10.0)
+    for bad in ("yes", {"max_chars": "many"}, {"max_chars": 0}, {"window_ms": 1000}):
+        with pytest.raises(ValueError):
+            parse_coalesce(bad)
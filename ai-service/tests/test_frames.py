@@ -0,0 +1,64 @@
+import pytest
+
+from app.utils.frames import (
+    FrameError,
+    decode_audio_message,
+    decode_base64_audio,
+    decode_frame,
+    encode_audio_message,
+    encode_frame,
+)
+
+
+def test_frame_round_trip():
+    frame = decode_frame(encode_frame("audio", 7, b"pcm", final=True))
+    assert (frame.layer, frame.request_id, frame.final, frame.payload) == ("audio", 7, True, b"pcm")
+
+
+def test_request_id_wraps_to_u32():
+    assert decode_frame(encode_frame("audio_chunk", 2**32 + 5)).request_id == 5
+
+
+def test_audio_message_round_trip():
+    frame = decode_frame(encode_audio_message({"session_id": "s1"}, b"wav", request_id=3))
+    assert frame.layer == "audio_in"
+    assert decode_audio_message(frame.payload) == ({"session_id": "s1"}, b"wav")
+
+
+def test_audio_message_without_metadata():
+    frame = decode_frame(encode_audio_message({}, b"wav"))
+    assert decode_audio_message(frame.payload) == ({}, b"wav")
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"\x01\x01",  # shorter than the header
+        b"\x02\x01\x00\x00\x00\x00\x00\x01",  # unknown version
+        b"\x01\x09\x00\x00\x00\x00\x00\x01",  # unknown layer
+    ],
+)
+def test_malformed_frames(data):
+    with pytest.raises(FrameError):
+        decode_frame(data)
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b"\x00\x00",  # no metadata length
+        b"\x00\x00\x00\x09{}",  # length exceeds frame
+        b"\x00\x00\x00\x02[]",  # not an object
+        b"\x00\x00\x00\x02{x",  # invalid JSON
+    ],
+)
+def test_malformed_audio_messages(payload):
+    with pytest.raises(FrameError):
+        decode_audio_message(payload)
+
+
+def test_base64_audio_decodes_strings_only():
+    assert decode_base64_audio("cGNt") == b"pcm"
+    for value in (5, None, ["cGNt"], {"audio": "cGNt"}, "not base64!", "ü"):
+        with pytest.raises(ValueError):
+            decode_base64_audio(value)
@@ -0,0 +1,94 @@
+import asyncio
+import datetime
+import threading
+
+import pytest
+
+from app.utils import google_auth
+from app.utils.google_auth import GoogleCredentialManager
+
+
+class _Credentials:
+    def __init__(self) -> None:
+        self.token = None
+        self.expiry = None
+
+
+class _Manager(GoogleCredentialManager):
+    """Credential manager whose refresh issues numbered tokens locally."""
+
+    def __init__(self, lifetime: float = 3600.0) -> None:
+        super().__init__()
+        self.lifetime = lifetime
+        self.refreshes = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def _refresh_sync(self) -> None:
+        self.release.wait(5)
+        if self._credentials is None:
+            self._credentials, self._project_id = _Credentials(), "adc-project"
+        self.refreshes += 1
+        self._credentials.token = f"token-{self.refreshes}"
+        self._credentials.expiry = google_auth._utcnow() + datetime.timedelta(seconds=self.lifetime)
+
+
+@pytest.fixture(autouse=True)
+def no_project_override(monkeypatch):
+    monkeypatch.delenv("VERTEX_PROJECT", raising=False)
+
+
+async def test_concurrent_cold_requests_share_one_refresh():
+    manager = _Manager()
+    manager.release.clear()
+    tasks = [asyncio.create_task(manager.get_auth_data()) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    manager.release.set()
+    assert await asyncio.gather(*tasks) == [("token-1", "adc-project")] * 5
+    assert manager.refreshes == 1
+
+
+async def test_token_near_expiry_is_refreshed_in_the_background():
+    manager = _Manager(lifetime=google_auth.GOOGLE_TOKEN_REFRESH_MARGIN / 2)
+    await manager.refresh()
+    manager.release.clear()
+    # The current token is still valid, so the caller does not wait.
+    assert await manager.get_auth_data() == ("token-1", "adc-project")
+    assert await manager.get_auth_data() == ("token-1", "adc-project")
+    manager.release.set()
+    await manager._refresh_task
+    assert manager.refreshes == 2
+    assert (await manager.get_auth_data())[0] == "token-2"
+
+
+async def test_cancelled_caller_does_not_abort_the_refresh():
+    manager = _Manager()
+    manager.release.clear()
+    first = asyncio.create_task(manager.get_auth_data())
+    second = asyncio.create_task(manager.get_auth_data())
+    await asyncio.sleep(0.01)
+    first.cancel()
+    manager.release.set()
+    assert await second == ("token-1", "adc-project")
+    assert manager.refreshes == 1
+
+
+async def test_headers_carry_the_token_and_quota_project(monkeypatch):
+    monkeypatch.setenv("VERTEX_PROJECT", "quota-project")
+    headers = await _Manager().headers()
+    assert headers["Authorization"] == "Bearer token-1"
+    assert headers["x-goog-user-project"] == "quota-project"
+
+
+async def test_background_refresher_starts_and_stops():
+    manager = _Manager()
+    manager.start()
+    await asyncio.sleep(0)
+    # The refresher fetches the first token; a request joins that refresh.
+    await manager.get_auth_data()
+    assert manager.refreshes == 1
+    stats = manager.stats()
+    assert stats["background_refresh"]
+    assert stats["expires_in_seconds"] > 3500
+    await manager.stop()
+    assert not manager.stats()["background_refresh"]
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.services.llm import hedge
+
+
+@pytest.fixture(autouse=True)
+def _hedge_settings(monkeypatch):
+    monkeypatch.setattr(
+        hedge, "_stats", {"requests": 0, "hedged": 0, "hedge_wins": 0, "ttft_samples": 0}
+    )
+    monkeypatch.setattr(hedge, "LLM_HEDGE_BUDGET", 1.0)
+    monkeypatch.setattr(hedge, "hedge_delay", lambda: 0.02)
+
+
+def _opener(*streams):
+    """Return an ``open_stream`` that yields the given (delay, texts | error) per call."""
+    calls = iter(streams)
+    opened = []
+
+    def open_stream():
+        delay, result = next(calls)
+
+        async def gen():
+            await asyncio.sleep(delay)
+            if isinstance(result, Exception):
+                raise result
+            for text in result:
+                yield text
+
+        stream = gen()
+        opened.append(stream)
+        return stream
+
+    return open_stream, opened
+
+
+async def _collect(open_stream) -> list[str]:
+    return [text async for text in hedge.hedged_stream(open_stream)]
+
+
+async def test_fast_primary_is_not_hedged():
+    open_stream, opened = _opener((0, ["a", "b"]))
+    assert await _collect(open_stream) == ["a", "b"]
+    assert len(opened) == 1
+    assert hedge.stats()["hedged"] == 0
+
+
+async def test_slow_primary_loses_to_the_hedge():
+    open_stream, opened = _opener((1.0, ["slow"]), (0, ["fast", "!"]))
+    assert await _collect(open_stream) == ["fast", "!"]
+    assert len(opened) == 2
+    assert hedge.stats()["hedge_wins"] == 1
+
+
+async def test_failing_hedge_does_not_fail_the_turn():
+    open_stream, _ = _opener((0.05, ["primary"]), (0, RuntimeError("hedge down")))
+    assert await _collect(open_stream) == ["primary"]
+
+
+async def test_both_failing_raises_the_primary_error():
+    open_stream, _ = _opener((0.05, RuntimeError("primary")), (0, RuntimeError("hedge")))
+    with pytest.raises(RuntimeError, match="primary"):
+        await _collect(open_stream)
+
+
+async def test_budget_limits_hedges(monkeypatch):
+    monkeypatch.setattr(hedge, "LLM_HEDGE_BUDGET", 0.0)
+    open_stream, opened = _opener((0.05, ["only"]))
+    assert await _collect(open_stream) == ["only"]
+    assert len(opened) == 1
@@ -0,0 +1,59 @@
+import pytest
+
+from app.services.history import cache
+from app.services.history.cache import SessionHistory
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(cache, "_cache", type(cache._cache)())
+    monkeypatch.setattr(cache, "HISTORY_LIMIT", 4)
+
+
+def _messages(n: int) -> list[dict]:
+    return [{"role": "user" if i % 2 == 0 else "ai", "content": f"m{i}"} for i in range(n)]
+
+
+def test_from_messages_keeps_the_newest_and_builds_contents():
+    history = SessionHistory.from_messages("u1", "s1", _messages(6))
+    assert [m["content"] for m in history.messages] == ["m2", "m3", "m4", "m5"]
+    assert [c.role for c in history.contents] == ["user", "model", "user", "model"]
+
+
+def test_append_updates_contents_and_trims():
+    history = SessionHistory.from_messages("u1", "s1", _messages(3))
+    history.append("ai", "m3")
+    history.append("user", "m4")
+    assert [m["content"] for m in history.messages] == ["m1", "m2", "m3", "m4"]
+    assert len(history.contents) == 4
+    assert history.contents[-1].parts[0].text == "m4"
+
+
+def test_both_layers_share_one_history():
+    history = SessionHistory.from_messages("u1", "s1", _messages(2))
+    cache.put_history(history)
+    history.append("user", "m2")
+    assert cache.get_history("u1", "s1") is history
+    assert cache.get_history("u1", "s1").messages[-1]["content"] == "m2"
+    assert cache.get_history("u2", "s1") is None
+
+
+def test_lru_evicts_the_least_recent_session(monkeypatch):
+    monkeypatch.setattr(cache, "HISTORY_CACHE_MAX_SESSIONS", 2)
+    for sid in ("a", "b"):
+        cache.put_history(SessionHistory.from_messages("u1", sid, []))
+    cache.get_history("u1", "a")  # "b" is now least recently used
+    cache.put_history(SessionHistory.from_messages("u1", "c", []))
+    assert cache.get_history("u1", "b") is None
+    assert cache.get_history("u1", "a") is not None
+    assert cache.get_history("u1", "c") is not None
+
+
+def test_stale_entries_expire(monkeypatch):
+    history = SessionHistory.from_messages("u1", "s1", [])
+    cache.put_history(history)
+    monkeypatch.setattr(cache, "HISTORY_CACHE_TTL", 10.0)
+    history.touched_at -= 11.0
+    assert not history.is_fresh()
+    assert cache.get_history("u1", "s1") is None
+    assert ("u1", "s1") not in cache._cache
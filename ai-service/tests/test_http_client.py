@@ -0,0 +1,67 @@
+import httpx
+import pytest
+
+from app.utils import http_client, metrics
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    status = 404 if request.url.path == "/missing" else 200
+    return httpx.Response(status, json={"path": request.url.path})
+
+
+class _MockClient(httpx.AsyncClient):
+    """The real client settings, answered by an in-process transport."""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(transport=httpx.MockTransport(_handler), **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def mock_client(monkeypatch):
+    monkeypatch.setattr(http_client.httpx, "AsyncClient", _MockClient)
+    monkeypatch.setattr(http_client, "_client", None)
+
+
+def _counter(name: str) -> int:
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+async def test_client_is_shared_until_closed():
+    client = await http_client.init_chat_client()
+    assert http_client.get_chat_client() is client
+    assert await http_client.init_chat_client() is client
+    assert http_client.pool_stats()["open"]
+
+    await http_client.close_chat_client()
+    assert client.is_closed
+    assert not http_client.pool_stats()["open"]
+    # A call after shutdown gets a fresh client instead of a closed one.
+    replacement = http_client.get_chat_client()
+    assert replacement is not client
+    await http_client.close_chat_client()
+
+
+async def test_requests_use_the_chat_service_base_url_and_count_errors():
+    client = http_client.get_chat_client()
+    requests, errors = _counter("chat_http.requests"), _counter("chat_http.errors")
+
+    response = await client.get("/chats/s1")
+    assert response.json() == {"path": "/chats/s1"}
+    assert str(response.request.url).startswith(http_client.CHAT_SERVICE_URL)
+    await client.get("/missing")
+
+    assert _counter("chat_http.requests") == requests + 2
+    assert _counter("chat_http.errors") == errors + 1
+    await http_client.close_chat_client()
+
+
+def test_http2_needs_the_flag(monkeypatch):
+    monkeypatch.delenv("CHAT_HTTP2", raising=False)
+    assert not http_client._http2_enabled()
+    monkeypatch.setenv("CHAT_HTTP2", "true")
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        assert not http_client._http2_enabled()
+    else:
+        assert http_client._http2_enabled()
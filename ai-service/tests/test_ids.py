@@ -0,0 +1,24 @@
+import time
+import uuid
+
+from app.utils.ids import new_session_id
+
+
+def test_session_id_is_a_uuid7():
+    before = time.time_ns() // 1_000_000
+    value = uuid.UUID(new_session_id())
+    after = time.time_ns() // 1_000_000
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert before <= value.int >> 80 <= after
+
+
+def test_session_ids_are_time_ordered():
+    first = new_session_id()
+    time.sleep(0.002)
+    assert new_session_id() > first
+
+
+def test_session_ids_are_unique():
+    ids = {new_session_id() for _ in range(1000)}
+    assert len(ids) == 1000
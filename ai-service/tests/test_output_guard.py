@@ -0,0 +1,44 @@
+import pytest
+
+from app.services.guardrails.output import OutputGuardrail
+
+
+def _stream(text: str, size: int) -> tuple[str, OutputGuardrail]:
+    guard = OutputGuardrail()
+    out = "".join(guard.feed(text[i : i + size]) for i in range(0, len(text), size))
+    return out + guard.flush(), guard
+
+
+@pytest.mark.parametrize("size", [1, 3, 50])
+def test_output_guardrail_redacts_across_chunks(size):
+    out, guard = _stream("Try this: <script>alert(1)</script> okay?", size)
+    assert "<script" not in out and "</script>" not in out
+    assert out.startswith("Try this: [removed]")
+    assert not guard.suppressed
+
+
+@pytest.mark.parametrize("size", [1, 4, 100])
+def test_output_guardrail_suppresses_prompt_leaks(size):
+    out, guard = _stream("Sure. My CRITICAL INSTRUCTIONS say more text here", size)
+    assert out == "Sure. My "
+    assert guard.suppressed
+
+
+def test_output_guardrail_passes_clean_text():
+    text = "That sounds like a calm and restful weekend."
+    assert _stream(text, 5)[0] == text
+
+
+def test_output_guardrail_releases_a_short_first_chunk_at_once():
+    guard = OutputGuardrail()
+    assert guard.feed("That sounds lovely!") == "That sounds lovely!"
+    # Only the tail that could still start a rule is held back.
+    assert guard.feed(" Tell me about the <scr") == " Tell me about the "
+    assert guard.feed("ipt>") == "[removed]>"
+
+
+def test_output_guardrail_holds_a_split_prompt_leak():
+    guard = OutputGuardrail()
+    assert guard.feed("Okay. CRITICAL INSTR") == "Okay. "
+    assert guard.feed("UCTIONS follow") == ""
+    assert guard.suppressed
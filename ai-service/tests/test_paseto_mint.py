@@ -0,0 +1,35 @@
+from collections import OrderedDict
+
+import pytest
+
+from app.auth import paseto
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(paseto, "_minted", OrderedDict())
+
+
+def test_minted_token_verifies_for_the_user():
+    assert paseto.verify_internal_token(paseto.mint_internal_token("u1")) == "u1"
+
+
+def test_token_is_reused_until_near_expiry(monkeypatch):
+    token = paseto.mint_internal_token("u1")
+    assert paseto.mint_internal_token("u1") == token
+    assert paseto.mint_internal_token("u2") != token
+
+    # Inside the refresh margin the cached token is replaced.
+    monkeypatch.setattr(paseto, "INTERNAL_TOKEN_REFRESH_MARGIN", paseto.INTERNAL_TOKEN_TTL + 1)
+    renewed = paseto.mint_internal_token("u1")
+    assert renewed != token
+    assert paseto.verify_internal_token(renewed) == "u1"
+
+
+def test_cache_is_bounded_lru(monkeypatch):
+    monkeypatch.setattr(paseto, "INTERNAL_TOKEN_CACHE_SIZE", 2)
+    paseto.mint_internal_token("a")
+    paseto.mint_internal_token("b")
+    paseto.mint_internal_token("a")  # "b" is now least recently used
+    paseto.mint_internal_token("c")
+    assert list(paseto._minted) == ["a", "c"]
@@ -0,0 +1,99 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("av")
+
+from app.services.stt import preprocess  # noqa: E402
+from app.services.stt.preprocess import (  # noqa: E402
+    STT_TARGET_SAMPLE_RATE,
+    encode_pcm,
+    preprocess_audio,
+    split_at_silence,
+    trim_silence,
+)
+
+RATE = STT_TARGET_SAMPLE_RATE
+
+
+def _tone(seconds: float) -> "np.ndarray":
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (8000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+
+
+def _silence(seconds: float) -> "np.ndarray":
+    return np.zeros(int(seconds * RATE), dtype=np.int16)
+
+
+def test_trim_silence_keeps_speech_and_padding():
+    pcm = np.concatenate([_silence(1.0), _tone(0.5), _silence(1.0)])
+    speech = trim_silence(pcm)
+    pad = preprocess.STT_VAD_PAD_MS / 1000
+    assert 0.5 <= len(speech) / RATE <= 0.5 + 2 * pad + 0.05
+
+
+def test_trim_silence_drops_pure_silence():
+    assert trim_silence(_silence(1.0)).size == 0
+
+
+def test_split_at_silence_cuts_in_the_pause():
+    # 3 s of speech, a 0.4 s pause, 3 s of speech: with a 5 s limit the
+    # cut must land inside the pause.
+    pcm = np.concatenate([_tone(3.0), _silence(0.4), _tone(3.0)])
+    first, second = split_at_silence(pcm, max_seconds=5.0)
+    assert 3.0 <= len(first) / RATE <= 3.4
+    assert len(first) + len(second) == len(pcm)
+
+
+def test_split_at_silence_bounds_segments_without_pauses():
+    pcm = _tone(12.0)
+    pieces = split_at_silence(pcm, max_seconds=5.0)
+    assert len(pieces) == 3
+    assert all(len(piece) <= 5.0 * RATE for piece in pieces)
+    assert sum(len(piece) for piece in pieces) == len(pcm)
+
+
+def test_short_recordings_are_not_split():
+    pcm = _tone(2.0)
+    assert len(split_at_silence(pcm, max_seconds=5.0)) == 1
+
+
+async def test_preprocess_shrinks_and_trims_the_upload():
+    pcm = np.concatenate([_silence(1.0), _tone(1.0), _silence(1.0)])
+    audio = encode_pcm(pcm, "LINEAR16")
+    prepared = await preprocess_audio(audio, encoding="LINEAR16", sample_rate_hertz=RATE)
+    assert prepared.encoding == preprocess.STT_UPLOAD_ENCODING
+    assert prepared.sample_rate_hertz == RATE
+    assert len(prepared.segments) == 1
+    assert prepared.bytes_out < len(audio)
+    assert prepared.seconds_out < prepared.seconds_in
+
+
+async def test_silence_only_recordings_have_nothing_to_upload():
+    audio = encode_pcm(_silence(1.0), "LINEAR16")
+    prepared = await preprocess_audio(audio, encoding="LINEAR16", sample_rate_hertz=RATE)
+    assert prepared.segments == ()
+
+
+async def test_long_recordings_are_split_on_request(monkeypatch):
+    pcm = np.concatenate([_tone(1.5), _silence(0.3), _tone(1.5)])
+    audio = encode_pcm(pcm, "LINEAR16")
+    monkeypatch.setattr(
+        preprocess,
+        "split_at_silence",
+        lambda speech: split_at_silence(speech, max_seconds=2.0),
+    )
+    prepared = await preprocess_audio(
+        audio, encoding="LINEAR16", sample_rate_hertz=RATE, split=True
+    )
+    assert len(prepared.segments) == 2
+
+
+async def test_failures_fall_back_to_the_original(monkeypatch):
+    def broken(*args, **kwargs):
+        raise ValueError("corrupt")
+
+    monkeypatch.setattr(preprocess, "decode_to_pcm", broken)
+    prepared = await preprocess_audio(b"junk", encoding="WEBM_OPUS", sample_rate_hertz=48000)
+    assert prepared.segments == (b"junk",)
+    assert prepared.encoding == "WEBM_OPUS"
+    assert prepared.reduction == 0.0
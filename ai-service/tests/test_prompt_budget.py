@@ -0,0 +1,73 @@
+from google.genai import types
+
+from app.services.llm.prompt_budget import (
+    assemble_prompt,
+    content_text,
+    estimate_tokens,
+    truncate_to_tokens,
+)
+
+
+def _history(n: int, size: int = 40) -> list[types.Content]:
+    return [
+        types.Content(
+            role="user" if i % 2 == 0 else "model",
+            parts=[types.Part.from_text(text=f"{i:03d} " + "x" * size)],
+        )
+        for i in range(n)
+    ]
+
+
+def test_estimate_and_truncate():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcde") == 2
+    assert truncate_to_tokens("short", 10) == "short"
+    assert truncate_to_tokens("one two three four five six", 3) == "one two"
+    assert truncate_to_tokens("anything", 0) == ""
+
+
+def test_everything_fits_in_a_large_budget():
+    history = _history(4)
+    plan = assemble_prompt("hello", "Person: Sam", history, budget=100_000)
+    assert plan.contents[:-1] == history
+    assert content_text(plan.contents[-1]) == "hello"
+    assert plan.dropped_messages == 0
+    assert not plan.context_truncated
+    assert "Person: Sam" in plan.system_instruction
+
+
+def test_recent_history_beats_context_and_older_turns():
+    history = _history(10)
+    base = assemble_prompt("hi", "", [], budget=100_000).tokens["total"]
+    per_message = estimate_tokens(content_text(history[0])) + 4
+    # Room for the query, the four recent messages and no graph context.
+    plan = assemble_prompt(
+        "hi", "line\n" * 200, history, budget=base + 4 * per_message, recent_messages=4
+    )
+    assert plan.contents[:-1] == history[-4:]
+    assert plan.dropped_messages == 6
+    assert plan.tokens["context"] == 0
+    assert plan.context_truncated
+
+
+def test_context_is_truncated_to_the_budget():
+    base = assemble_prompt("hi", "", [], budget=100_000).tokens["total"]
+    plan = assemble_prompt("hi", "fact line here\n" * 100, [], budget=base + 50)
+    assert plan.context_truncated
+    assert 32 <= plan.tokens["context"] <= 50
+    assert plan.tokens["total"] <= base + 50
+
+
+def test_history_is_kept_in_whole_exchanges():
+    history = _history(10)
+    base = assemble_prompt("hi", "", [], budget=100_000).tokens["total"]
+    per_message = estimate_tokens(content_text(history[0])) + 4
+    # Three messages fit, but the third would start the history on a model turn.
+    plan = assemble_prompt("hi", "", history, budget=base + 3 * per_message, recent_messages=3)
+    assert plan.contents[:-1] == history[-2:]
+    assert plan.contents[0].role == "user"
+
+    # A window that opens on a model reply drops that reply.
+    plan = assemble_prompt("hi", "", history[1:], budget=100_000)
+    assert plan.contents[:-1] == history[2:]
+    assert plan.dropped_messages == 1
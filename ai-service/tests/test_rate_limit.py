@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app.utils.rate_limit import (
+    BACKGROUND,
+    INTERACTIVE,
+    VertexRateLimiter,
+    is_rate_limited,
+    retry_after,
+)
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+class _Response:
+    def __init__(self, headers: dict) -> None:
+        self.headers = headers
+
+
+class _HttpError(Exception):
+    def __init__(self, status_code: int, headers: dict | None = None) -> None:
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = _Response(headers or {})
+
+
+def test_is_rate_limited():
+    assert is_rate_limited(QuotaError())
+    assert is_rate_limited(_HttpError(429))
+    assert is_rate_limited(RuntimeError("RESOURCE_EXHAUSTED: quota"))
+    assert not is_rate_limited(_HttpError(503))
+
+
+def test_retry_after():
+    assert retry_after(_HttpError(429, {"retry-after": "2.5"})) == 2.5
+    assert retry_after(_HttpError(429)) is None
+    assert retry_after(RuntimeError("429")) is None
+
+
+async def test_interactive_callers_go_before_queued_background_ones():
+    limiter = VertexRateLimiter(rate=50, burst=1)
+    await limiter.acquire()  # empty the bucket
+    order = []
+
+    async def take(name: str, priority: int) -> None:
+        await limiter.acquire(priority)
+        order.append(name)
+
+    tasks = [asyncio.create_task(take(f"bg{i}", BACKGROUND)) for i in range(2)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(take(f"chat{i}", INTERACTIVE)) for i in range(2)]
+    await asyncio.gather(*tasks)
+    assert order == ["chat0", "chat1", "bg0", "bg1"]
+
+
+async def test_cancelled_waiter_hands_over_the_queue():
+    limiter = VertexRateLimiter(rate=50, burst=1)
+    await limiter.acquire()
+    head = asyncio.create_task(limiter.acquire(BACKGROUND))
+    nxt = asyncio.create_task(limiter.acquire(BACKGROUND))
+    await asyncio.sleep(0)
+    head.cancel()
+    await asyncio.wait_for(nxt, 1)
+    assert limiter.stats()["waiting"] == 0
+
+
+async def test_try_acquire_never_jumps_the_queue():
+    limiter = VertexRateLimiter(rate=50, burst=1)
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()  # bucket empty
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not limiter.try_acquire()  # someone is already waiting
+    await waiter
+    await asyncio.sleep(0.03)
+    assert limiter.try_acquire()
+
+
+async def test_call_retries_quota_errors_only():
+    limiter = VertexRateLimiter(rate=0, max_attempts=3, backoff_base=0.001)
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise QuotaError("429")
+        return "ok"
+
+    assert await limiter.call(flaky) == "ok"
+    assert attempts == 3
+
+    async def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await limiter.call(broken)
+
+
+def test_backoff_gives_up_after_max_attempts():
+    limiter = VertexRateLimiter(rate=0, max_attempts=2, backoff_max=0.5)
+    assert limiter.backoff(ValueError("nope"), 0) is None
+    assert limiter.backoff(_HttpError(429, {"retry-after": "10"}), 0) == 0.5
+    assert limiter.backoff(QuotaError(), 1) is None
+    assert limiter.stats()["paused_for_seconds"] > 0
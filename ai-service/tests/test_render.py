@@ -0,0 +1,57 @@
+from dataclasses import dataclass, field
+
+from app.services.graph.render import render_context
+
+
+@dataclass
+class _Item:
+    content: str
+    score: float | None = None
+    metadata: dict = field(default_factory=dict)
+
+
+def _section(section: str, content: str, score: float | None = None) -> _Item:
+    return _Item(content, score, {"section": section})
+
+
+def test_relations_fold_into_one_line_per_entity():
+    items = [
+        _section("entities", "## Entities\n- Sam: college friend\n- Exams"),
+        _section(
+            "relationships",
+            "- Alex —[KNOWS]→ Sam\n- Exams —[CAUSES_MOOD]→ Anxious: before finals",
+        ),
+        _section("facts", "- Alex —[KNOWS]→ Sam"),  # repeated by another path
+        _section("hint", "question type: personal"),
+    ]
+    lines = render_context(items, budget=1000).splitlines()
+    assert "Person: Sam (college friend) — KNOWS" in lines
+    assert "Topic: Exams — CAUSES_MOOD:Anxious (before finals)" in lines
+    assert not any("question type" in line or "Alex" in line for line in lines)
+    assert len(lines) == len(set(lines))
+
+
+def test_scores_and_recency_order_lines():
+    items = [
+        _section("passages", "Older note from 2024-01-02", score=0.5),
+        _section("passages", "Newer note from 2025-06-01", score=0.5),
+        _section("passages", "Top scored note", score=0.9),
+    ]
+    assert render_context(items, budget=1000).splitlines() == [
+        "Top scored note",
+        "Newer note from 2025-06-01",
+        "Older note from 2024-01-02",
+    ]
+
+
+def test_budget_drops_the_lowest_ranked_lines():
+    items = [
+        _section("passages", f"note number {i} " + "x" * 40, score=1 - i / 10) for i in range(5)
+    ]
+    rendered = render_context(items, budget=30)
+    assert rendered.startswith("note number 0")
+    assert "note number 4" not in rendered
+
+
+def test_empty_results_render_nothing():
+    assert render_context([]) == ""
@@ -0,0 +1,67 @@
+import pytest
+
+from app.services.tts.segmenter import SentenceSegmenter
+
+
+def _segment(text: str, *, chunk: int = 3, **kwargs) -> list[str]:
+    segmenter = SentenceSegmenter(**kwargs)
+    segments = []
+    for i in range(0, len(text), chunk):
+        segments += segmenter.feed(text[i : i + chunk])
+    tail = segmenter.flush()
+    return segments + ([tail] if tail else [])
+
+
+def test_splits_sentences_and_merges_short_ones():
+    text = "Hi. I am glad you came by today. How are you feeling this evening? Tell me."
+    assert _segment(text, min_chars=20, eager_first=False) == [
+        "Hi. I am glad you came by today.",
+        "How are you feeling this evening?",
+        "Tell me.",
+    ]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "I talked to Dr. Smith about it yesterday afternoon.",
+        "Bring snacks, e.g. fruit or nuts, for the long walk.",
+        "J. R. R. Tolkien wrote the books you mentioned earlier.",
+        "It costs 3.50 and it arrives on Monday morning early.",
+        "Room No. 5 is where the group meets every single week.",
+    ],
+)
+def test_abbreviations_do_not_end_a_sentence(text):
+    assert _segment(text, min_chars=1, eager_first=False) == [text]
+
+
+@pytest.mark.parametrize("word", ["no", "No", "co"])
+def test_sentence_ending_words_are_not_abbreviations(word):
+    text = f"I said {word}. Then we laughed about it."
+    assert _segment(text, min_chars=1, eager_first=False) == [
+        f"I said {word}.",
+        "Then we laughed about it.",
+    ]
+
+
+def test_eager_first_segment_cuts_at_a_clause():
+    segments = _segment(
+        "Well, that sounds really hard, and I am here for you. Tell me more.",
+        min_chars=40,
+        eager_min_chars=5,
+    )
+    assert segments[0] == "Well,"
+
+
+def test_force_split_without_boundaries():
+    text = " ".join(["word"] * 60)
+    segments = _segment(text, min_chars=10, max_chars=50, eager_first=False)
+    assert all(len(s) <= 50 for s in segments)
+    assert " ".join(segments) == text
+
+
+def test_chunking_does_not_change_the_result():
+    text = "Okay. That makes sense to me now! Is it No. 4 or No. 5? I said no. Fine."
+    expected = _segment(text, chunk=len(text), min_chars=1, eager_first=False)
+    for chunk in (1, 2, 7):
+        assert _segment(text, chunk=chunk, min_chars=1, eager_first=False) == expected
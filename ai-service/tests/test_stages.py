@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.utils.stages import Stage, run_stages
+
+
+def _returning(value, delay: float = 0.0):
+    async def run(deps):
+        await asyncio.sleep(delay)
+        return value
+
+    return run
+
+
+async def test_independent_stages_overlap():
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    results = await run_stages([Stage("a", _returning(1, 0.1)), Stage("b", _returning(2, 0.1))])
+    assert results == {"a": 1, "b": 2}
+    assert loop.time() - start < 0.18
+
+
+async def test_stage_receives_dependency_results():
+    async def total(deps):
+        return deps["a"] + deps["b"]
+
+    results = await run_stages(
+        [
+            Stage("a", _returning(1)),
+            Stage("b", _returning(2)),
+            Stage("sum", total, deps=("a", "b")),
+        ]
+    )
+    assert results["sum"] == 3
+
+
+async def test_when_vetoes_stage():
+    called = False
+
+    async def run(deps):
+        nonlocal called
+        called = True
+
+    results = await run_stages(
+        [
+            Stage("flag", _returning(False)),
+            Stage("gated", run, deps=("flag",), when=lambda d: d["flag"], default="skipped"),
+        ]
+    )
+    assert results["gated"] == "skipped"
+    assert not called
+
+
+async def test_skip_stage_uses_default_on_error_and_timeout():
+    async def boom(deps):
+        raise RuntimeError("down")
+
+    results = await run_stages(
+        [
+            Stage("err", boom, on_error="skip", default=[]),
+            Stage("slow", _returning("late", 1), timeout=0.01, on_error="skip", default=""),
+        ]
+    )
+    assert results == {"err": [], "slow": ""}
+
+
+async def test_failing_stage_cancels_the_rest():
+    cancelled = asyncio.Event()
+
+    async def boom(deps):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("down")
+
+    async def long(deps):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(RuntimeError, match="down"):
+        await run_stages([Stage("boom", boom), Stage("long", long)])
+    assert cancelled.is_set()
+
+
+async def test_undeclared_dependency_is_rejected():
+    with pytest.raises(ValueError, match="undeclared"):
+        await run_stages([Stage("b", _returning(1), deps=("a",))])
@@ -0,0 +1,117 @@
+import sys
+import types
+
+import pytest
+
+from app.services.stt import streaming
+from app.services.stt.streaming import (
+    AudioStream,
+    BufferedRecognizer,
+    StreamConfig,
+    TranscriptEvent,
+)
+
+
+async def _collect(stream: AudioStream) -> list[bytes]:
+    return [chunk async for chunk in stream]
+
+
+async def test_audio_stream_yields_chunks_until_closed():
+    stream = AudioStream()
+    assert stream.push(b"ab")
+    assert stream.push(b"cd")
+    stream.close()
+    assert not stream.push(b"late")
+    assert await _collect(stream) == [b"ab", b"cd"]
+
+
+async def test_audio_stream_closes_when_the_size_cap_is_exceeded():
+    stream = AudioStream(max_bytes=4)
+    assert stream.push(b"abc")
+    assert not stream.push(b"de")
+    assert stream.closed
+    assert await _collect(stream) == [b"abc"]
+
+
+async def test_audio_stream_ends_when_the_client_goes_quiet():
+    stream = AudioStream(idle_timeout=0.01)
+    stream.push(b"ab")
+    assert await _collect(stream) == [b"ab"]
+    assert stream.timed_out and stream.closed
+    assert not stream.push(b"late")
+
+
+async def test_buffered_recognizer_transcribes_the_whole_stream(monkeypatch):
+    calls = []
+
+    async def fake_transcribe(audio: bytes, **config) -> str:
+        calls.append((audio, config))
+        return "hello there"
+
+    monkeypatch.setattr(streaming, "transcribe_audio", fake_transcribe)
+    stream = AudioStream()
+    stream.push(b"ab")
+    stream.push(b"cd")
+    stream.close()
+    config = StreamConfig(encoding="OGG_OPUS", sample_rate_hertz=16000)
+
+    events = [event async for event in BufferedRecognizer().recognize(stream, config)]
+    assert events == [TranscriptEvent(text="hello there", final=True)]
+    assert calls == [
+        (
+            b"abcd",
+            {"encoding": "OGG_OPUS", "sample_rate_hertz": 16000, "language_code": "en-US"},
+        )
+    ]
+
+
+async def test_buffered_recognizer_skips_empty_streams(monkeypatch):
+    async def fail(*args, **kwargs):
+        pytest.fail("nothing to transcribe")
+
+    monkeypatch.setattr(streaming, "transcribe_audio", fail)
+    stream = AudioStream()
+    stream.close()
+    events = [event async for event in BufferedRecognizer().recognize(stream, StreamConfig())]
+    assert events == [TranscriptEvent(text="", final=True)]
+
+
+def test_recognizer_can_be_overridden():
+    local = BufferedRecognizer()
+    streaming.set_streaming_recognizer(local)
+    try:
+        assert streaming.get_streaming_recognizer() is local
+    finally:
+        streaming.set_streaming_recognizer(None)
+
+
+async def test_google_recognizer_uses_the_shared_credentials(monkeypatch):
+    clients = []
+
+    class FakeClient:
+        def __init__(self, **kwargs) -> None:
+            clients.append(kwargs)
+
+    class FakeManager:
+        credentials = object()
+
+        async def get_auth_data(self):
+            return "token", "my-project"
+
+    speech = types.ModuleType("google.cloud.speech")
+    speech.SpeechAsyncClient = FakeClient
+    cloud = types.ModuleType("google.cloud")
+    cloud.speech = speech
+    monkeypatch.setitem(sys.modules, "google.cloud", cloud)
+    monkeypatch.setitem(sys.modules, "google.cloud.speech", speech)
+    monkeypatch.setattr(streaming, "get_credential_manager", FakeManager)
+
+    recognizer = streaming.GoogleStreamingRecognizer()
+    client = await recognizer._get_client()
+    assert await recognizer._get_client() is client
+    assert clients == [
+        {
+            "credentials": FakeManager.credentials,
+            "client_options": {"quota_project_id": "my-project"},
+        }
+    ]
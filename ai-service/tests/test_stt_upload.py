@@ -0,0 +1,106 @@
+import base64
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.services.stt import upload
+
+app = FastAPI()
+
+
+@app.post("/upload")
+async def _upload(request: Request):
+    audio = await upload.read_stt_upload(request)
+    if isinstance(audio, JSONResponse):
+        return audio
+    return {"audio": audio.decode()}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(upload, "STT_MAX_UPLOAD_BYTES", 1000)
+    return TestClient(app)
+
+
+def _error(resp) -> tuple[int, str]:
+    return resp.status_code, resp.json()["error"]
+
+
+@pytest.mark.parametrize("content_type", ["application/octet-stream", "audio/webm"])
+def test_raw_body(client, content_type):
+    resp = client.post("/upload", content=b"pcm", headers={"Content-Type": content_type})
+    assert resp.json() == {"audio": "pcm"}
+
+
+@pytest.mark.parametrize("field", ["audio", "file"])
+def test_multipart_fields(client, field):
+    resp = client.post("/upload", files={field: ("rec.webm", b"pcm", "audio/webm")})
+    assert resp.json() == {"audio": "pcm"}
+
+
+def test_multipart_without_audio(client):
+    resp = client.post("/upload", files={"other": ("rec.webm", b"pcm", "audio/webm")})
+    assert _error(resp) == (400, "missing_audio")
+
+
+def test_json_base64(client):
+    resp = client.post("/upload", json={"audio": base64.b64encode(b"pcm").decode()})
+    assert resp.json() == {"audio": "pcm"}
+
+
+@pytest.mark.parametrize(
+    ("body", "error"),
+    [
+        ({"audio": ""}, "missing_audio"),
+        ({}, "missing_audio"),
+        ([1, 2], "missing_audio"),
+        ({"audio": 5}, "invalid_audio_encoding"),
+        ({"audio": ["cGNt"]}, "invalid_audio_encoding"),
+        ({"audio": "not base64!"}, "invalid_audio_encoding"),
+    ],
+)
+def test_json_errors(client, body, error):
+    assert _error(client.post("/upload", json=body)) == (400, error)
+
+
+def test_malformed_json(client):
+    resp = client.post(
+        "/upload", content=b"{not json", headers={"Content-Type": "application/json"}
+    )
+    assert _error(resp) == (400, "invalid_json")
+
+
+def test_malformed_multipart(client):
+    resp = client.post(
+        "/upload",
+        content=b"--x\r\nContent-Disposition: form-data\r\n\r\npcm\r\n--x--\r\n",
+        headers={"Content-Type": "multipart/form-data; boundary=x"},
+    )
+    assert _error(resp) == (400, "invalid_multipart")
+
+
+def test_declared_size_over_the_cap(client):
+    resp = client.post(
+        "/upload", content=b"x" * 1001, headers={"Content-Type": "application/octet-stream"}
+    )
+    assert _error(resp) == (413, "audio_too_large")
+
+
+@pytest.mark.parametrize("content_type", ["application/octet-stream", "multipart/form-data"])
+def test_chunked_upload_over_the_cap(client, content_type):
+    def chunks():
+        # No Content-Length: the cap is enforced while the body streams in.
+        for _ in range(200):
+            yield b"x" * 512
+
+    if content_type == "multipart/form-data":
+        content_type += "; boundary=x"
+    resp = client.post("/upload", content=chunks(), headers={"Content-Type": content_type})
+    assert _error(resp) == (413, "audio_too_large")
+
+
+def test_base64_json_over_the_cap(client):
+    resp = client.post("/upload", json={"audio": base64.b64encode(b"x" * 1001).decode()})
+    assert _error(resp) == (413, "audio_too_large")
@@ -0,0 +1,111 @@
+import pytest
+
+from app.services.history import cache, summary
+from app.services.history.cache import SessionHistory
+
+
+class _Resp:
+    status_code = 200
+    text = ""
+
+
+class _FakeChatClient:
+    def __init__(self) -> None:
+        self.puts: list[tuple[str, dict]] = []
+
+    async def put(self, path, json, headers):
+        self.puts.append((path, json))
+        return _Resp()
+
+
+@pytest.fixture
+def chat_client(monkeypatch):
+    fake = _FakeChatClient()
+    monkeypatch.setattr(summary, "get_chat_client", lambda: fake)
+    return fake
+
+
+def _at(i: int) -> str:
+    return f"2026-01-01T00:00:{i:02d}"
+
+
+def _history(n: int, *, summarized_until: str = "") -> SessionHistory:
+    messages = [
+        {"role": "user" if i % 2 == 0 else "ai", "content": f"message {i}", "created_at": _at(i)}
+        for i in range(n)
+    ]
+    return SessionHistory.from_messages(
+        "u1", "s1", messages, summary="old", summarized_until=summarized_until
+    )
+
+
+def _token(user_id: str, **kwargs) -> str:
+    return "token"
+
+
+async def test_fold_moves_the_watermark_to_the_last_folded_message(monkeypatch, chat_client):
+    prompts = []
+
+    async def generate(previous, messages):
+        prompts.append((previous, [m["content"] for m in messages]))
+        return "new summary"
+
+    monkeypatch.setattr(summary, "_generate_summary", generate)
+    monkeypatch.setattr(summary, "SUMMARY_TAIL_MESSAGES", 2)
+    history = _history(6, summarized_until="2025-12-31T23:59:59")
+
+    assert await summary.summarize_session(history, _token)
+    assert prompts == [("old", ["message 0", "message 1", "message 2", "message 3"])]
+    assert [m["content"] for m in history.messages] == ["message 4", "message 5"]
+    assert len(history.contents) == 2
+    assert (history.summary, history.summarized_until) == ("new summary", _at(3))
+    assert chat_client.puts == [
+        ("/sessions/s1/summary", {"summary": "new summary", "last_message_at": _at(3)})
+    ]
+
+
+async def test_failed_summary_leaves_history_unchanged(monkeypatch, chat_client):
+    async def generate(previous, messages):
+        raise RuntimeError("model down")
+
+    monkeypatch.setattr(summary, "_generate_summary", generate)
+    history = _history(10)
+    assert not await summary.summarize_session(history, _token)
+    assert len(history.messages) == 10
+    assert (history.summary, history.summarized_until) == ("old", "")
+    assert chat_client.puts == []
+
+
+async def test_schedule_only_past_the_trigger(monkeypatch, chat_client):
+    async def generate(previous, messages):
+        return "s"
+
+    monkeypatch.setattr(summary, "_generate_summary", generate)
+    monkeypatch.setattr(summary, "SUMMARY_TRIGGER_MESSAGES", 4)
+    monkeypatch.setattr(summary, "SUMMARY_TAIL_MESSAGES", 2)
+
+    assert summary.schedule_summary(_history(4), _token) is None
+    history = _history(5)
+    task = summary.schedule_summary(history, _token)
+    assert task is not None
+    assert summary.schedule_summary(history, _token) is None  # already running
+    await task
+    assert len(history.messages) == 2
+    assert history.summarized_until == _at(2)
+
+
+def test_trimming_does_not_move_the_watermark(monkeypatch):
+    monkeypatch.setattr(cache, "HISTORY_LIMIT", 4)
+    history = _history(3, summarized_until=_at(0))
+    for i in range(3):
+        history.append("user", f"extra {i}", _at(10 + i))
+    assert len(history.messages) == len(history.contents) == 4
+    assert history.messages[-1]["created_at"] == _at(12)
+    assert history.summarized_until == _at(0)
+
+
+def test_cold_load_keeps_the_stored_watermark(monkeypatch):
+    monkeypatch.setattr(cache, "HISTORY_LIMIT", 4)
+    history = _history(6, summarized_until=_at(0))
+    assert [m["content"] for m in history.messages] == [f"message {i}" for i in range(2, 6)]
+    assert history.summarized_until == _at(0)
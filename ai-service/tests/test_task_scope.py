@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from app.utils.task_scope import RequestScope
+
+
+async def test_child_failure_resolves_to_none():
+    async def boom():
+        raise RuntimeError("child")
+
+    async with RequestScope("t") as scope:
+        task = scope.spawn(boom(), name="boom")
+    assert task.result() is None
+
+
+async def test_normal_exit_waits_for_children():
+    done = []
+
+    async def child():
+        await asyncio.sleep(0.01)
+        done.append(True)
+
+    async with RequestScope("t") as scope:
+        scope.spawn(child(), name="child")
+    assert done == [True]
+
+
+async def test_body_error_cancels_children_and_propagates_unwrapped():
+    started = asyncio.Event()
+
+    async def child():
+        started.set()
+        await asyncio.sleep(10)
+
+    with pytest.raises(ValueError, match="body") as info:
+        async with RequestScope("t") as scope:
+            task = scope.spawn(child(), name="child")
+            await started.wait()
+            try:
+                raise KeyError("cause")
+            except KeyError as exc:
+                raise ValueError("body") from exc
+    assert task.cancelled()
+    assert isinstance(info.value.__cause__, KeyError)
+
+
+async def test_cancelling_the_request_cancels_children():
+    started = asyncio.Event()
+    children = []
+
+    async def child():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def turn():
+        async with RequestScope("t") as scope:
+            children.append(scope.spawn(child(), name="child"))
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(turn())
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert children[0].cancelled()
@@ -0,0 +1,129 @@
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from app.services.tts import cache
+
+
+class _FakeSynth:
+    """Stands in for Google TTS: returns b"audio:<text>" and counts calls."""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.gate: asyncio.Event | None = None
+
+    async def __call__(self, text: str, **kwargs) -> bytes:
+        self.calls.append(text)
+        if self.gate is not None:
+            await self.gate.wait()
+        return f"audio:{text}".encode()
+
+
+@pytest.fixture
+def synth(monkeypatch):
+    fake = _FakeSynth()
+    monkeypatch.setattr(cache, "synthesize_speech", fake)
+    monkeypatch.setattr(cache, "_memory", OrderedDict())
+    monkeypatch.setattr(cache, "_memory_bytes", 0)
+    monkeypatch.setattr(cache, "TTS_CACHE_DIR", "")
+    monkeypatch.setattr(cache, "_pinned", set())
+    monkeypatch.setattr(cache, "_disk_index", OrderedDict())
+    monkeypatch.setattr(cache, "_disk_bytes", 0)
+    monkeypatch.setattr(cache, "_disk_indexed_dir", None)
+    return fake
+
+
+async def test_repeated_text_is_served_from_memory(synth):
+    assert await cache.synthesize_speech_cached("Hello") == b"audio:Hello"
+    assert await cache.synthesize_speech_cached("Hello") == b"audio:Hello"
+    assert synth.calls == ["Hello"]
+    # The voice is part of the key.
+    await cache.synthesize_speech_cached("Hello", voice="en-US-Other")
+    assert synth.calls == ["Hello", "Hello"]
+
+
+async def test_concurrent_requests_share_one_synthesis(synth):
+    synth.gate = asyncio.Event()
+    tasks = [asyncio.create_task(cache.synthesize_speech_cached("Hi")) for _ in range(3)]
+    await asyncio.sleep(0)
+    synth.gate.set()
+    assert await asyncio.gather(*tasks) == [b"audio:Hi"] * 3
+    assert synth.calls == ["Hi"]
+
+
+async def test_cancelled_owner_hands_synthesis_to_a_waiter(synth):
+    synth.gate = asyncio.Event()
+    owner = asyncio.create_task(cache.synthesize_speech_cached("Hi"))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.synthesize_speech_cached("Hi"))
+    await asyncio.sleep(0)
+    owner.cancel()
+    await asyncio.sleep(0)
+    synth.gate.set()
+    assert await waiter == b"audio:Hi"
+    assert owner.cancelled()
+    assert synth.calls == ["Hi", "Hi"]
+
+
+async def test_memory_tier_evicts_least_recently_used(synth, monkeypatch):
+    monkeypatch.setattr(cache, "TTS_CACHE_MAX_BYTES", 2 * len(b"audio:a"))
+    for text in ("a", "b"):
+        await cache.synthesize_speech_cached(text)
+    await cache.synthesize_speech_cached("a")  # "b" is now least recently used
+    await cache.synthesize_speech_cached("c")
+    assert cache._memory_bytes <= cache.TTS_CACHE_MAX_BYTES
+    await cache.synthesize_speech_cached("a")
+    await cache.synthesize_speech_cached("b")
+    assert synth.calls == ["a", "b", "c", "b"]
+
+
+async def test_disk_tier_survives_a_restart(synth, monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, "TTS_CACHE_DIR", str(tmp_path))
+    await cache.synthesize_speech_cached("Welcome back")
+    assert len(list(tmp_path.glob("*.audio"))) == 1
+
+    cache._memory.clear()  # a new process starts with an empty memory tier
+    assert await cache.synthesize_speech_cached("Welcome back") == b"audio:Welcome back"
+    assert synth.calls == ["Welcome back"]
+
+
+async def test_disk_tier_is_bounded(synth, monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, "TTS_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "TTS_CACHE_DISK_MAX_BYTES", 2 * len(b"audio:a"))
+    for text in ("a", "b", "c"):
+        await cache.synthesize_speech_cached(text)
+    files = list(tmp_path.glob("*.audio"))
+    assert sum(f.stat().st_size for f in files) <= cache.TTS_CACHE_DISK_MAX_BYTES
+    assert len(files) == 2
+
+
+async def test_long_text_is_only_cached_when_warmed(synth, monkeypatch):
+    monkeypatch.setattr(cache, "TTS_CACHE_MAX_TEXT_CHARS", 10)
+    sentence = "A long streamed sentence."
+    await cache.synthesize_speech_cached(sentence)
+    await cache.synthesize_speech_cached(sentence)
+    assert synth.calls == [sentence, sentence]
+    assert not cache._memory
+
+    await cache.warm_tts_cache([sentence])
+    await cache.synthesize_speech_cached(sentence)
+    assert synth.calls == [sentence] * 3
+
+
+async def test_disk_tier_scans_the_directory_once(synth, monkeypatch, tmp_path):
+    (tmp_path / "old.audio").write_bytes(b"x" * 7)
+    monkeypatch.setattr(cache, "TTS_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "TTS_CACHE_DISK_MAX_BYTES", 2 * len(b"audio:a"))
+    scans = []
+    glob = cache.Path.glob
+    monkeypatch.setattr(
+        cache.Path, "glob", lambda self, pattern: scans.append(1) or glob(self, pattern)
+    )
+
+    for text in ("a", "b"):
+        await cache.synthesize_speech_cached(text)
+    assert len(scans) == 1
+    # The file found by the scan was the oldest, so it went first.
+    assert not (tmp_path / "old.audio").exists()
+    assert cache.cache_stats()["disk_bytes"] == 2 * len(b"audio:a")
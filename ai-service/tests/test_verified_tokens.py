@@ -0,0 +1,65 @@
+import datetime
+
+import pytest
+from pyseto import Key, encode
+
+from app.auth import verified_tokens
+from app.auth.verified_tokens import TokenVerifier
+
+KEY = Key.new(version=4, purpose="local", key=bytes(range(32)))
+ISSUER, AUDIENCE = "dear-ai-gateway", "dear-ai-python-backend"
+
+
+def _token(sub="user-1", *, iss=ISSUER, aud=AUDIENCE, expires_in=300.0, key=KEY) -> str:
+    exp = datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=expires_in)
+    payload = {"iss": iss, "aud": aud, "sub": sub, "exp": exp.isoformat().replace("+00:00", "Z")}
+    return encode(key, payload).decode("utf-8")
+
+
+@pytest.fixture
+def verifier() -> TokenVerifier:
+    return TokenVerifier(KEY, ISSUER, AUDIENCE, max_entries=2)
+
+
+def test_valid_token_is_cached(verifier):
+    token = _token()
+    assert verifier.verify(token) == "user-1"
+    assert verifier.verify(token) == "user-1"
+    stats = verifier.stats()
+    assert (stats["hits"], stats["misses"], stats["decrypt_count"]) == (1, 1, 1)
+
+
+@pytest.mark.parametrize(
+    ("kwargs", "reason"),
+    [
+        ({"iss": "someone-else"}, "issuer"),
+        ({"aud": "other-service"}, "audience"),
+        ({"expires_in": -5}, "expired"),
+        ({"sub": ""}, "missing_sub"),
+        ({"key": Key.new(version=4, purpose="local", key=bytes(32))}, "decrypt"),
+    ],
+)
+def test_rejected_tokens(verifier, kwargs, reason):
+    assert verifier.verify(_token(**kwargs)) is None
+    assert verifier.stats()["failures"] == {reason: 1}
+
+
+def test_garbage_and_missing_tokens(verifier):
+    assert verifier.verify("") is None
+    assert verifier.verify("v4.local.not-a-token") is None
+    assert verifier.stats()["failures"] == {"missing": 1, "decrypt": 1}
+
+
+def test_cache_is_bounded(verifier):
+    for user in ("a", "b", "c"):
+        assert verifier.verify(_token(user)) == user
+    assert verifier.stats()["entries"] == 2
+
+
+def test_cached_entry_expires(verifier, monkeypatch):
+    token = _token(expires_in=60)
+    assert verifier.verify(token) == "user-1"
+    real_time = verified_tokens.time.time
+    monkeypatch.setattr(verified_tokens.time, "time", lambda: real_time() + 120)
+    assert verifier.verify(token) is None
+    assert verifier.stats()["failures"] == {"expired": 1}
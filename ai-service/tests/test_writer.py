@@ -0,0 +1,120 @@
+import pytest
+
+from app.services.history import writer
+from app.services.history.writer import ChatWriter, _Spool
+
+
+class _Resp:
+    def __init__(self, status_code: int) -> None:
+        self.status_code = status_code
+        self.text = f"status {status_code}"
+
+
+class _FakeChatClient:
+    """Answers ``POST /chats/batch`` with scripted statuses (or exceptions)."""
+
+    def __init__(self, *results) -> None:
+        self.results = list(results)
+        self.posts: list[dict] = []
+
+    async def post(self, path, json, headers):
+        self.posts.append({"path": path, "json": json, "headers": headers})
+        result = self.results.pop(0) if self.results else 200
+        if isinstance(result, Exception):
+            raise result
+        return _Resp(result)
+
+
+class _Tokens:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, bool]] = []
+
+    def __call__(self, user_id: str, *, fresh: bool = False) -> str:
+        self.calls.append((user_id, fresh))
+        return f"token-{len(self.calls)}"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = _FakeChatClient()
+    monkeypatch.setattr(writer, "get_chat_client", lambda: fake)
+    monkeypatch.setattr(writer, "CHAT_WRITER_RETRY_BASE", 0.0)
+    monkeypatch.setattr(writer, "CHAT_WRITER_MAX_RETRIES", 3)
+    return fake
+
+
+@pytest.fixture
+def chat_writer(tmp_path):
+    tokens = _Tokens()
+    chat_writer = ChatWriter(tokens)
+    chat_writer.tokens = tokens
+    chat_writer._spool = _Spool(str(tmp_path / "spool.sqlite3"))
+    yield chat_writer
+    if chat_writer._spool is not None:
+        chat_writer._spool.close()
+
+
+async def test_turn_is_sent_as_one_batch(client, chat_writer):
+    stamps = chat_writer.enqueue_turn("u1", "s1", "hello", "hi there")
+    await chat_writer._flush()
+    (post,) = client.posts
+    messages = post["json"]["messages"]
+    assert post["path"] == "/chats/batch"
+    assert [(m["role"], m["content"]) for m in messages] == [("user", "hello"), ("ai", "hi there")]
+    assert messages[0]["created_at"] < messages[1]["created_at"]
+    assert stamps == (messages[0]["created_at"], messages[1]["created_at"])
+    assert chat_writer.stats() == {"queued": 0, "spooled": 0, "spool_enabled": True}
+
+
+async def test_batches_are_split_per_user(client, chat_writer):
+    chat_writer.enqueue_turn("u1", "s1", "a", "b")
+    chat_writer.enqueue_turn("u2", "s2", "c", "d")
+    await chat_writer._flush()
+    assert [call[0] for call in chat_writer.tokens.calls] == ["u1", "u2"]
+    assert len(client.posts) == 2
+
+
+async def test_validation_error_drops_without_retry(client, chat_writer):
+    client.results = [422]
+    chat_writer.enqueue_turn("u1", "s1", "a", "b")
+    await chat_writer._flush()
+    assert len(client.posts) == 1
+    assert chat_writer.stats()["spooled"] == 0
+
+
+async def test_auth_error_retries_with_a_fresh_token(client, chat_writer):
+    client.results = [401, 200]
+    chat_writer.enqueue_turn("u1", "s1", "a", "b")
+    await chat_writer._flush()
+    assert chat_writer.tokens.calls == [("u1", False), ("u1", True)]
+    assert chat_writer.stats()["spooled"] == 0
+
+
+async def test_outage_spools_and_replays(client, chat_writer):
+    client.results = [503, ConnectionError("refused"), 500]
+    chat_writer.enqueue_turn("u1", "s1", "a", "b")
+    await chat_writer._flush()
+    assert len(client.posts) == 3
+    assert chat_writer.stats()["spooled"] == 2
+
+    await chat_writer._replay_spool()
+    assert chat_writer.stats()["spooled"] == 0
+    replayed = client.posts[-1]["json"]["messages"]
+    assert replayed == client.posts[0]["json"]["messages"]
+
+
+async def test_failed_replay_keeps_the_spool(client, chat_writer):
+    client.results = [500] * 6
+    chat_writer.enqueue_turn("u1", "s1", "a", "b")
+    await chat_writer._flush()
+    await chat_writer._replay_spool()
+    assert chat_writer.stats()["spooled"] == 2
+
+
+async def test_no_spool_drops_after_retries(client, chat_writer):
+    chat_writer._spool.close()
+    chat_writer._spool = None
+    client.results = [500] * 3
+    chat_writer.enqueue_turn("u1", "s1", "a", "b")
+    await chat_writer._flush()
+    assert chat_writer.stats() == {"queued": 0, "spooled": 0, "spool_enabled": False}
@@ -2,9 +2,10 @@ import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from . import models, schemas, auth
 from .database import engine, get_db, SessionLocal
@@ -41,12 +42,50 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(title="Chat Service", lifespan=lifespan)
 
+def _naive_utc(value: datetime) -> datetime:
+    # Timestamps are stored as naive UTC (see models.py)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _get_or_create_session(db: Session, user_id: str, session_id: str, title: Optional[str]) -> models.ChatSession:
+    """Idempotently insert a session with a client-supplied id.
+
+    Returns the existing row when the same user already created it and
+    raises 409 when the id belongs to another user.
+    """
+    existing = db.query(models.ChatSession).filter(models.ChatSession.id == session_id).first()
+    if existing is None:
+        db_session = models.ChatSession(id=session_id, user_id=user_id, title=title)
+        db.add(db_session)
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent request inserted the same id first
+            db.rollback()
+            existing = db.query(models.ChatSession).filter(models.ChatSession.id == session_id).first()
+        else:
+            db.refresh(db_session)
+            return db_session
+
+    if existing is None or existing.user_id != user_id:
+        raise HTTPException(status_code=409, detail="Session id already in use")
+    return existing
+
+@app.get("/metrics")
+def metrics() -> dict:
+    """PASETO verification stats (cache hits, failures by reason)."""
+    return {"paseto_verify": auth.verifier_stats()}
+
 @app.post("/sessions", response_model=schemas.ChatSessionResponse)
 def create_session(
-    session_data: schemas.ChatSessionBase,
+    session_data: schemas.ChatSessionCreate,
     db: Session = Depends(get_db),
     user_id: str = Depends(auth.verify_internal_token)
 ):
+    if session_data.id:
+        return _get_or_create_session(db, user_id, session_data.id, session_data.title)
+
     db_session = models.ChatSession(
         user_id=user_id,
         title=session_data.title
@@ -96,6 +135,50 @@ def delete_session(
     db.commit()
     return None
 
+@app.get("/sessions/{session_id}/summary", response_model=schemas.SessionSummaryResponse)
+def get_session_summary(
+    session_id: str,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(auth.verify_internal_token)
+):
+    summary = db.query(models.ChatSessionSummary).filter(models.ChatSessionSummary.session_id == session_id, models.ChatSessionSummary.user_id == user_id).first()
+    if not summary:
+        raise HTTPException(status_code=404, detail="Summary not found")
+    return summary
+
+@app.put("/sessions/{session_id}/summary", response_model=schemas.SessionSummaryResponse)
+def put_session_summary(
+    session_id: str,
+    summary_data: schemas.SessionSummaryUpdate,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(auth.verify_internal_token)
+):
+    db_session = db.query(models.ChatSession).filter(models.ChatSession.id == session_id, models.ChatSession.user_id == user_id).first()
+    if not db_session:
+        # Sessions are created write-behind, so the summary may arrive first.
+        try:
+            _get_or_create_session(db, user_id, session_id, "New Chat")
+        except HTTPException:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+    summary = db.query(models.ChatSessionSummary).filter(models.ChatSessionSummary.session_id == session_id).first()
+    if summary is None:
+        summary = models.ChatSessionSummary(session_id=session_id, user_id=user_id)
+        db.add(summary)
+    summary.summary = summary_data.summary
+    summary.last_message_at = _naive_utc(summary_data.last_message_at) if summary_data.last_message_at else None
+    summary.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(summary)
+    return summary
+
+def _get_existing_chat(db: Session, user_id: str, chat_id: str) -> Optional[models.ChatMessage]:
+    """Return the message with a client-supplied id, or 409 if another user owns the id."""
+    existing = db.query(models.ChatMessage).filter(models.ChatMessage.id == chat_id).first()
+    if existing is not None and existing.user_id != user_id:
+        raise HTTPException(status_code=409, detail="Message id already in use")
+    return existing
+
 @app.post("/chats", response_model=schemas.ChatMessageResponse)
 def create_chat(
     chat: schemas.ChatMessageCreate,
@@ -104,7 +187,18 @@ def create_chat(
 ):
     db_session = db.query(models.ChatSession).filter(models.ChatSession.id == chat.session_id, models.ChatSession.user_id == user_id).first()
     if not db_session:
-        raise HTTPException(status_code=404, detail="Session not found")
+        # The first message of a client-created session may arrive before
+        # (or instead of) its POST /sessions; insert the session idempotently.
+        try:
+            db_session = _get_or_create_session(db, user_id, chat.session_id, "New Chat")
+        except HTTPException:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+    if chat.id:
+        # A replayed message with a client id is returned as already saved
+        existing = _get_existing_chat(db, user_id, chat.id)
+        if existing is not None:
+            return existing
 
     db_chat = models.ChatMessage(
         user_id=user_id,
@@ -112,24 +206,109 @@ def create_chat(
         role=chat.role,
         content=chat.content
     )
+    if chat.id:
+        db_chat.id = chat.id
+    if chat.created_at:
+        db_chat.created_at = _naive_utc(chat.created_at)
     db.add(db_chat)
     db_session.updated_at = datetime.utcnow()
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request inserted the same id first
+        db.rollback()
+        existing = _get_existing_chat(db, user_id, chat.id) if chat.id else None
+        if existing is None:
+            raise
+        return existing
     db.refresh(db_chat)
     return db_chat
 
+@app.post("/chats/batch", response_model=schemas.ChatMessageBatchResponse)
+def create_chats_batch(
+    batch: schemas.ChatMessageBatchCreate,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(auth.verify_internal_token)
+):
+    """Insert many messages in a single request.
+
+    Messages carrying an id that already exists are skipped, so a batch can
+    be retried safely. Missing sessions are created for the caller; messages
+    for sessions owned by another user are rejected.
+    """
+    ids = [chat.id for chat in batch.messages if chat.id]
+    existing_ids = set()
+    if ids:
+        existing_ids = {
+            row.id for row in db.query(models.ChatMessage.id).filter(models.ChatMessage.id.in_(ids))
+        }
+
+    # Resolve every session before adding messages: _get_or_create_session
+    # commits (and may roll back), which must not touch pending messages.
+    sessions = {}
+    for chat in batch.messages:
+        if chat.session_id in sessions or (chat.id and chat.id in existing_ids):
+            continue
+        try:
+            sessions[chat.session_id] = _get_or_create_session(db, user_id, chat.session_id, "New Chat")
+        except HTTPException:
+            sessions[chat.session_id] = None
+
+    saved = duplicates = rejected = 0
+    now = datetime.utcnow()
+    for chat in batch.messages:
+        if chat.id and chat.id in existing_ids:
+            duplicates += 1
+            continue
+
+        db_session = sessions[chat.session_id]
+        if db_session is None:
+            rejected += 1
+            continue
+
+        db_chat = models.ChatMessage(
+            user_id=user_id,
+            session_id=chat.session_id,
+            role=chat.role,
+            content=chat.content
+        )
+        if chat.id:
+            db_chat.id = chat.id
+            existing_ids.add(chat.id)
+        if chat.created_at:
+            db_chat.created_at = _naive_utc(chat.created_at)
+        db.add(db_chat)
+        db_session.updated_at = now
+        saved += 1
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent batch inserted one of the ids first; nothing was
+        # saved, and a retry skips the ids that now exist.
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Concurrent insert, retry the batch")
+    return schemas.ChatMessageBatchResponse(saved=saved, duplicates=duplicates, rejected=rejected)
+
 @app.get("/chats/{session_id}", response_model=List[schemas.ChatMessageResponse])
 def get_chats_by_session(
     session_id: str,
     skip: int = 0,
     limit: int = 100,
     after: Optional[datetime] = None,
+    latest: bool = False,
     db: Session = Depends(get_db),
     user_id: str = Depends(auth.verify_internal_token)
 ):
     query = db.query(models.ChatMessage).filter(models.ChatMessage.user_id == user_id, models.ChatMessage.session_id == session_id)
     if after:
         query = query.filter(models.ChatMessage.created_at > after)
+    if latest:
+        # The newest `limit` messages after the first `skip`, still oldest first.
+        limit = max(0, min(limit, query.count() - skip))
+        chats = query.order_by(models.ChatMessage.created_at.desc()).limit(limit).all()
+        chats.reverse()
+        return chats
     chats = query.order_by(models.ChatMessage.created_at.asc()).offset(skip).limit(limit).all()
     return chats
 
@@ -21,3 +21,14 @@ class ChatMessage(Base):
     role = Column(String, nullable=False)  # "user" or "ai"
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+class ChatSessionSummary(Base):
+    """Rolling summary of a session's older messages, written by ai-service."""
+    __tablename__ = "chat_session_summaries"
+
+    session_id = Column(String, ForeignKey("chat_sessions.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(String, index=True, nullable=False)
+    summary = Column(Text, nullable=False)
+    # created_at of the newest message folded into the summary
+    last_message_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
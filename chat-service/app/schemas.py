@@ -1,10 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class ChatSessionBase(BaseModel):
     title: Optional[str] = "New Chat"
 
+class ChatSessionCreate(ChatSessionBase):
+    # Optional client-generated id (e.g. a UUIDv7 minted by ai-service)
+    id: Optional[str] = Field(default=None, max_length=64, pattern=r"^[A-Za-z0-9-]+$")
+
 class ChatSessionUpdate(BaseModel):
     title: str
 
@@ -23,7 +27,18 @@ class ChatMessageBase(BaseModel):
     session_id: str
 
 class ChatMessageCreate(ChatMessageBase):
-    pass
+    # Optional client-generated id and timestamp so write-behind replays
+    # are idempotent and keep the original turn time.
+    id: Optional[str] = Field(default=None, max_length=64, pattern=r"^[A-Za-z0-9-]+$")
+    created_at: Optional[datetime] = None
+
+class ChatMessageBatchCreate(BaseModel):
+    messages: List[ChatMessageCreate] = Field(max_length=500)
+
+class ChatMessageBatchResponse(BaseModel):
+    saved: int
+    duplicates: int
+    rejected: int
 
 class ChatMessageResponse(ChatMessageBase):
     id: str
@@ -32,3 +47,15 @@ class ChatMessageResponse(ChatMessageBase):
 
     class Config:
         from_attributes = True
+
+class SessionSummaryUpdate(BaseModel):
+    summary: str = Field(max_length=20000)
+    # created_at of the newest message the summary covers
+    last_message_at: Optional[datetime] = None
+
+class SessionSummaryResponse(SessionSummaryUpdate):
+    session_id: str
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,33 @@
+"""Shared fixtures: the app on a throwaway SQLite database.
+
+``app.database`` and ``app.auth`` read their settings at import, so the
+environment is set before the app is imported.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("PASETO_SYMMETRIC_KEY", "00" * 32)
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/chat-service-test.db"
+
+import pytest  # noqa: E402
+from fastapi import Header  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import auth  # noqa: E402
+from app.database import Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def _test_user(x_test_user: str = Header("user-1")) -> str:
+    # Tests pick the caller with an X-Test-User header instead of a PASETO.
+    return x_test_user
+
+
+@pytest.fixture
+def client():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[auth.verify_internal_token] = _test_user
+    yield TestClient(app)
+    app.dependency_overrides.clear()
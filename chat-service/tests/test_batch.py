@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+
+def _message(i: int, session_id: str = "s1", **extra) -> dict:
+    created_at = datetime(2026, 1, 1) + timedelta(seconds=i)
+    return {
+        "id": f"m{i}",
+        "session_id": session_id,
+        "role": "user" if i % 2 == 0 else "ai",
+        "content": f"message {i}",
+        "created_at": created_at.isoformat(),
+        **extra,
+    }
+
+
+def _batch(client, messages, user="user-1"):
+    return client.post("/chats/batch", json={"messages": messages}, headers={"X-Test-User": user})
+
+
+def _contents(client, session_id="s1", **params) -> list[str]:
+    resp = client.get(f"/chats/{session_id}", params=params)
+    assert resp.status_code == 200
+    return [m["content"] for m in resp.json()]
+
+
+def test_batch_creates_the_session_and_saves_in_order(client):
+    resp = _batch(client, [_message(0), _message(1)])
+    assert resp.json() == {"saved": 2, "duplicates": 0, "rejected": 0}
+    assert _contents(client) == ["message 0", "message 1"]
+    sessions = client.get("/sessions").json()
+    assert [s["id"] for s in sessions] == ["s1"]
+
+
+def test_replayed_batch_is_idempotent(client):
+    messages = [_message(i) for i in range(3)]
+    assert _batch(client, messages).json()["saved"] == 3
+    assert _batch(client, messages).json() == {"saved": 0, "duplicates": 3, "rejected": 0}
+    assert _contents(client) == ["message 0", "message 1", "message 2"]
+
+
+def test_partially_saved_batch_saves_only_the_rest(client):
+    _batch(client, [_message(0)])
+    resp = _batch(client, [_message(0), _message(1)])
+    assert resp.json() == {"saved": 1, "duplicates": 1, "rejected": 0}
+
+
+def test_duplicate_ids_within_a_batch_are_saved_once(client):
+    resp = _batch(client, [_message(0), _message(0)])
+    assert resp.json() == {"saved": 1, "duplicates": 1, "rejected": 0}
+
+
+def test_messages_for_another_users_session_are_rejected(client):
+    _batch(client, [_message(0, "shared")], user="owner")
+    resp = _batch(client, [_message(1, "shared"), _message(2, "mine")], user="intruder")
+    assert resp.json() == {"saved": 1, "duplicates": 0, "rejected": 1}
+    # The rejected session did not roll back the other session's message.
+    intruder = {"X-Test-User": "intruder"}
+    assert client.get("/chats/mine", headers=intruder).json()[0]["content"] == "message 2"
+    assert client.get("/chats/shared", headers={"X-Test-User": "owner"}).json()[0]["id"] == "m0"
+
+
+def test_single_create_returns_the_existing_message_on_replay(client):
+    first = client.post("/chats", json=_message(0))
+    second = client.post("/chats", json=_message(0))
+    assert first.status_code == second.status_code == 200
+    assert second.json()["id"] == "m0"
+    assert _contents(client) == ["message 0"]
+
+
+def test_message_id_of_another_user_conflicts(client):
+    _batch(client, [_message(0)], user="owner")
+    resp = client.post("/chats", json=_message(0, "s2"), headers={"X-Test-User": "intruder"})
+    assert resp.status_code == 409
+
+
+def test_invalid_batch_is_rejected(client):
+    resp = _batch(client, [_message(0, id="not valid!")])
+    assert resp.status_code == 422
+
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+
+def _message(i: int, session_id: str = "s1", **extra) -> dict:
+    created_at = datetime(2026, 1, 1) + timedelta(seconds=i)
+    return {
+        "id": f"m{i}",
+        "session_id": session_id,
+        "role": "user" if i % 2 == 0 else "ai",
+        "content": f"message {i}",
+        "created_at": created_at.isoformat(),
+        **extra,
+    }
+
+
+def _batch(client, messages, user="user-1"):
+    return client.post("/chats/batch", json={"messages": messages}, headers={"X-Test-User": user})
+
+
+def _contents(client, session_id="s1", **params) -> list[str]:
+    resp = client.get(f"/chats/{session_id}", params=params)
+    assert resp.status_code == 200
+    return [m["content"] for m in resp.json()]
+
+
+def test_latest_returns_the_newest_messages_after_skip(client):
+    _batch(client, [_message(i) for i in range(10)])
+    assert _contents(client, skip=2, limit=3, latest="true") == [
+        "message 7",
+        "message 8",
+        "message 9",
+    ]
+    assert _contents(client, skip=8, limit=5, latest="true") == ["message 8", "message 9"]
+    assert _contents(client, skip=12, limit=5, latest="true") == []
+    assert _contents(client, skip=2, limit=3) == ["message 2", "message 3", "message 4"]
+
+
+def test_after_returns_only_messages_past_the_watermark(client):
+    _batch(client, [_message(i) for i in range(10)])
+    watermark = _message(6)["created_at"]
+    assert _contents(client, after=watermark, limit=2, latest="true") == [
+        "message 8",
+        "message 9",
+    ]
+    assert _contents(client, after=watermark, limit=20, latest="true") == [
+        "message 7",
+        "message 8",
+        "message 9",
+    ]
+
+
+def test_summary_stores_its_watermark(client):
+    _batch(client, [_message(0)])
+    watermark = _message(0)["created_at"]
+    resp = client.put("/sessions/s1/summary", json={"summary": "hi", "last_message_at": watermark})
+    assert resp.status_code == 200
+    stored = client.get("/sessions/s1/summary").json()
+    assert (stored["summary"], stored["last_message_at"]) == ("hi", watermark)
+
+
+def test_summary_before_the_session_row_creates_it(client):
+    # Sessions are created write-behind, so the summary can arrive first.
+    resp = client.put("/sessions/new/summary", json={"summary": "hi"})
+    assert resp.status_code == 200
+    assert [s["id"] for s in client.get("/sessions").json()] == ["new"]
+
+
+def test_summary_for_another_users_session_is_not_found(client):
+    _batch(client, [_message(0)], user="owner")
+    resp = client.put(
+        "/sessions/s1/summary", json={"summary": "hi"}, headers={"X-Test-User": "intruder"}
+    )
+    assert resp.status_code == 404
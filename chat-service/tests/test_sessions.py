@@ -0,0 +1,43 @@
+def test_client_supplied_session_id_is_idempotent(client):
+    first = client.post("/sessions", json={"id": "0190a1b2-c3d4-7e5f-8a9b-0c1d2e3f4a5b"})
+    second = client.post("/sessions", json={"id": "0190a1b2-c3d4-7e5f-8a9b-0c1d2e3f4a5b"})
+    assert first.status_code == second.status_code == 200
+    assert first.json()["id"] == second.json()["id"] == "0190a1b2-c3d4-7e5f-8a9b-0c1d2e3f4a5b"
+    assert len(client.get("/sessions").json()) == 1
+
+
+def test_session_id_of_another_user_conflicts(client):
+    client.post("/sessions", json={"id": "s1"}, headers={"X-Test-User": "owner"})
+    resp = client.post("/sessions", json={"id": "s1"}, headers={"X-Test-User": "intruder"})
+    assert resp.status_code == 409
+
+
+def test_invalid_session_id_is_rejected(client):
+    assert client.post("/sessions", json={"id": "not valid!"}).status_code == 422
+
+
+def test_session_without_id_gets_a_server_id(client):
+    resp = client.post("/sessions", json={"title": "Hello"})
+    assert resp.status_code == 200
+    assert resp.json()["id"]
+
+
+def test_first_message_creates_a_missing_session(client):
+    resp = client.post("/chats", json={"session_id": "s1", "role": "user", "content": "hi"})
+    assert resp.status_code == 200
+    assert [s["id"] for s in client.get("/sessions").json()] == ["s1"]
+
+
+def test_message_for_another_users_session_is_not_found(client):
+    client.post("/sessions", json={"id": "s1"}, headers={"X-Test-User": "owner"})
+    resp = client.post(
+        "/chats",
+        json={"session_id": "s1", "role": "user", "content": "hi"},
+        headers={"X-Test-User": "intruder"},
+    )
+    assert resp.status_code == 404
+
+
+def test_metrics_report_the_token_verifier(client):
+    stats = client.get("/metrics").json()["paseto_verify"]
+    assert {"hits", "misses", "failures", "entries"} <= stats.keys()
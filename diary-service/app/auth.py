@@ -1,7 +1,9 @@
 import os
 from fastapi import HTTPException, Security
 from fastapi.security.api_key import APIKeyHeader
-from pyseto import decode, Key
+from pyseto import Key
+
+from .verified_tokens import TokenVerifier
 
 API_KEY_NAME = "X-Internal-Auth"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
@@ -20,36 +22,17 @@ PASETO_KEY = _load_paseto_key()
 EXPECTED_ISSUER = os.getenv("PASETO_ISSUER", "dear-ai-gateway")
 EXPECTED_AUDIENCE = os.getenv("PASETO_AUDIENCE", "dear-ai-python-backend")
 
+_verifier = TokenVerifier(PASETO_KEY, EXPECTED_ISSUER, EXPECTED_AUDIENCE)
+
 def verify_internal_token(token_string: str = Security(api_key_header)) -> str:
     if not token_string:
         raise HTTPException(status_code=401, detail="Missing X-Internal-Auth header")
-    try:
-        decoded = decode(PASETO_KEY, token_string)
-        
-        import json
-        if isinstance(decoded.payload, dict):
-            payload = decoded.payload
-        else:
-            payload = json.loads(decoded.payload)
-            
-        if payload.get("iss") != EXPECTED_ISSUER:
-            raise ValueError(f"Invalid issuer: {payload.get('iss')}")
-        if payload.get("aud") != EXPECTED_AUDIENCE:
-            raise ValueError(f"Invalid audience: {payload.get('aud')}")
-            
-        import datetime
-        exp_raw = payload.get("exp")
-        if not exp_raw:
-            raise ValueError("Missing exp claim")
-        exp = datetime.datetime.fromisoformat(exp_raw.replace("Z", "+00:00"))
-        if datetime.datetime.now(datetime.timezone.utc) > exp:
-            raise ValueError("Token expired")
-            
-        sub = payload.get("sub")
-        if not sub:
-            raise ValueError("Missing 'sub' claim")
-        return str(sub)
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=401, detail=f"Invalid PASETO token: {str(e)}")
+    # Verified tokens are cached until exp; failures are counted in verifier_stats().
+    user_id = _verifier.verify(token_string)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid PASETO token")
+    return user_id
+
+def verifier_stats() -> dict:
+    """Cache hits, failures by reason and decrypt timings (served on GET /metrics)."""
+    return _verifier.stats()
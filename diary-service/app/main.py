@@ -10,6 +10,11 @@ models.Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="Diary Service")
 
+@app.get("/metrics")
+def metrics() -> dict:
+    """PASETO verification stats (cache hits, failures by reason)."""
+    return {"paseto_verify": auth.verifier_stats()}
+
 @app.post("/", response_model=schemas.DiaryEntryResponse)
 def create_diary_entry(
     entry: schemas.DiaryEntryCreate,
@@ -0,0 +1,162 @@
+"""Cached PASETO verification for internal gateway tokens.
+
+Decrypting a v4.local token, parsing its JSON payload and its ISO ``exp``
+costs far more than a dictionary lookup, and a session sends the same
+token on every request.  ``TokenVerifier`` remembers each successfully
+verified token (keyed by a SHA-256 of the token, never the token itself)
+until its ``exp``, in a bounded LRU.  Failures are counted by reason
+instead of logging tracebacks, and decrypt latency is tracked.
+
+The canonical copy is ``shared/verified_tokens.py`` at the repository
+root.  Each Python service has its own Docker build context, so
+``scripts/sync_shared.py`` vendors it into ai-service, chat-service,
+diary-service and agent-service; edit the shared copy and re-run the
+script (CI fails when a vendored copy differs).
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from pyseto import Key, decode
+from pyseto.exceptions import DecryptError, VerifyError
+
+logger = logging.getLogger(__name__)
+
+PASETO_VERIFY_CACHE_SIZE = int(os.getenv("PASETO_VERIFY_CACHE_SIZE", "4096"))
+
+
+class _Rejected(Exception):
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class TokenVerifier:
+    """Verify internal PASETO tokens, caching the result until each token expires."""
+
+    def __init__(
+        self,
+        key: Key,
+        issuer: str,
+        audience: str,
+        max_entries: int = PASETO_VERIFY_CACHE_SIZE,
+    ) -> None:
+        self._key = key
+        self._issuer = issuer
+        self._audience = audience
+        self._max_entries = max_entries
+        # sha256(token) -> (user_id, exp as unix timestamp); most recently used last.
+        self._cache: OrderedDict[bytes, tuple[str, float]] = OrderedDict()
+        # Sync FastAPI dependencies run in a thread pool.
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._failures: dict[str, int] = {}
+        self._decrypt_count = 0
+        self._decrypt_total = 0.0
+        self._decrypt_max = 0.0
+
+    def verify(self, token: str) -> str | None:
+        """Return the token's user id, or None when it is invalid or expired."""
+        if not token:
+            self._fail("missing")
+            return None
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                if entry[1] > now:
+                    self._cache.move_to_end(digest)
+                    self._hits += 1
+                    return entry[0]
+                del self._cache[digest]
+            self._misses += 1
+
+        start = time.perf_counter()
+        try:
+            user_id, exp = self._decode(token, now)
+        except _Rejected as exc:
+            self._fail(exc.reason)
+            return None
+        finally:
+            self._record_latency(time.perf_counter() - start)
+
+        with self._lock:
+            self._cache[digest] = (user_id, exp)
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self._max_entries:
+                self._cache.popitem(last=False)
+        return user_id
+
+    def _decode(self, token: str, now: float) -> tuple[str, float]:
+        try:
+            decoded = decode(self._key, token)
+        except (DecryptError, VerifyError, ValueError) as exc:
+            raise _Rejected("decrypt") from exc
+
+        payload = decoded.payload
+        if not isinstance(payload, dict):
+            try:
+                payload = json.loads(payload)
+            except (TypeError, ValueError) as exc:
+                raise _Rejected("malformed") from exc
+            if not isinstance(payload, dict):
+                raise _Rejected("malformed")
+
+        if payload.get("iss") != self._issuer:
+            raise _Rejected("issuer")
+        if payload.get("aud") != self._audience:
+            raise _Rejected("audience")
+
+        # pyseto does NOT validate exp automatically.
+        exp_raw = payload.get("exp")
+        if not exp_raw:
+            raise _Rejected("missing_exp")
+        try:
+            exp = datetime.datetime.fromisoformat(str(exp_raw).replace("Z", "+00:00"))
+        except ValueError as exc:
+            raise _Rejected("malformed") from exc
+        if exp.tzinfo is None:
+            exp = exp.replace(tzinfo=datetime.UTC)
+        expires_at = exp.timestamp()
+        if now >= expires_at:
+            raise _Rejected("expired")
+
+        subject = payload.get("sub")
+        if not subject:
+            raise _Rejected("missing_sub")
+        if isinstance(subject, bytes):
+            subject = subject.decode("utf-8")
+        return str(subject), expires_at
+
+    def _fail(self, reason: str) -> None:
+        with self._lock:
+            self._failures[reason] = self._failures.get(reason, 0) + 1
+        logger.debug("Token verification failed: %s", reason)
+
+    def _record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._decrypt_count += 1
+            self._decrypt_total += seconds
+            self._decrypt_max = max(self._decrypt_max, seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._decrypt_count
+            return {
+                "entries": len(self._cache),
+                "max_entries": self._max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "failures": dict(self._failures),
+                "decrypt_count": count,
+                "decrypt_avg_ms": round(self._decrypt_total / count * 1000, 3) if count else 0.0,
+                "decrypt_max_ms": round(self._decrypt_max * 1000, 3),
+            }
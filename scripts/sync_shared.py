@@ -0,0 +1,63 @@
+"""Vendor the shared Python modules into every service.
+
+Each service is built from its own directory (its own Docker build
+context and uv lock), so code shared between them is kept once under
+``shared/`` and copied into the services by this script.
+
+    python scripts/sync_shared.py          # update the vendored copies
+    python scripts/sync_shared.py --check  # exit 1 if a copy differs (CI)
+"""
+
+import argparse
+import difflib
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Shared source -> vendored copies.
+TARGETS = {
+    "shared/verified_tokens.py": [
+        "ai-service/app/auth/verified_tokens.py",
+        "chat-service/app/verified_tokens.py",
+        "diary-service/app/verified_tokens.py",
+        "agent-service/app/verified_tokens.py",
+    ],
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="only report copies that differ")
+    args = parser.parse_args()
+
+    drifted = 0
+    for source, copies in TARGETS.items():
+        expected = (ROOT / source).read_text()
+        for copy in copies:
+            path = ROOT / copy
+            actual = path.read_text() if path.exists() else ""
+            if actual == expected:
+                continue
+            if args.check:
+                drifted += 1
+                sys.stdout.writelines(
+                    difflib.unified_diff(
+                        expected.splitlines(keepends=True),
+                        actual.splitlines(keepends=True),
+                        fromfile=source,
+                        tofile=copy,
+                    )
+                )
+            else:
+                path.write_text(expected)
+                print(f"updated {copy}")
+
+    if drifted:
+        print(f"\n{drifted} vendored copies differ; run: python scripts/sync_shared.py")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())